@@ -0,0 +1,95 @@
+# benchmarks/importtime.py
+"""
+Startup import-time guard for the composer CLI.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --budget-ms 100 --runs 7
+
+Runs each startup scenario under `python -X importtime`, reports the median
+time spent importing modules after interpreter startup (`site`) and the
+slowest modules, and fails if the budget is exceeded or a module that must
+stay lazy (LLM SDKs, HTTP stack, the build pipeline) was imported.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_MS = 100.0
+
+# name -> (command arguments, modules that must not be imported)
+SCENARIOS = {
+    "cli --help": (["composer.py", "--help"], ("openai", "httpx", "core.agent", "sqlite3", "yaml")),
+    "cli usage error": (["composer.py"], ("openai", "httpx", "core.agent", "sqlite3", "yaml")),
+    "import core": (["-c", "import core, core.llm"], ("openai", "httpx", "core.agent")),
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    """
+    (module, self time in microseconds) for every module imported after
+    interpreter startup, in import completion order.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name == "site":
+            # Everything so far belonged to interpreter startup
+            modules = []
+            continue
+        modules.append((name, int(self_us)))
+    return modules
+
+
+def measure(args: List[str], runs: int) -> Dict:
+    totals = []
+    modules: List[Tuple[str, int]] = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=ROOT,
+            capture_output=True,
+            text=True
+        )
+        modules = parse_importtime(proc.stderr)
+        totals.append(sum(us for _, us in modules) / 1000)
+    return {
+        "median_ms": statistics.median(totals),
+        "modules": {name for name, _ in modules},
+        "slowest": sorted(modules, key=lambda item: item[1], reverse=True)[:5]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Composer startup import-time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    failures = []
+    for name, (command, forbidden) in SCENARIOS.items():
+        result = measure(command, args.runs)
+        print(f"{name:<18}{result['median_ms']:>9.1f} ms")
+        for module, us in result["slowest"]:
+            print(f"    {module:<40}{us / 1000:>8.1f} ms")
+
+        if result["median_ms"] > args.budget_ms:
+            failures.append(f"{name}: {result['median_ms']:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        loaded = sorted(module for module in forbidden if module in result["modules"])
+        if loaded:
+            failures.append(f"{name}: imports {', '.join(loaded)} at startup")
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
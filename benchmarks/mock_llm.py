@@ -0,0 +1,320 @@
+# benchmarks/mock_llm.py
+"""
+Local OpenAI-compatible stand-in for the LLM provider.
+
+Serves `POST .../chat/completions` (plain and SSE streaming) with scripted
+responses: plan prompts get a generated plan of `components` components,
+code prompts get a small module with a passing test, or a failing one with
+probability `failure_rate`, and fix prompts get a search/replace edit of the
+failing assertion that fails again with the same probability. With
+`multi_file`, the plan gives every component a source file and a test file,
+and the interfaces and per-file prompts take the place of code prompts.
+Responses are delayed according to a latency distribution. Everything is
+derived from `seed`, so two runs with the same settings issue the same
+requests and produce the same builds. A repeated request (a hedge or a
+retry) gets the same answer as the first and is counted in `duplicates`,
+not as a new attempt.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+_REQUIREMENTS = re.compile(r"Requirements:\n(.+)")
+_FILE_TO_WRITE = re.compile(r"File to write:\n(.+)")
+_ASSERTION = re.compile(r"^    assert checksum\(\[1, 2, 3\]\) == .+$", re.MULTILINE)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a latency sampler (seconds) from a spec such as `fixed:0.05`,
+    `uniform:0.01,0.2`, `normal:0.1,0.02` or `lognormal:-2.5,0.5`.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(*values))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(*values)
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def _stable_random(*parts) -> random.Random:
+    digest = hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+class ScriptedLLM:
+    """
+    The scripted model behind MockLLMServer.
+    """
+
+    def __init__(
+        self,
+        components: int = 10,
+        failure_rate: float = 0.0,
+        latency: str = "fixed:0",
+        seed: int = 0,
+        fan_in: int = 2,
+        multi_file: bool = False
+    ):
+        self.components = components
+        self.failure_rate = failure_rate
+        self.sample_latency = parse_latency(latency)
+        self.seed = seed
+        self.fan_in = fan_in
+        self.multi_file = multi_file
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self._failing: Dict[str, bool] = {}
+        # Answers by request, so duplicates don't advance the script
+        self._replies_lock = threading.Lock()
+        self._replies: Dict[str, str] = {}
+        self.stats = {"requests": 0, "duplicates": 0, "plan": 0, "code": 0, "interfaces": 0, "file": 0, "fix": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def respond(self, messages: List[Dict]) -> str:
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._replies_lock:
+            with self._lock:
+                self.stats["requests"] += 1
+                duplicate = digest in self._replies
+                if duplicate:
+                    self.stats["duplicates"] += 1
+            if not duplicate:
+                self._replies[digest] = self._respond(messages)
+            return self._replies[digest]
+
+    def _respond(self, messages: List[Dict]) -> str:
+        system = " ".join(m["content"] for m in messages if m["role"] == "system")
+        prompt = messages[-1]["content"] if messages else ""
+        if "directory_structure" in system:
+            with self._lock:
+                self.stats["plan"] += 1
+            return self._plan()
+
+        match = _REQUIREMENTS.search(prompt)
+        key = match.group(1).strip() if match else hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        path = _FILE_TO_WRITE.search(prompt)
+        if path is not None:
+            return self._file(key, path.group(1).strip())
+        if "shared interfaces" in system:
+            kind = "interfaces"
+        else:
+            kind = "fix" if "SEARCH" in system else "code"
+        with self._lock:
+            self.stats[kind] += 1
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        failing = _stable_random(self.seed, key, attempt).random() < self.failure_rate
+        if failing:
+            with self._lock:
+                self.stats["failures"] += 1
+        if kind == "fix":
+            return self._fix(prompt, attempt, failing)
+        if kind == "interfaces":
+            # The per-file calls of this attempt read the outcome back
+            with self._lock:
+                self._failing[key] = failing
+            return self._interfaces(prompt)
+        return self._code(key, failing)
+
+    def latency(self, messages: List[Dict]) -> float:
+        return self.sample_latency(_stable_random(self.seed, "latency", json.dumps(messages)))
+
+    def record_usage(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+    def _plan(self) -> str:
+        rng = _stable_random(self.seed, "plan", self.components)
+        names = [f"component_{i:03d}" for i in range(self.components)]
+        if self.multi_file:
+            # Files named after a component are generated as that component
+            sources = [f"{name}.py" for name in names]
+            tests = [f"test_{name}.py" for name in names]
+        else:
+            sources, tests = ["main.py"], ["test_main.py"]
+        lines = ["project: benchmark_service", "directory_structure:", "  src:"]
+        lines += [f"    - {path}" for path in sources]
+        lines.append("  tests:")
+        lines += [f"    - {path}" for path in tests]
+        lines.append("components:")
+        for i in range(self.components):
+            # Each component builds on up to `fan_in` earlier ones
+            deps = sorted(rng.sample(range(i), min(i, rng.randint(0, self.fan_in))))
+            lines.append(f"  - name: component_{i:03d}")
+            lines.append(f"    description: Benchmark component {i:03d} computing a checksum")
+            lines.append(f"    depends_on: [{', '.join(f'component_{d:03d}' for d in deps)}]")
+        lines += ["tech_stack:", "  - python 3.12", "  - pytest"]
+        return "\n".join(lines) + "\n"
+
+    def _code(self, key: str, failing: bool) -> str:
+        expected = "-1" if failing else "checksum([1, 2, 3])"
+        return (
+            f"# {key}\n"
+            "from typing import List\n\n\n"
+            "def checksum(values: List[int]) -> int:\n"
+            "    return sum(values) % 97\n\n\n"
+            "def test_checksum():\n"
+            f"    assert checksum([1, 2, 3]) == {expected}\n"
+        )
+
+    def _interfaces(self, prompt: str) -> str:
+        files = prompt.split("Files:\n", 1)[-1].split("\n\n", 1)[0].splitlines()
+        stubs = []
+        for path in files:
+            stubs.append(f"# file: {path}")
+            if not path.rsplit("/", 1)[-1].startswith("test_"):
+                stubs.append(
+                    "def checksum(values: List[int]) -> int:\n"
+                    "    \"\"\"Checksum of the values.\"\"\"\n"
+                    "    ..."
+                )
+        return "\n".join(stubs) + "\n"
+
+    def _file(self, key: str, path: str) -> str:
+        with self._lock:
+            self.stats["file"] += 1
+            failing = self._failing.get(key, False)
+        name = path.rsplit("/", 1)[-1]
+        if not name.startswith("test_"):
+            return (
+                f"# {key}\n"
+                "from typing import List\n\n\n"
+                "def checksum(values: List[int]) -> int:\n"
+                "    return sum(values) % 97\n"
+            )
+        module = f"src.{name[len('test_'):-len('.py')]}"
+        expected = "-1" if failing else "checksum([1, 2, 3])"
+        return (
+            f"from {module} import checksum\n\n\n"
+            "def test_checksum():\n"
+            f"    assert checksum([1, 2, 3]) == {expected}\n"
+        )
+
+    def _fix(self, prompt: str, attempt: int, failing: bool) -> str:
+        # Skip reference implementations that precede the current code
+        assertion = _ASSERTION.search(prompt, max(prompt.find("Current code:"), 0))
+        if assertion is None:
+            return "Unable to locate the failing code."
+        expected = f"-{attempt + 2}" if failing else "checksum([1, 2, 3])"
+        return (
+            "<<<<<<< SEARCH\n"
+            f"{assertion.group(0)}\n"
+            "=======\n"
+            f"    assert checksum([1, 2, 3]) == {expected}\n"
+            ">>>>>>> REPLACE\n"
+        )
+
+
+def _count_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    model: ScriptedLLM = None  # Set on the per-server subclass
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        messages = request.get("messages", [])
+
+        time.sleep(self.model.latency(messages))
+        content = self.model.respond(messages)
+        usage = {
+            "prompt_tokens": sum(_count_tokens(m.get("content") or "") for m in messages),
+            "completion_tokens": _count_tokens(content)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.model.record_usage(usage["prompt_tokens"], usage["completion_tokens"])
+
+        base = {
+            "id": f"chatcmpl-{hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]}",
+            "created": int(time.time()),
+            "model": request.get("model", "mock")
+        }
+        if request.get("stream"):
+            self._stream(base, content, usage, (request.get("stream_options") or {}).get("include_usage"))
+        else:
+            self._send_json({
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+    def _send_json(self, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, base: Dict, content: str, usage: Dict, include_usage: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices, **extra):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": choices, **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        try:
+            for line in content.splitlines(keepends=True):
+                event([{"index": 0, "delta": {"content": line}, "finish_reason": None}])
+            event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if include_usage:
+                event([], usage=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the losing stream of a hedge
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockLLMServer:
+    """
+    Run a ScriptedLLM behind an HTTP server on a background thread.
+
+        with MockLLMServer(ScriptedLLM(components=50)) as server:
+            client = DeepSeekClient("key", base_url=server.url)
+    """
+
+    def __init__(self, model: ScriptedLLM, host: str = "127.0.0.1", port: int = 0):
+        self.model = model
+        handler = type("CompletionHandler", (_CompletionHandler,), {"model": model})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "MockLLMServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        self.server.server_close()
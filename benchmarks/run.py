@@ -0,0 +1,217 @@
+# benchmarks/run.py
+"""
+End-to-end build benchmarks against the local mock LLM server.
+
+    python -m benchmarks.run                                # full matrix, compare to baseline
+    python -m benchmarks.run --sizes 1,10 --failure-rates 0
+    python -m benchmarks.run --layouts multi                # only multi-file components
+    python -m benchmarks.run --update-baseline --repeat 3   # store the median runs as the new baseline
+
+Every case runs `Composer.build_service` in a fresh subprocess (so peak RSS
+is per case) against its own MockLLMServer. The `single` layout generates
+each component as one module; `multi` plans a source and a test file per
+component and builds with `build.multi_file`. With `--repeat`, each case
+reports its run with the median wall time; the baseline is recorded with
+`--repeat 3`, and checks on a noisy machine should use the same. Wall time and peak memory are
+compared to the baseline with a relative tolerance; LLM calls and iterations
+are deterministic for a given seed and must match exactly.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+from benchmarks.mock_llm import MockLLMServer, ScriptedLLM, parse_latency
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+TIMED_METRICS = ("wall_time", "peak_rss_mb")
+EXACT_METRICS = ("llm_calls", "iterations", "status")
+LAYOUTS = ("single", "multi")
+
+
+def case_key(components: int, failure_rate: float, layout: str) -> str:
+    return f"components={components},failure_rate={failure_rate:g},layout={layout}"
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_case_in_process(spec: Dict) -> Dict:
+    """
+    Child side: build one service against the mock server and measure it.
+    """
+    from core.agent import Composer
+    from core.llm.factory import LLMClientFactory
+
+    composer = Composer(
+        llm_client=LLMClientFactory.create_client("deepseek", base_url=spec["url"]),
+        output_dir=Path(spec["output_dir"]),
+        config_path=Path(spec["config"])
+    )
+    started = time.perf_counter()
+    result = composer.build_service("Benchmark service")
+    return {
+        "status": result["status"],
+        "wall_time": round(time.perf_counter() - started, 3),
+        "iterations": result["iterations"],
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "error": result.get("error")
+    }
+
+
+def run_case(components: int, failure_rate: float, layout: str, latency: str, seed: int, workers: int) -> Dict:
+    """
+    Benchmark one matrix cell in a subprocess with its own mock server.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="composer-bench-"))
+    try:
+        with open(ROOT / "config" / "settings.yaml") as f:
+            config = yaml.safe_load(f) or {}
+        config.setdefault("build", {})["max_workers"] = workers
+        config["build"]["multi_file"] = layout == "multi"
+        config.setdefault("knowledge", {})["db_path"] = str(workdir / "knowledge.db")
+        # Measure the build loop, not pip
+        config.setdefault("environments", {})["enabled"] = False
+        config_path = workdir / "settings.yaml"
+        with open(config_path, "w") as f:
+            yaml.safe_dump(config, f)
+
+        model = ScriptedLLM(
+            components=components,
+            failure_rate=failure_rate,
+            latency=latency,
+            seed=seed,
+            multi_file=layout == "multi"
+        )
+        with MockLLMServer(model) as server:
+            spec = {"url": server.url, "output_dir": str(workdir / "services"), "config": str(config_path)}
+            env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--case", json.dumps(spec)],
+                cwd=workdir,
+                env=env,
+                capture_output=True,
+                text=True
+            )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Benchmark case failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        # Hedged and retried requests repeat a prompt; only new prompts count
+        result["llm_calls"] = model.stats["requests"] - model.stats["duplicates"]
+        result["duplicate_requests"] = model.stats["duplicates"]
+        result["prompt_tokens"] = model.stats["prompt_tokens"]
+        result["completion_tokens"] = model.stats["completion_tokens"]
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Return a description of every regression against the baseline.
+    """
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        for metric in TIMED_METRICS:
+            if expected.get(metric) and result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{key}: {metric} {result[metric]} > baseline {expected[metric]} (+{tolerance:.0%})"
+                )
+        for metric in EXACT_METRICS:
+            if metric in expected and result[metric] != expected[metric]:
+                regressions.append(f"{key}: {metric} {result[metric]} != baseline {expected[metric]}")
+    return regressions
+
+
+def _print_table(results: Dict[str, Dict], baseline: Dict[str, Dict]):
+    print(f"{'case':<52}{'status':>9}{'wall s':>9}{'base s':>9}{'llm calls':>11}{'iters':>7}{'rss MB':>9}")
+    for key, result in results.items():
+        base = baseline.get(key, {}).get("wall_time", "")
+        print(
+            f"{key:<52}{result['status']:>9}{result['wall_time']:>9.2f}{base:>9}"
+            f"{result['llm_calls']:>11}{result['iterations']:>7}{result['peak_rss_mb']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Composer end-to-end benchmarks")
+    parser.add_argument("--sizes", default="1,10,50,200", help="Comma-separated component counts")
+    parser.add_argument("--failure-rates", default="0,0.2", help="Comma-separated code failure rates")
+    parser.add_argument("--layouts", default=",".join(LAYOUTS), help="Comma-separated component layouts")
+    parser.add_argument("--latency", default="uniform:0.01,0.05", help="Mock LLM latency distribution")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4, help="build.max_workers for every case")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the median run is reported")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        logging.basicConfig(level=logging.WARNING)
+        print(json.dumps(_run_case_in_process(json.loads(args.case))))
+        return
+
+    parse_latency(args.latency)  # Fail fast on a bad spec
+    layouts = args.layouts.split(",")
+    unknown = set(layouts) - set(LAYOUTS)
+    if unknown:
+        parser.error(f"Unknown layouts: {', '.join(sorted(unknown))}")
+    results = {}
+    for layout in layouts:
+        for components in [int(s) for s in args.sizes.split(",")]:
+            for failure_rate in [float(r) for r in args.failure_rates.split(",")]:
+                key = case_key(components, failure_rate, layout)
+                print(f"Running {key}", file=sys.stderr)
+                runs = [
+                    run_case(components, failure_rate, layout, args.latency, args.seed, args.workers)
+                    for _ in range(max(1, args.repeat))
+                ]
+                median = statistics.median_low(run["wall_time"] for run in runs)
+                results[key] = next(run for run in runs if run["wall_time"] == median)
+
+    baseline = {}
+    if args.baseline.exists():
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("cases", {})
+    _print_table(results, baseline)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "latency": args.latency,
+                "seed": args.seed,
+                "workers": args.workers,
+                "cases": {**baseline, **results}
+            }, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 #!/usr/bin/env python
 import argparse
+import json
 import logging
 from pathlib import Path
 
 from dotenv import load_dotenv
-from core.agent import Composer
-from core.llm.factory import LLMClientFactory
 
 # Configure logging
 logging.basicConfig(
@@ -23,8 +22,21 @@ def main():
     parser.add_argument(
         "requirements", 
         type=str,
+        nargs="?",
         help="Service requirements description"
     )
+    parser.add_argument(
+        "--resume",
+        type=Path,
+        metavar="PROJECT_DIR",
+        help="Resume a previous build, skipping components that already passed"
+    )
+    parser.add_argument(
+        "--incremental",
+        type=Path,
+        metavar="PROJECT_DIR",
+        help="Re-plan an existing project for new requirements and rebuild only changed components"
+    )
     parser.add_argument(
         "-o", "--output-dir",
         type=Path,
@@ -37,18 +49,112 @@ def main():
         default="deepseek",
         help="LLM provider to use"
     )
+    parser.add_argument(
+        "--fallback-provider",
+        choices=["deepseek", "openai"],
+        action="append",
+        default=[],
+        help="Provider to fail over to while the primary one is unavailable (repeatable)"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=None,
+        help="Maximum in-flight requests to the LLM provider"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Cache LLM responses in this directory"
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serve LLM responses only from --cache-dir, never calling the provider"
+    )
     parser.add_argument(
         "--config",
         type=Path,
         default=Path("config/settings.yaml"),
         help="Path to configuration file"
     )
+    parser.add_argument(
+        "--code-log",
+        type=Path,
+        default=None,
+        help="Write every generated code version to this file"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-stage timing and token breakdown after the build"
+    )
+    parser.add_argument(
+        "--batch",
+        type=Path,
+        metavar="JSONL_FILE",
+        help="Build every requirements entry of a JSONL file concurrently"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a local build server that accepts jobs over HTTP"
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Server host (with --serve)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8080,
+        help="Server port (with --serve)"
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Serve on this Unix socket instead of TCP (with --serve)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="Concurrent builds in batch and server mode"
+    )
     
     args = parser.parse_args()
+    modes = [bool(args.resume), bool(args.incremental), bool(args.batch), args.serve]
+    if sum(modes) > 1:
+        parser.error("--resume, --incremental, --batch and --serve are mutually exclusive")
+    if (args.batch or args.serve) and args.requirements:
+        parser.error("requirements cannot be combined with --batch or --serve")
+    if not (args.resume or args.batch or args.serve) and not args.requirements:
+        parser.error("requirements are required unless resuming a build, running a batch or serving")
+    
+    if args.code_log:
+        code_handler = logging.FileHandler(args.code_log, encoding="utf-8")
+        code_handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+        code_logger = logging.getLogger("composer.code")
+        code_logger.setLevel(logging.DEBUG)
+        code_logger.propagate = False
+        code_logger.addHandler(code_handler)
     
     try:
+        # Imported only after argument parsing so --help and usage errors stay fast
+        from core.agent import Composer
+        from core.llm.factory import LLMClientFactory
+        
         # Initialize LLM client via factory
-        llm_client = LLMClientFactory.create_client(args.llm_provider)
+        llm_client = LLMClientFactory.create_client(
+            args.llm_provider,
+            max_concurrency=args.max_concurrency,
+            cache_dir=args.cache_dir,
+            replay=args.replay,
+            fallback_providers=args.fallback_provider
+        )
         
         # Create autonomous agent
         agent = Composer(
@@ -57,8 +163,39 @@ def main():
             config_path=args.config
         )
         
+        if args.serve:
+            from core.jobs import BuildQueue
+            from core.server import serve
+            serve(
+                BuildQueue(agent, max_jobs=args.jobs),
+                host=args.host,
+                port=args.port,
+                socket_path=args.socket
+            )
+            return
+        
+        if args.batch:
+            from core.jobs import run_batch
+            jobs = run_batch(agent, args.batch, max_jobs=args.jobs)
+            for job in jobs:
+                print(json.dumps(job, default=str))
+            failed = [job["id"] for job in jobs if job["status"] != "success"]
+            logger.info(f"Batch finished: {len(jobs) - len(failed)} of {len(jobs)} builds succeeded")
+            if failed:
+                exit(1)
+            return
+        
         # Start build process
-        result = agent.build_service(args.requirements)
+        if args.resume:
+            result = agent.resume(args.resume)
+        elif args.incremental:
+            result = agent.rebuild(args.incremental, args.requirements)
+        else:
+            result = agent.build_service(args.requirements)
+        
+        if args.profile:
+            from core.tracing import format_breakdown
+            print(format_breakdown(agent.tracer))
         
         if result["status"] == "success":
             logger.info(f"Service built successfully at: {result['path']}")
@@ -1,7 +1,36 @@
 # core/__init__.py
-from .agent import Composer
-from .planner import Planner
-from .coder import CodeGenerator
-from .debugger import DebugEngine
-from .knowledge import KnowledgeBase
-from .llm.factory import LLMClientFactory
+# Components are imported on first access so that importing a submodule
+# (or running `composer.py --help`) does not load every dependency.
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "Composer": ".agent",
+    "Planner": ".planner",
+    "CodeGenerator": ".coder",
+    "DebugEngine": ".debugger",
+    "KnowledgeBase": ".knowledge",
+    "LLMClientFactory": ".llm.factory",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .agent import Composer
+    from .planner import Planner
+    from .coder import CodeGenerator
+    from .debugger import DebugEngine
+    from .knowledge import KnowledgeBase
+    from .llm.factory import LLMClientFactory
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
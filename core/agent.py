@@ -1,21 +1,34 @@
+import copy
 import json
 import yaml
 import shutil
 import logging
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
 
+from utils.environments import EnvironmentManager
 from utils.files import ProjectManager
+from utils.gate import CodeGate
+from utils.journal import JOURNAL_FILE, SNAPSHOT_FILE, BuildJournal, read_events, replay
 from utils.validation import SecurityValidator
 from utils.test_runner import TestRunner
+from core.plan_schema import component_files
 from core.planner import Planner
 from core.coder import CodeGenerator
 from core.debugger import DebugEngine
+from core.failures import MAX_ERROR_CHARS, fingerprint, repeated_failures, spill_log, with_logs
 from core.knowledge import KnowledgeBase
+from core.scheduler import ComponentScheduler
+from core.tracing import Tracer, metrics
 
 logger = logging.getLogger(__name__)
 
+TRACE_FILE = "trace.json"
+
 class Composer:
     def __init__(
         self,
@@ -25,95 +38,389 @@ class Composer:
     ):
         self.llm = llm_client
         self.output_dir = output_dir
-        self.project_manager = ProjectManager()
         self.security = SecurityValidator()
-        self.test_runner = TestRunner()
-        self.knowledge = KnowledgeBase()
         self.logger = logging.getLogger(__name__)
         
         # Load configuration
         with open(config_path) as f:
-            self.config = yaml.safe_load(f)
+            self.config = yaml.safe_load(f) or {}
+        self.test_runner = TestRunner(**self.config.get("testing", {}))
+        self.gate = CodeGate()
+        self.project_manager = ProjectManager(
+            keep_iterations=self.config.get("artifacts", {}).get("keep_iterations"),
+            gate=self.gate
+        )
+        knowledge_config = self.config.get("knowledge", {})
+        self.knowledge = KnowledgeBase(
+            Path(knowledge_config.get("db_path", "knowledge_base/knowledge.db"))
+        )
+        self.reference_count = knowledge_config.get("references", 2)
+        self.max_workers = self.config.get("build", {}).get("max_workers", 4)
+        # Code candidates generated and tested concurrently per attempt
+        self.candidates = max(1, self.config.get("build", {}).get("candidates", 1))
+        # Generate components with planned files as interfaces plus one file each
+        self.multi_file = self.config.get("build", {}).get("multi_file", False)
+        # Failed iterations kept per component; their logs live on disk
+        self.error_history_limit = max(1, self.config.get("build", {}).get("error_history", 5))
+        # Give up on a component once the same failure comes back this often
+        self.max_repeated_failures = self.config.get("build", {}).get("max_repeated_failures", 3)
+        self.streaming = self.config.get("llm", {}).get("streaming", False)
         
         # Initialize components
-        self.planner = Planner(self.llm)
-        self.coder = CodeGenerator(self.llm)
-        self.debugger = DebugEngine(self.llm)
+        environment_config = dict(self.config.get("environments", {}))
+        self.environments = (
+            EnvironmentManager(**environment_config) if environment_config.pop("enabled", True) else None
+        )
+        self.planner = Planner(self.llm, streaming=self.streaming, environments=self.environments)
+        self.coder = CodeGenerator(self.llm, **self.config.get("prompt", {}))
+        self.debugger = DebugEngine(self.llm, **self.config.get("prompt", {}))
         
         # State tracking
         self.current_project: Optional[Path] = None
         self.iteration_count = 0
-        self.error_history = []
+        self.journal: Optional[BuildJournal] = None
+        self.component_states: Dict[str, Dict[str, Any]] = {}
+        self._state_lock = threading.Lock()
+        self.tracer = Tracer()
+
+    def new_session(self, output_dir: Optional[Path] = None) -> "Composer":
+        """
+        Return a Composer for another build that shares this one's LLM client,
+        configuration, caches and knowledge base but has fresh build state,
+        building into `output_dir` if given.
+        """
+        session = copy.copy(self)
+        if output_dir is not None:
+            session.output_dir = Path(output_dir)
+        session.current_project = None
+        session.iteration_count = 0
+        session.journal = None
+        session.component_states = {}
+        # The project environment and sandbox workers are per build
+        session.test_runner = self.test_runner.new_session()
+        session._state_lock = threading.Lock()
+        session.tracer = Tracer()
+        return session
+
+    def forget_project(self, project_path: Path):
+        """
+        Drop what the shared components keep in memory about a finished
+        project, e.g. once its job is evicted from a long-running queue.
+        """
+        self.project_manager.forget(project_path)
+        self.test_runner.forget(project_path)
+
+    @contextmanager
+    def _traced_build(self, mode: str):
+        """
+        Trace a whole build under a root span and export the trace next to
+        the build journal once the project directory exists.
+        """
+        self.tracer = Tracer()
+        try:
+            with self.tracer.span("build", kind="build", mode=mode):
+                yield
+        finally:
+            if self.current_project and self.current_project.exists():
+                try:
+                    self.tracer.export(self.current_project / TRACE_FILE)
+                except OSError as e:
+                    self.logger.warning(f"Could not write build trace: {str(e)}")
 
     def build_service(self, requirements: str) -> Dict[str, Any]:
         """Full service build lifecycle"""
-        project_path = None
-        try:
-            self.logger.info("Starting requirement analysis and planning")
-            tech_plan = self.planner.create_plan(
-                requirements
-            )
+        with self._traced_build("build"):
+            project_path = None
+            try:
+                self.logger.info("Starting requirement analysis and planning")
+                with self.tracer.span("plan"):
+                    tech_plan = self.planner.create_plan(
+                        requirements
+                    )
+                
+                self.logger.info("Initializing project")
+                with self.tracer.span("init_project"):
+                    project_path = self._init_project(tech_plan)
+                self.current_project = project_path
+            except Exception as e:
+                return self._build_failed(project_path, e)
+            
+            component_states = {
+                component["name"]: self._new_component_state()
+                for component in tech_plan["components"]
+            }
+            return self._develop(project_path, tech_plan, requirements, component_states)
+
+    def resume(self, project_path: Path) -> Dict[str, Any]:
+        """Continue an interrupted or failed build, skipping passed components"""
+        self.current_project = project_path
+        with self._traced_build("resume"):
+            try:
+                tech_plan = self._load_plan(project_path)
+                previous = self._load_build_state(project_path)
+            except Exception as e:
+                return self._build_failed(project_path, e)
             
-            self.logger.info("Initializing project")
-            project_path = self._init_project(tech_plan)
-            self.current_project = project_path
+            stored = previous.get("components", {})
+            component_states = {}
+            for component in tech_plan["components"]:
+                state = stored.get(component["name"]) or self._new_component_state()
+                if state.get("status") != "passed":
+                    state["status"] = "pending"
+                component_states[component["name"]] = state
             
-            # Save plan immediately after initialization
-            self._save_build_state(project_path, {
-                "timestamp": datetime.now().isoformat(),
-                "requirements": requirements,
-                "tech_plan": tech_plan,
-                "status": "in_progress"
-            })
+            self.logger.info(f"Resuming build of {project_path}")
+            return self._develop(
+                project_path,
+                tech_plan,
+                previous.get("requirements"),
+                component_states
+            )
+
+    def rebuild(self, project_path: Path, requirements: str) -> Dict[str, Any]:
+        """
+        Re-plan an existing project for changed requirements and rebuild only
+        the components that were added or changed (and those depending on them).
+        """
+        self.current_project = project_path
+        with self._traced_build("rebuild"):
+            try:
+                old_plan = self._load_plan(project_path)
+                previous = self._load_build_state(project_path)
+                
+                self.logger.info("Starting requirement analysis and planning")
+                with self.tracer.span("plan"):
+                    tech_plan = self.planner.create_plan(requirements)
+                # Keep building into the existing project
+                tech_plan["project"] = old_plan["project"]
+                with self.tracer.span("init_project"):
+                    self._init_project(tech_plan, project_path)
+            except Exception as e:
+                return self._build_failed(project_path, e)
+            
+            changed = self._diff_plans(old_plan, tech_plan)
+            removed = {c["name"] for c in old_plan["components"]} - {c["name"] for c in tech_plan["components"]}
+            if removed:
+                self.logger.info(f"Components removed from the plan: {sorted(removed)}")
             
-            self.logger.info("Starting iterative development")
+            stored = previous.get("components", {})
+            component_states = {}
             for component in tech_plan["components"]:
-                self._execute_development_step(
+                state = stored.get(component["name"]) or self._new_component_state()
+                if component["name"] in changed or state.get("status") != "passed":
+                    # Keep the iteration counter so earlier iteration folders survive
+                    state = {**self._new_component_state(), "iterations": state.get("iterations", 0)}
+                component_states[component["name"]] = state
+            
+            self.logger.info(
+                f"Rebuilding {len(changed)} of {len(tech_plan['components'])} components: {sorted(changed)}"
+            )
+            return self._develop(project_path, tech_plan, requirements, component_states)
+
+    def _develop(
+        self,
+        project_path: Path,
+        tech_plan: Dict,
+        requirements: Optional[str],
+        component_states: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build every component not yet passed, then validate the project"""
+        try:
+            self.component_states = component_states
+            # Sandbox workers preload the stack's dependencies while code is generated
+            site_packages = self._prepare_environment(project_path, tech_plan)
+            lock = (tech_plan.get("dependencies") or {}).get("lock")
+            self.test_runner.prepare(
+                tech_plan["tech_stack"],
+                site_packages,
+                environment=lock["hash"] if site_packages else None
+            )
+
+            # Journal the plan immediately after initialization
+            self._open_journal(project_path)
+            self.journal.append(
+                "build_started",
+                durable=True,
+                requirements=requirements,
+                tech_plan=tech_plan,
+                components=self.component_states
+            )
+            
+            passed = {
+                name for name, state in component_states.items()
+                if state.get("status") == "passed"
+            }
+            pending = [c for c in tech_plan["components"] if c["name"] not in passed]
+            if passed:
+                self.logger.info(f"Skipping {len(passed)} components that already passed")
+            
+            self.logger.info(
+                f"Starting iterative development ({self.max_workers} workers)"
+            )
+            scheduler = ComponentScheduler(
+                pending,
+                max_workers=self.max_workers,
+                completed=passed
+            )
+            scheduler.run(
+                lambda component: self._execute_development_step(
                     component=component,
                     tech_stack=tech_plan["tech_stack"],
-                    project_path=project_path
+                    project_path=project_path,
+                    files=component_files(tech_plan, component) if self.multi_file else []
                 )
+            )
             
             self.logger.info("Running final validation")
-            final_result = self._final_validation(project_path)
+            with self.tracer.span("final_validation"):
+                final_result = self._final_validation(project_path)
             
             self.logger.info("Updating knowledge base")
-            self.knowledge.store_project(
-                project_path=project_path,
-                plan=tech_plan,
-                error_history=self.error_history
-            )
+            with self.tracer.span("store_project"):
+                self.knowledge.store_project(
+                    project_path=project_path,
+                    plan=tech_plan,
+                    error_history=self._error_summary()
+                )
             
+            self.journal.append("build_finished", durable=True, status="success", iterations=self.iteration_count)
+            self._close_journal(project_path)
+            metrics.inc("composer_builds_total", status="success")
             return {
                 "status": "success",
                 "path": str(project_path),
                 "iterations": self.iteration_count,
-                "warnings": final_result.get("warnings", [])
+                "warnings": final_result.get("warnings", []),
+                "trace": str(project_path / TRACE_FILE)
             }
             
         except Exception as e:
-            self.logger.error(f"Error during service build: {str(e)}", exc_info=True)
-            if project_path:
-                # Update build state with error instead of deleting
-                self._save_build_state(project_path, {
-                    "timestamp": datetime.now().isoformat(),
-                    "status": "failed",
-                    "error": str(e),
-                    "iterations": self.iteration_count,
-                    "error_history": self.error_history
-                })
-            return {
-                "status": "error",
-                "error": str(e),
-                "iterations": self.iteration_count,
-                "errors": self.error_history,
-                "path": str(project_path) if project_path else None
+            return self._build_failed(project_path, e)
+        finally:
+            # Other builds may still share the sandbox workers
+            self.test_runner.release()
+
+    def _build_failed(self, project_path: Optional[Path], error: Exception) -> Dict[str, Any]:
+        """Record a failed build and return the error result"""
+        self.logger.error(f"Error during service build: {str(error)}", exc_info=error)
+        metrics.inc("composer_builds_total", status="error")
+        if project_path and project_path.exists():
+            # Record the failure; the plan and component states stay in the journal
+            try:
+                self._open_journal(project_path)
+                self.journal.append(
+                    "build_finished",
+                    durable=True,
+                    status="failed",
+                    error=str(error),
+                    iterations=self.iteration_count
+                )
+                self._close_journal(project_path)
+            except OSError as e:
+                self.logger.warning(f"Could not record the failed build: {str(e)}")
+        return {
+            "status": "error",
+            "error": str(error),
+            "iterations": self.iteration_count,
+            "errors": self._error_summary(),
+            "path": str(project_path) if project_path else None
+        }
+
+    def _prepare_environment(self, project_path: Path, tech_plan: Dict) -> Optional[Path]:
+        """
+        Clone the shared environment of the plan's dependency lock into the
+        project and return its site-packages, or None without a lock.
+        """
+        lock = (tech_plan.get("dependencies") or {}).get("lock")
+        if self.environments is None or not lock:
+            return None
+        with self.tracer.span("environment", packages=len(lock["packages"])):
+            try:
+                venv_path = self.environments.materialize(lock, project_path)
+            except (RuntimeError, OSError, subprocess.SubprocessError) as e:
+                self.logger.warning(f"Could not set up the project environment: {str(e)}")
+                return None
+        return self.environments.site_packages(venv_path)
+
+    def _error_summary(self) -> List[Dict]:
+        """The bounded error histories of all components"""
+        with self._state_lock:
+            return [
+                entry
+                for state in self.component_states.values()
+                for entry in state.get("error_history", [])
+            ]
+
+    def _record_failure(self, project_path: Path, state: Dict[str, Any], component: str, result: Dict) -> Dict:
+        """
+        Add a failed iteration to the component's bounded error history.
+        The full test log is spilled to disk and only referenced.
+        """
+        test_result = result["test_result"]
+        entry = {
+            "iteration": result["iteration"],
+            "component": component,
+            "error": test_result["error"][:MAX_ERROR_CHARS],
+            "fingerprint": fingerprint(test_result),
+            "log": spill_log(project_path, component, result["iteration"], test_result["logs"])
+        }
+        with self._state_lock:
+            history = [*state.get("error_history", []), entry]
+        self._update_component_state(component, error_history=history[-self.error_history_limit:])
+        return entry
+
+    def _new_component_state(self) -> Dict[str, Any]:
+        return {
+            "status": "pending",
+            "iterations": 0,
+            "error_history": []
+        }
+
+    def _diff_plans(self, old_plan: Dict, new_plan: Dict) -> Set[str]:
+        """Names of new-plan components that must be rebuilt"""
+        if old_plan.get("tech_stack") != new_plan.get("tech_stack"):
+            return {c["name"] for c in new_plan["components"]}
+        
+        old_components = {c["name"]: c for c in old_plan["components"]}
+        changed = {
+            c["name"] for c in new_plan["components"]
+            if old_components.get(c["name"]) != c
+        }
+        
+        # Components building on a changed component are rebuilt too
+        while True:
+            dependents = {
+                c["name"] for c in new_plan["components"]
+                if c["name"] not in changed
+                and set(self._component_dependencies(c)) & changed
             }
+            if not dependents:
+                return changed
+            changed |= dependents
+
+    def _component_dependencies(self, component: Dict):
+        declared = component.get("depends_on", component.get("dependencies")) or []
+        return [declared] if isinstance(declared, str) else declared
 
-    def _init_project(self, tech_plan: Dict) -> Path:
+    def _load_plan(self, project_path: Path) -> Dict:
+        with open(project_path / "tech_plan.yaml") as f:
+            return yaml.safe_load(f)
+
+    def _load_build_state(self, project_path: Path) -> Dict[str, Any]:
+        journal_path = project_path / JOURNAL_FILE
+        if journal_path.exists():
+            return replay(read_events(journal_path))
+        # Projects built before the journal only have a snapshot
+        build_state_path = project_path / SNAPSHOT_FILE
+        if not build_state_path.exists():
+            return {}
+        with open(build_state_path) as f:
+            return json.load(f)
+
+    def _init_project(self, tech_plan: Dict, project_path: Optional[Path] = None) -> Path:
         """Initialize project structure"""
-        project_name = tech_plan["project"]
-        project_path = self.output_dir / project_name
+        if project_path is None:
+            project_path = self.output_dir / tech_plan["project"]
         
         # Create directory structure
         self.project_manager.create(
@@ -132,93 +439,379 @@ class Composer:
         component: Dict,
         tech_stack: Dict,
         project_path: Path,
-        max_retries: int = 5
+        max_retries: int = 5,
+        files: Optional[List[str]] = None
     ):
-        """Iterative development of a single component"""
-        for attempt in range(max_retries):
-            self.iteration_count += 1
+        """
+        Iterative development of a single component. With planned `files`,
+        the component is generated as those files instead of one module.
+        """
+        with self.tracer.span("component", kind="component", component=component["name"]) as span:
+            state = self.component_states.setdefault(component["name"], {
+                "status": "pending",
+                "iterations": 0,
+                "error_history": []
+            })
+            self._update_component_state(component["name"], status="in_progress")
             
-            # Generate initial code
-            code = self.coder.generate(
-                requirements=component["description"],
-                tech_stack=tech_stack,
-                previous_errors=self.error_history[-3:]  # Last 3 errors
-            )
+            # Proven implementations of similar components seed every attempt
+            with self.tracer.span("find_similar"):
+                references = self.knowledge.find_similar(
+                    component["description"],
+                    tech_stack,
+                    k=self.reference_count
+                ) if self.reference_count else []
             
-            # Security validation
-            security_report = self.security.validate(code)
-            if not security_report["passed"]:
-                # Attempt to fix security issues
-                code = self.debugger.fix_security_issues(
-                    code,
-                    issues=security_report["issues"],
-                    context=tech_stack
+            fix = None
+            fingerprints = []
+            repeats = 0
+            for attempt in range(max_retries):
+                # Each component keeps its own iteration counter and retry context
+                # so concurrently built components don't interfere. Every
+                # candidate of an attempt gets its own iteration folder.
+                strategies = self.coder.strategies(self.candidates)
+                if fix is not None:
+                    # The patched code takes the place of a fresh generation
+                    strategies[0] = "patch"
+                with self._state_lock:
+                    self.iteration_count += len(strategies)
+                first = state["iterations"] + 1
+                candidates = list(zip(range(first, first + len(strategies)), strategies))
+                self._update_component_state(component["name"], iterations=candidates[-1][0])
+                span.attrs["attempts"] = attempt + 1
+                
+                winner, results = self._race_candidates(
+                    component=component,
+                    tech_stack=tech_stack,
+                    project_path=project_path,
+                    references=references,
+                    previous_errors=with_logs(project_path, state["error_history"][-3:]),  # Last 3 errors
+                    candidates=candidates,
+                    parent=span,
+                    seed_code=fix["code"] if fix is not None else None,
+                    files=files
                 )
                 
-            # Save code version
-            version_path = self.project_manager.write_code(
-                project_path=project_path,
-                component_name=component["name"],
-                code=code,
-                iteration=self.iteration_count
-            )
+                if winner is not None:
+                    # Losing candidates may still write later iterations
+                    self.project_manager.promote_iteration(
+                        project_path, component["name"], winner["iteration"], hold_until=candidates[-1][0]
+                    )
+                    if fix is not None and winner["strategy"] == "patch":
+                        # Later failures with this fingerprint try the patch before the LLM
+                        self.knowledge.store_fix(fingerprints[-1], fix["patch"])
+                    # If tests passed, store success in knowledge
+                    with self.tracer.span("store_success"):
+                        self.knowledge.store_success(
+                            component=component["name"],
+                            code=winner["code"],
+                            context=tech_stack,
+                            description=component["description"]
+                        )
+                    self._update_component_state(component["name"], status="passed")
+                    return  # Done with this component
+                    
+                # Handle test failure; debug the first candidate that produced code
+                entries = [
+                    self._record_failure(project_path, state, component["name"], result)
+                    for result in results
+                ]
+                failed = next((index for index, result in enumerate(results) if result["code"]), 0)
+                fingerprints.append(entries[failed]["fingerprint"])
+                repeats = repeated_failures(fingerprints)
+                if self.max_repeated_failures and repeats >= self.max_repeated_failures:
+                    self.logger.warning(
+                        f"Same failure in '{component['name']}' {repeats} times in a row, "
+                        f"giving up: {fingerprints[-1]}"
+                    )
+                    break
+                
+                # Debug and improve code: patch the failing code, or
+                # regenerate it next attempt if no valid patch comes back
+                fix = None
+                if attempt < max_retries - 1:
+                    with self.tracer.span("debug") as debug_span:
+                        fix = self.debugger.fix(
+                            code=results[failed]["code"],
+                            error_context=results[failed]["test_result"],
+                            tech_stack=tech_stack,
+                            knowledge_base=self.knowledge,
+                            description=component["description"],
+                            fingerprint=fingerprints[-1]
+                        )
+                        debug_span.attrs["patched"] = fix is not None
+                        debug_span.attrs["memoized"] = fix is not None and fix["memoized"]
             
-            # Run automated tests
-            test_result = self.test_runner.execute(
-                project_path=project_path,
-                component=component["name"]
+            self._update_component_state(component["name"], status="failed")
+            if self.max_repeated_failures and repeats >= self.max_repeated_failures:
+                raise RuntimeError(
+                    f"Failed to implement '{component['name']}': the same failure repeated "
+                    f"{repeats} times ({fingerprints[-1]})"
+                )
+            raise RuntimeError(
+                f"Failed to implement '{component['name']}' after {max_retries} attempts"
             )
+
+    def _race_candidates(
+        self,
+        component: Dict,
+        tech_stack: Dict,
+        project_path: Path,
+        references: List[Dict],
+        previous_errors: List[Dict],
+        candidates: List[Tuple[int, str]],
+        parent,
+        seed_code: Optional[str] = None,
+        files: Optional[List[str]] = None
+    ) -> Tuple[Optional[Dict], List[Dict]]:
+        """
+        Generate, validate and test the (iteration, strategy) candidates
+        concurrently. Returns as soon as one passes, with the others
+        cancelled and left to wind down in the background, or else None and
+        the results of all candidates ordered by iteration. A candidate that
+        raises counts as failed; the error is raised only if all of them do.
+        `seed_code` is used as the first candidate instead of generating it.
+        """
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=len(candidates),
+            thread_name_prefix=f"candidate-{component['name']}"
+        )
+        futures = {
+            executor.submit(
+                self._evaluate_candidate,
+                component, tech_stack, project_path, references, previous_errors,
+                iteration, strategy, cancel, parent,
+                seed_code if index == 0 else None, files
+            ): (iteration, strategy)
+            for index, (iteration, strategy) in enumerate(candidates)
+        }
+        results = []
+        errors = []
+        try:
+            for future in as_completed(futures):
+                iteration, strategy = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.logger.warning(
+                        f"Candidate {iteration} ({strategy}) of '{component['name']}' failed: {str(e)}"
+                    )
+                    errors.append(e)
+                    result = {
+                        "iteration": iteration,
+                        "strategy": strategy,
+                        "code": "",
+                        "passed": False,
+                        "test_result": {"passed": False, "error": f"Candidate failed: {str(e)}", "logs": "", "tests": []}
+                    }
+                results.append(result)
+                if result["passed"]:
+                    return result, sorted(results, key=lambda result: result["iteration"])
+        finally:
+            # Losers see the cancel at their next step; nobody waits for them
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        if len(errors) == len(results):
+            raise errors[0]
+        return None, sorted(results, key=lambda result: result["iteration"])
+
+    def _evaluate_candidate(
+        self,
+        component: Dict,
+        tech_stack: Dict,
+        project_path: Path,
+        references: List[Dict],
+        previous_errors: List[Dict],
+        iteration: int,
+        strategy: str,
+        cancel: threading.Event,
+        parent,
+        code: Optional[str] = None,
+        files: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Generate one code candidate (unless `code` is given) into its iteration folder and test it"""
+        with self.tracer.span(
+            "iteration",
+            kind="iteration",
+            parent=parent,
+            iteration=iteration,
+            strategy=strategy
+        ) as iteration_span:
+            # Generate initial code
+            version_path = None
+            if code is None and cancel.is_set():
+                # Another candidate passed before this one started generating
+                code = ""
+            elif code is None and files:
+                # Interfaces first, then every planned file concurrently
+                with self.tracer.span("generate", files=len(files)):
+                    code = self.coder.generate_files(
+                        requirements=component["description"],
+                        tech_stack=tech_stack,
+                        files=files,
+                        previous_errors=previous_errors,
+                        references=references,
+                        strategy=strategy,
+                        cancel=cancel
+                    )
+            elif code is None and self.streaming:
+                # Write the completion to disk as it streams in
+                with self.tracer.span("generate", streaming=True):
+                    version_path = self.project_manager.write_code(
+                        project_path=project_path,
+                        component_name=component["name"],
+                        code=self._until_cancelled(
+                            self.coder.generate_stream(
+                                requirements=component["description"],
+                                tech_stack=tech_stack,
+                                previous_errors=previous_errors,
+                                references=references,
+                                strategy=strategy
+                            ),
+                            cancel
+                        ),
+                        iteration=iteration
+                    )
+                    code = (version_path / "main.py").read_text(encoding="utf-8")
+            elif code is None:
+                with self.tracer.span("generate"):
+                    code = self.coder.generate(
+                        requirements=component["description"],
+                        tech_stack=tech_stack,
+                        previous_errors=previous_errors,
+                        references=references,
+                        strategy=strategy
+                    )
             
-            if test_result["passed"]:
-                # If tests passed, store success in knowledge
-                self.knowledge.store_success(
-                    component=component["name"],
-                    code=code,
-                    context=tech_stack
-                )
-                return  # Done with this component
+            security_report = None
+            if not cancel.is_set():
+                # Security validation
+                with self.tracer.span("security"):
+                    security_report = self.security.validate(code)
+                if not security_report["passed"]:
+                    # Attempt to fix security issues
+                    with self.tracer.span("security_fix"):
+                        fixed = self.debugger.fix_security_issues(
+                            code,
+                            issues=security_report["issues"],
+                            context=tech_stack
+                        )
+                    if fixed != code:
+                        code = fixed
+                        version_path = None
+                        security_report = self.security.validate(code)
                 
-            # Handle test failure
-            self.error_history.append({
-                "iteration": self.iteration_count,
-                "component": component["name"],
-                "error": test_result["error"],
-                "logs": test_result["logs"]
-            })
-            
-            # Debug and improve code
-            code = self.debugger.fix(
-                code=code,
-                error_context=test_result,
-                tech_stack=tech_stack,
-                knowledge_base=self.knowledge
-            )
+            # Save code version
+            if version_path is None and not cancel.is_set():
+                with self.tracer.span("write"):
+                    version_path = self.project_manager.write_code(
+                        project_path=project_path,
+                        component_name=component["name"],
+                        code=code,
+                        iteration=iteration
+                    )
             
-        raise RuntimeError(
-            f"Failed to implement '{component['name']}' after {max_retries} attempts"
-        )
+            gate_result = None
+            if not cancel.is_set():
+                # Syntax and import errors go to the fix loop without a test run
+                with self.tracer.span("gate") as gate_span:
+                    gate_result = self.gate.check(
+                        version_path,
+                        roots=[project_path],
+                        site_packages=self.test_runner.site_packages
+                    )
+                    gate_span.attrs["passed"] = gate_result["passed"]
+
+            if cancel.is_set():
+                test_result = {"passed": False, "error": "Cancelled", "logs": "", "tests": []}
+            elif not security_report["passed"]:
+                # Insecure code never reaches the tests
+                test_result = {
+                    "passed": False,
+                    "error": f"Security check failed: {security_report['issues'][0]}",
+                    "logs": "\n".join(security_report["issues"]),
+                    "tests": []
+                }
+            elif not gate_result["passed"]:
+                test_result = {
+                    "passed": False,
+                    "error": gate_result["error"],
+                    "logs": "\n".join(gate_result["errors"]),
+                    "tests": []
+                }
+            else:
+                # Run automated tests
+                with self.tracer.span("test"):
+                    test_result = self.test_runner.execute(
+                        project_path=project_path,
+                        component=component["name"],
+                        iteration=iteration,
+                        cancel=cancel
+                    )
+            iteration_span.attrs["passed"] = test_result["passed"]
+            return {
+                "iteration": iteration,
+                "strategy": strategy,
+                "code": code,
+                "passed": test_result["passed"],
+                "test_result": test_result
+            }
+
+    def _until_cancelled(self, chunks: Iterator[str], cancel: threading.Event) -> Iterator[str]:
+        """Pass streamed chunks through, closing the stream once cancelled"""
+        try:
+            for chunk in chunks:
+                if cancel.is_set():
+                    return
+                yield chunk
+        finally:
+            chunks.close()
 
     def _final_validation(self, project_path: Path) -> Dict:
         """Run final security and quality checks"""
-        report = {
-            "security": self.security.full_audit(project_path),
-            "tests": self.test_runner.run_all(project_path),
-            "style": self.project_manager.check_style(project_path)
-        }
+        report = {}
+        with self.tracer.span("security_audit"):
+            report["security"] = self.security.full_audit(project_path)
+        with self.tracer.span("test_all"):
+            report["tests"] = self.test_runner.run_all(project_path)
+        with self.tracer.span("style"):
+            report["style"] = self.project_manager.check_style(project_path)
         
         if not report["security"]["passed"]:
-            raise RuntimeError("Security validation failed")
+            raise RuntimeError(f"Security validation failed:\n{report['security']['details']}")
+        # Lower-severity findings are reported with the result instead
+        report["warnings"] = report["security"]["warnings"]
+        for warning in report["warnings"]:
+            self.logger.warning(f"Security: {warning}")
             
         if not report["tests"]["all_passed"]:
             raise RuntimeError("Final test suite failed")
             
         return report
 
-    def _save_build_state(self, project_path: Path, state: Dict[str, Any]):
-        """Save build state to the project directory"""
-        build_state_path = project_path / "build_state.json"
-        with open(build_state_path, "w") as f:
-            json.dump(state, f, indent=2)
+    def _update_component_state(self, name: str, **changes):
+        """Update a component's progress and journal the change"""
+        with self._state_lock:
+            self.component_states.setdefault(name, {}).update(changes)
+        self.journal.append("component", name=name, **changes)
+
+    def _open_journal(self, project_path: Path):
+        """Open the project's build journal, compacting what earlier builds left in it"""
+        path = project_path / JOURNAL_FILE
+        if self.journal is not None and self.journal.path == path:
+            return
+        self.journal = BuildJournal(path, **self.config.get("journal", {}))
+        if path.exists():
+            self.journal.compact()
+
+    def _close_journal(self, project_path: Path):
+        """Sync the journal and leave a snapshot of the final state next to it"""
+        try:
+            self.journal.write_snapshot(project_path / SNAPSHOT_FILE)
+        finally:
+            self.journal.close()
+            self.journal = None
 
     def _cleanup_failed_project(self):
         """Method kept for compatibility but now just logs the failure"""
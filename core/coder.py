@@ -1,42 +1,220 @@
 # core/coder.py
-from core.llm.prompt import Prompt
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import yaml
+
+from core.llm.prompt import Prompt, count_tokens, dedent_prompt, summarize_log, truncate_tokens
+from core.llm.streaming import iter_completion
+from core.tracing import activate, current_span
+from utils.bundle import bundle_files
+
+SYSTEM_PROMPT = dedent_prompt("""
+    You are a programming expert. Write production-grade code that:
+
+    1. Implements exactly the requirements given below
+    2. Uses the given tech stack
+    3. Includes error handling
+    4. Has type hints (if applicable)
+    5. Avoids security vulnerabilities:
+      - SQL injection
+      - XSS
+      - Insecure deserialization
+      - Hardcoded secrets
+    6. Includes TODO comments for complex sections
+    7. Fixes the previous errors, if any are given
+
+    Output ONLY the code with brief inline comments. Never explain outside code.
+    And the code only contains the code, no other text(ex. markdown, etc.).
+
+    Example structure:
+    # Imports here
+    # Main functionality
+    # Unit test stubs
+""")
+
+INTERFACES_PROMPT = dedent_prompt("""
+    You are a programming expert designing a component that is split across
+    several files. Write the shared interfaces the files are implemented
+    against: for every file, under a `# file: <path>` comment, the public
+    classes, functions and data types it defines, with full signatures, type
+    hints, one-line docstrings and `...` as bodies. Test files get no stubs.
+
+    Output ONLY the stubs. No markdown, no explanations.
+""")
+
+FILE_PROMPT = dedent_prompt("""
+    You are a programming expert. You write ONE file of a component that is
+    split across several files, following the shared interfaces exactly:
+
+    1. Implement every interface listed for this file, and nothing the
+       interfaces assign to other files
+    2. Import from the other files by module path, e.g. `from src.models
+       import User` for src/models.py
+    3. Test files contain pytest tests exercising the interfaces
+    4. Include error handling and type hints, avoid security vulnerabilities
+       and hardcoded secrets
+    5. Fix the previous errors, if any are given
+
+    Output ONLY the content of the requested file. No markdown, no
+    explanations outside code.
+""")
+
+# Alternative approaches for speculative candidates; "default" adds nothing to
+# the prompt. They differ in prompt text rather than sampling temperature, so
+# every candidate is a distinct, cacheable request.
+STRATEGIES = {
+    "default": None,
+    "minimal": "Write the simplest implementation that satisfies the requirements. "
+               "Avoid optional features and third-party dependencies.",
+    "defensive": "Validate every input and handle edge cases explicitly. "
+                 "Make sure the unit tests cover the error paths.",
+    "rewrite": "Design the implementation from scratch instead of adjusting "
+               "earlier attempts, and keep it small and testable."
+}
 
 class CodeGenerator:
-    def __init__(self, llm_client):
+    def __init__(
+        self,
+        llm_client,
+        error_token_budget: int = 1500,
+        reference_token_budget: int = 2000
+    ):
         self.llm = llm_client
+        self.error_token_budget = error_token_budget
+        self.reference_token_budget = reference_token_budget
     
-    def generate(self, requirements: str, tech_stack: dict, previous_errors=None) -> str:
-        system_msg = f"""
-        You are a programming expert. Write production-grade code that:
-
-        1. Implements exactly: {requirements}
-        2. Uses {tech_stack} framework
-        3. Includes error handling
-        4. Has type hints (if applicable)
-        5. Avoids security vulnerabilities:
-          - SQL injection
-          - XSS
-          - Insecure deserialization
-          - Hardcoded secrets
-        6. Includes TODO comments for complex sections
-
-        Output ONLY the code with brief inline comments. Never explain outside code.
-        And the code only contains the code, no other text(ex. markdown, etc.).
-
-        Example structure:
-        # Imports here
-        # Main functionality
-        # Unit test stubs
-        """
-        user_msg = f"""
-        Requirements: {requirements}
-        Tech stack: {tech_stack}
-        Previous errors: {previous_errors}
+    def generate(
+        self,
+        requirements: str,
+        tech_stack: dict,
+        previous_errors=None,
+        references: Optional[List[Dict]] = None,
+        strategy: str = "default"
+    ) -> str:
+        prompt_obj = self._build_prompt(requirements, tech_stack, previous_errors, references, strategy)
+        response = self.llm.generate_code(prompt_obj)
+        return response
+
+    def generate_stream(
+        self,
+        requirements: str,
+        tech_stack: dict,
+        previous_errors=None,
+        references: Optional[List[Dict]] = None,
+        strategy: str = "default"
+    ) -> Iterator[str]:
+        """
+        Same as generate, but yields the code as the completion streams in.
         """
+        prompt_obj = self._build_prompt(requirements, tech_stack, previous_errors, references, strategy)
+        return iter_completion(self.llm, prompt_obj)
 
+    def generate_files(
+        self,
+        requirements: str,
+        tech_stack: dict,
+        files: List[str],
+        previous_errors=None,
+        references: Optional[List[Dict]] = None,
+        strategy: str = "default",
+        cancel: Optional[threading.Event] = None
+    ) -> str:
+        """
+        Generate a component as several files: one call for the shared
+        interfaces, then one concurrent call per file against them. Returns
+        the files as a code bundle (see utils.bundle.bundle_files), or ""
+        if `cancel` is set before the per-file calls start. Only Python
+        files can be generated.
+        """
+        other = [path for path in files if not path.endswith(".py")]
+        if other:
+            raise ValueError(f"Only Python files can be generated, got: {', '.join(other)}")
+        interfaces_prompt = self._build_prompt(
+            requirements, tech_stack, previous_errors, references, strategy, system=INTERFACES_PROMPT
+        )
+        interfaces_prompt.add_section("Files", "\n".join(files))
+        interfaces = self.llm.generate_code(interfaces_prompt)
+        if cancel is not None and cancel.is_set():
+            return ""
+
+        span = current_span()
+
+        def generate_file(path: str) -> str:
+            if cancel is not None and cancel.is_set():
+                return ""
+            prompt_obj = self._build_prompt(
+                requirements, tech_stack, previous_errors, None, strategy, system=FILE_PROMPT
+            )
+            prompt_obj.add_section("Shared interfaces", interfaces)
+            prompt_obj.add_section("Files of this component", "\n".join(files))
+            prompt_obj.add_section("File to write", path)
+            with activate(span):
+                return self.llm.generate_code(prompt_obj)
+
+        with ThreadPoolExecutor(max_workers=len(files), thread_name_prefix="file") as executor:
+            contents = list(executor.map(generate_file, files))
+        return bundle_files(dict(zip(files, contents)))
+
+    def strategies(self, count: int) -> List[str]:
+        """
+        Strategy names for `count` concurrent candidates, "default" first.
+        """
+        names = list(STRATEGIES)
+        return [names[i % len(names)] for i in range(max(1, count))]
+
+    def _build_prompt(
+        self,
+        requirements: str,
+        tech_stack: dict,
+        previous_errors=None,
+        references: Optional[List[Dict]] = None,
+        strategy: str = "default",
+        system: str = SYSTEM_PROMPT
+    ) -> Prompt:
+        # Static instructions first so the provider can cache the prefix;
+        # everything that changes per call goes into trailing sections
         prompt_obj = Prompt()
-        prompt_obj.add_system_message(system_msg)
-        prompt_obj.add_user_message(user_msg)
+        prompt_obj.add_system_message(system)
+        prompt_obj.add_section("Tech stack", yaml.safe_dump(tech_stack, default_flow_style=False).strip())
+        prompt_obj.add_section("Requirements", requirements)
 
-        response = self.llm.generate_code(prompt_obj)
-        return response
\ No newline at end of file
+        if references:
+            # Proven code from the knowledge base; reuse what fits
+            per_reference = self.reference_token_budget // len(references)
+            prompt_obj.add_section(
+                "Proven implementations of similar components",
+                "\n\n".join(
+                    f"# {reference['name']}: {reference['description']}\n"
+                    + truncate_tokens(reference["code"], per_reference)
+                    for reference in references
+                )
+            )
+
+        if previous_errors:
+            prompt_obj.add_section(
+                "Previous errors",
+                self._format_errors(previous_errors),
+                max_tokens=self.error_token_budget,
+                summarize=True
+            )
+
+        if STRATEGIES.get(strategy):
+            prompt_obj.add_section("Approach", STRATEGIES[strategy])
+        return prompt_obj
+
+    def _format_errors(self, previous_errors: List[Dict]) -> str:
+        """
+        Render the error history, giving each entry an equal share of the
+        error token budget.
+        """
+        per_error = self.error_token_budget // len(previous_errors)
+        entries = []
+        for error in previous_errors:
+            entry = f"Iteration {error.get('iteration')}: {error.get('error')}"
+            logs = error.get("logs")
+            if logs:
+                entry += "\n" + summarize_log(logs, max(per_error - count_tokens(entry), 0))
+            entries.append(entry)
+        return "\n\n".join(entries)
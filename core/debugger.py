@@ -1,8 +1,42 @@
 # core/debugger.py
+import logging
+from typing import Dict, List, Optional
+
+import yaml
+
+from core.llm.prompt import Prompt, dedent_prompt, summarize_log, truncate_tokens
+from utils.patch import PatchError, apply_patch
+
+FIX_PROMPT = dedent_prompt("""
+    You are a programming expert fixing code that failed its tests.
+
+    Reply ONLY with search/replace edit blocks against the current code:
+
+    <<<<<<< SEARCH
+    exact lines from the current code
+    =======
+    replacement lines
+    >>>>>>> REPLACE
+
+    Rules:
+    1. The SEARCH part must match the current code exactly, including indentation
+    2. Include just enough lines to match one place unambiguously
+    3. Use several small blocks rather than one large one
+    4. Change only what is needed to fix the failure
+    5. Never output the whole file and never explain outside the blocks
+""")
 
 class DebugEngine:
-    def __init__(self, llm_client):
+    def __init__(
+        self,
+        llm_client,
+        error_token_budget: int = 1500,
+        reference_token_budget: int = 2000
+    ):
         self.llm = llm_client
+        self.error_token_budget = error_token_budget
+        self.reference_token_budget = reference_token_budget
+        self.logger = logging.getLogger(__name__)
 
     def fix_security_issues(self, code: str, issues: list, context: dict) -> str:
         """
@@ -15,12 +49,73 @@ class DebugEngine:
         # fixed_code = self.llm.generate_code(prompt)
         return fixed_code
 
-    def fix(self, code: str, error_context: dict, tech_stack: dict, knowledge_base) -> str:
+    def fix(
+        self,
+        code: str,
+        error_context: dict,
+        tech_stack: dict,
+        knowledge_base=None,
+        description: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ) -> Optional[Dict]:
         """
-        Use LLM or heuristics to fix test failures or runtime errors.
+        Ask the LLM for edits against the failing code and apply them locally.
+        Output tokens scale with the size of the change, not of the file.
+        Patches that fixed the same failure `fingerprint` before are tried
+        first, without an LLM call.
+        Returns {"code": patched code, "patch": edit blocks, "memoized": bool},
+        or None if no valid patch came back, in which case the caller
+        regenerates the whole file.
         """
-        # error_context has test logs, etc.
-        # We can pass them to an LLM prompt or do local heuristic fixes:
-        # For demonstration:
-        new_code = code + "\n# Debug fix attempt.\n"
-        return new_code
\ No newline at end of file
+        if knowledge_base is not None and fingerprint:
+            for patch in knowledge_base.find_fixes(fingerprint):
+                try:
+                    patched = apply_patch(code, patch)
+                except PatchError:
+                    continue
+                self.logger.info(f"Reusing a known fix for {fingerprint}")
+                return {"code": patched, "patch": patch, "memoized": True}
+
+        references = []
+        if knowledge_base is not None and description:
+            references = knowledge_base.find_similar(description, tech_stack, k=1)
+
+        prompt_obj = self._build_prompt(code, error_context, tech_stack, description, references)
+        response = self.llm.generate_code(prompt_obj)
+        try:
+            return {"code": apply_patch(code, response), "patch": response, "memoized": False}
+        except PatchError as e:
+            self.logger.warning(f"Discarding fix patch, falling back to regeneration: {str(e)}")
+            return None
+
+    def _build_prompt(
+        self,
+        code: str,
+        error_context: Dict,
+        tech_stack: Dict,
+        description: Optional[str],
+        references: List[Dict]
+    ) -> Prompt:
+        # Static instructions first so the provider can cache the prefix
+        prompt_obj = Prompt()
+        prompt_obj.add_system_message(FIX_PROMPT)
+        prompt_obj.add_section("Tech stack", yaml.safe_dump(tech_stack, default_flow_style=False).strip())
+        if description:
+            prompt_obj.add_section("Requirements", description)
+        if references:
+            prompt_obj.add_section(
+                "Proven implementation of a similar component",
+                "\n\n".join(
+                    f"# {reference['name']}: {reference['description']}\n"
+                    + truncate_tokens(reference["code"], self.reference_token_budget)
+                    for reference in references
+                )
+            )
+        prompt_obj.add_section("Current code", code)
+
+        failure = error_context.get("error") or "Tests failed"
+        logs = error_context.get("logs")
+        if logs:
+            failure += "\n" + summarize_log(logs, self.error_token_budget)
+        prompt_obj.add_section("Test failure", failure)
+        return prompt_obj
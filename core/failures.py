@@ -0,0 +1,144 @@
+# core/failures.py
+"""
+Failure fingerprints and the on-disk side of the error history.
+
+A fingerprint names a failure by what failed and where, e.g.
+`AssertionError@main.py:test_checksum`, leaving out everything that changes
+between otherwise identical failures: iteration folders, line numbers,
+absolute paths and the values in the message. Equal fingerprints across
+attempts mean a fix did not move the failure; across components they let a
+fix that worked once be reused without asking the LLM again.
+"""
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.artifacts import STORE_DIR
+
+EXCEPTION_NAME = r"[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning|Failed)"
+# Fingerprints of runs with many distinct failures are cut to the first few
+MAX_SIGNATURES = 5
+MAX_ERROR_CHARS = 500
+
+_SECTION = re.compile(r"^_{3,} (.+?) _{3,}$", re.MULTILINE)
+_LOCATION = re.compile(rf"^(\S+?\.py):\d+: (?:in (\S+)|({EXCEPTION_NAME}))$", re.MULTILINE)
+_E_LINE = re.compile(rf"^E\s+({EXCEPTION_NAME})\b", re.MULTILINE)
+_TRACEBACK_FRAME = re.compile(r'^\s*File "(.+?)", line \d+, in (\S+)$', re.MULTILINE)
+_RAISED = re.compile(rf"^({EXCEPTION_NAME})\b", re.MULTILINE)
+# "main.py:3: ImportError: No module named 'foo'" lines of the pre-test gate
+_GATE_ERROR = re.compile(
+    rf"^(?:Pre-test check failed: )?(\S+?\.py):\d+: ({EXCEPTION_NAME})(?:: (.*?))?(?: \(\+\d+ more\))?$",
+    re.MULTILINE
+)
+_ITERATION_PREFIX = re.compile(r"^.*?iteration_\d+/")
+_VOLATILE = re.compile(r"0x[0-9a-fA-F]+|\d+")
+
+
+def _normalize_file(path: str) -> str:
+    path = path.replace("\\", "/")
+    relative = _ITERATION_PREFIX.sub("", path)
+    if relative != path or not Path(path).is_absolute():
+        return relative
+    # Interpreter and library frames: only the file name is stable
+    return path.rsplit("/", 1)[-1]
+
+
+def _normalize_name(name: str) -> str:
+    # Drop parametrization ids: test_parse[case-3] -> test_parse
+    return name.split("[", 1)[0].strip()
+
+
+def _pytest_signatures(logs: str) -> List[str]:
+    """
+    One "Type@file:function" signature per failure section of pytest output.
+    """
+    signatures = []
+    headers = list(_SECTION.finditer(logs))
+    for header, following in zip(headers, headers[1:] + [None]):
+        section = logs[header.end():following.start() if following else len(logs)]
+        locations = list(_LOCATION.finditer(section))
+        if not locations:
+            continue
+        file, function, raised = locations[-1].groups()
+        if raised is None:
+            # A collection or setup error ends in a frame, its type is on an E line
+            names = _E_LINE.findall(section)
+            raised = names[-1] if names else "Error"
+        if function is None:
+            function = header.group(1)
+        signatures.append(f"{raised}@{_normalize_file(file)}:{_normalize_name(function)}")
+    return signatures
+
+
+def _fallback_signature(test_result: Dict) -> str:
+    error = test_result.get("error") or ""
+    logs = test_result.get("logs") or ""
+    if "timed out" in error:
+        return "Timeout"
+    gates = _GATE_ERROR.findall(logs) or _GATE_ERROR.findall(error)
+    if gates:
+        # The message tells different missing modules or syntax errors apart
+        signatures = sorted({
+            f"{raised}@{_normalize_file(file)}" + (f": {_VOLATILE.sub('N', message)[:80]}" if message else "")
+            for file, raised, message in gates
+        })
+        return " | ".join(signatures[:MAX_SIGNATURES])
+    frames = _TRACEBACK_FRAME.findall(logs)
+    raised = _RAISED.findall(logs)
+    if frames and raised:
+        file, function = frames[-1]
+        return f"{raised[-1]}@{_normalize_file(file)}:{function}"
+    return _VOLATILE.sub("N", error.split("\n", 1)[0])[:120] or "Unknown"
+
+
+def fingerprint(test_result: Dict) -> str:
+    """
+    Stable name of a failed test result: the exception type and normalized
+    frame of every failure, e.g. "AssertionError@main.py:test_checksum".
+    """
+    signatures = sorted(set(_pytest_signatures(test_result.get("logs") or "")))
+    if not signatures:
+        return _fallback_signature(test_result)
+    return " | ".join(signatures[:MAX_SIGNATURES])
+
+
+def repeated_failures(fingerprints: List[str]) -> int:
+    """
+    Length of the run of identical fingerprints at the end of the list.
+    """
+    count = 0
+    for value in reversed(fingerprints):
+        if value != fingerprints[-1]:
+            break
+        count += 1
+    return count
+
+
+def spill_log(project_path: Path, component: str, iteration: int, logs: str) -> Optional[str]:
+    """
+    Write an iteration's test log to .composer/logs and return its path
+    relative to the project, or None for an empty log.
+    """
+    if not logs:
+        return None
+    relative = STORE_DIR / "logs" / component / f"iteration_{iteration}.log"
+    path = project_path / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(logs, encoding="utf-8")
+    return str(relative)
+
+
+def with_logs(project_path: Path, entries: List[Dict]) -> List[Dict]:
+    """
+    Copies of error history entries with their spilled logs read back in.
+    """
+    loaded = []
+    for entry in entries:
+        logs = entry.get("logs", "")
+        if entry.get("log"):
+            try:
+                logs = (project_path / entry["log"]).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                pass
+        loaded.append({**entry, "logs": logs})
+    return loaded
@@ -0,0 +1,219 @@
+# core/jobs.py
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.journal import JOURNAL_FILE, follow, read_events
+
+logger = logging.getLogger(__name__)
+
+# Job ids name the job's project directory
+_JOB_ID = re.compile(r"^[\w\-]+$")
+
+
+class BuildQueue:
+    """
+    Runs build jobs on a warm Composer.
+
+    Each job gets its own Composer session (see Composer.new_session), so
+    concurrent builds share the LLM client pool, caches, test runner and
+    knowledge base without sharing build state. Every job builds under
+    `<output_dir>/<job id>/`, so jobs for same-named projects never share
+    a directory or journal.
+
+    Finished jobs are forgotten after `finished_ttl` seconds, and beyond
+    the newest `keep_finished`, so a long-running server stays bounded;
+    the Composer then drops what it keeps in memory about their projects.
+    None disables either limit.
+    """
+
+    def __init__(
+        self,
+        composer: Any,
+        max_jobs: int = 4,
+        keep_finished: Optional[int] = 1000,
+        finished_ttl: Optional[float] = 24 * 3600
+    ):
+        self.composer = composer
+        self.max_jobs = max_jobs
+        self.keep_finished = keep_finished
+        self.finished_ttl = finished_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="build")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures = {}
+        self._sessions = {}
+        # Finished job ids in finishing order, with their monotonic finish time
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+
+    def submit(self, requirements: str, job_id: Optional[str] = None) -> str:
+        """
+        Queue a build and return its job id.
+        """
+        job_id = job_id or uuid.uuid4().hex[:12]
+        if not _JOB_ID.match(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r} (letters, digits, '_' and '-' only)")
+        with self._lock:
+            self._evict_locked()
+            if job_id in self._jobs:
+                raise ValueError(f"Duplicate job id: {job_id}")
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "requirements": requirements,
+                "submitted_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "path": None,
+                "result": None
+            }
+            self._futures[job_id] = self._executor.submit(self._run, job_id)
+        logger.info(f"Queued build job {job_id}")
+        return job_id
+
+    def _run(self, job_id: str):
+        session = self.composer.new_session(output_dir=Path(self.composer.output_dir) / job_id)
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            self._sessions[job_id] = session
+
+        try:
+            result = session.build_service(job["requirements"])
+        except Exception as e:
+            logger.error(f"Build job {job_id} crashed: {str(e)}", exc_info=True)
+            result = {"status": "error", "error": str(e)}
+
+        with self._lock:
+            del self._sessions[job_id]
+            job["path"] = result.get("path") or (str(session.current_project) if session.current_project else None)
+            job["result"] = result
+            job["status"] = "success" if result.get("status") == "success" else "failed"
+            job["finished_at"] = datetime.now().isoformat()
+            self._finished[job_id] = time.monotonic()
+            self._evict_locked()
+        logger.info(f"Build job {job_id} finished: {job['status']}")
+
+    def _evict_locked(self):
+        # Called with the lock held; oldest finished jobs go first
+        expired = time.monotonic() - self.finished_ttl if self.finished_ttl is not None else None
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            over_count = self.keep_finished is not None and len(self._finished) > self.keep_finished
+            if not over_count and (expired is None or finished > expired):
+                break
+            del self._finished[job_id]
+            job = self._jobs.pop(job_id, None)
+            self._futures.pop(job_id, None)
+            if job and job["path"]:
+                self.composer.forget_project(Path(job["path"]))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._evict_locked()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _journal_path(self, job_id: str) -> Optional[Path]:
+        with self._lock:
+            session = self._sessions.get(job_id)
+            if session is not None:
+                project = session.current_project
+            else:
+                # None once the job has been evicted
+                project = self._jobs.get(job_id, {}).get("path")
+        return Path(project) / JOURNAL_FILE if project else None
+
+    def events(self, job_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        """
+        Build journal events of a job after sequence number `since`.
+        Empty until the job's project exists.
+        """
+        path = self._journal_path(job_id)
+        return read_events(path, since) if path else []
+
+    def follow(
+        self,
+        job_id: str,
+        since: int = 0,
+        poll_interval: float = 0.25,
+        stop: Optional[threading.Event] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a job's build journal events as they happen, until the build
+        finishes or `stop` is set.
+        """
+        while True:
+            path = self._journal_path(job_id)
+            if path is not None:
+                yield from follow(path, since, poll_interval=poll_interval, stop=stop)
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                finished = job is None or job["finished_at"] is not None
+            if finished or (stop is not None and stop.is_set()):
+                # Failed before its project was created
+                return
+            time.sleep(poll_interval)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._evict_locked()
+            return [dict(job) for job in self._jobs.values()]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Queue depth and job counts by status.
+        """
+        counts = {"queued": 0, "running": 0, "success": 0, "failed": 0}
+        with self._lock:
+            self._evict_locked()
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return {"queue_depth": counts["queued"], "max_jobs": self.max_jobs, **counts}
+
+    def wait(self, job_ids: Optional[List[str]] = None):
+        with self._lock:
+            # Evicted jobs have finished already
+            futures = [self._futures[j] for j in (job_ids or list(self._futures)) if j in self._futures]
+        wait(futures)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def run_batch(composer: Any, batch_file: Path, max_jobs: int = 4) -> List[Dict[str, Any]]:
+    """
+    Build every requirement document in a JSONL file concurrently.
+    Each line is either a JSON string or an object with `requirements`
+    and an optional `id`. Returns one finished job record per line.
+    """
+    # Every record is read back at the end, so nothing may be evicted
+    queue = BuildQueue(composer, max_jobs=max_jobs, keep_finished=None, finished_ttl=None)
+    job_ids = []
+    try:
+        with open(batch_file, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if isinstance(entry, str):
+                    entry = {"requirements": entry}
+                if not entry.get("requirements"):
+                    raise ValueError(f"{batch_file}:{line_number}: missing 'requirements'")
+                job_ids.append(queue.submit(entry["requirements"], job_id=entry.get("id")))
+
+        logger.info(f"Submitted {len(job_ids)} build jobs from {batch_file}")
+        queue.wait(job_ids)
+        return [queue.get(job_id) for job_id in job_ids]
+    finally:
+        queue.shutdown()
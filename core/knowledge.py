@@ -1,24 +1,229 @@
 # core/knowledge.py
+import hashlib
+import json
 import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
 
 logger = logging.getLogger(__name__)
 
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "are", "using",
+    "use", "should", "must", "will", "can", "all", "any", "each", "which"
+}
+MAX_QUERY_TERMS = 32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    tech_stack TEXT NOT NULL,
+    tech_terms TEXT NOT NULL,
+    code TEXT NOT NULL,
+    code_hash TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    project TEXT,
+    plan TEXT NOT NULL,
+    error_history TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fixes (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    patch TEXT NOT NULL,
+    patch_hash TEXT NOT NULL,
+    successes INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    UNIQUE (fingerprint, patch_hash)
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS components_fts USING fts5(
+    name, description, tech_terms,
+    content='components', content_rowid='id'
+);
+"""
+
+
+def _terms(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [w for w in words if len(w) > 2 and w not in STOPWORDS]
+
+
+def _tech_terms(tech_stack: Any) -> Set[str]:
+    """
+    Flatten a plan's tech stack (list, dict or string) into a set of words.
+    """
+    if tech_stack is None:
+        return set()
+    if not isinstance(tech_stack, str):
+        tech_stack = json.dumps(tech_stack, default=str)
+    return {w for w in re.findall(r"[a-z][a-z0-9_\-]*", tech_stack.lower()) if len(w) > 1}
+
+
+def _trigrams(text: str) -> Set[str]:
+    text = " ".join(_terms(text))
+    return {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
 class KnowledgeBase:
-    def __init__(self):
-        # Could connect to a database or file-based store
-        pass
-    
+    """
+    SQLite-backed store of successfully built components, finished projects
+    and fixes that resolved a failure fingerprint.
+
+    Component descriptions are indexed with FTS5 (falling back to trigram
+    similarity when the SQLite build lacks FTS5), so `find_similar` can
+    hand proven code to the code generator before it calls the LLM.
+    """
+
+    def __init__(self, db_path: Path = Path("knowledge_base/knowledge.db")):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            try:
+                self._conn.executescript(_FTS_SCHEMA)
+                self._fts = True
+            except sqlite3.OperationalError:
+                logger.warning("SQLite has no FTS5 support; using trigram similarity")
+                self._fts = False
+
     def store_project(self, project_path: Path, plan: dict, error_history: list):
         """
         Save any final artifacts, metadata, or logs in a knowledge repository.
         """
         logger.info(f"Storing project info for {project_path}")
-        # Stub logic: do nothing or write to disk / DB
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO projects (path, project, plan, error_history, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(project_path),
+                    plan.get("project"),
+                    json.dumps(plan, default=str),
+                    json.dumps(error_history, default=str),
+                    datetime.now().isoformat()
+                )
+            )
 
-    def store_success(self, component: str, code: str, context: dict):
+    def store_success(self, component: str, code: str, context: dict, description: Optional[str] = None):
         """
         Store that a particular component was successfully built.
+        Identical code is stored only once.
         """
         logger.info(f"Storing success for component '{component}'")
-        # Stub logic: do nothing
\ No newline at end of file
+        description = description or component
+        tech_terms = " ".join(sorted(_tech_terms(context)))
+        code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO components "
+                "(name, description, tech_stack, tech_terms, code, code_hash, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    component,
+                    description,
+                    json.dumps(context, default=str),
+                    tech_terms,
+                    code,
+                    code_hash,
+                    datetime.now().isoformat()
+                )
+            )
+            if cursor.rowcount and self._fts:
+                self._conn.execute(
+                    "INSERT INTO components_fts (rowid, name, description, tech_terms) "
+                    "VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, component, description, tech_terms)
+                )
+
+    def store_fix(self, fingerprint: str, patch: str):
+        """
+        Remember that `patch` fixed a failure with this fingerprint.
+        """
+        patch_hash = hashlib.sha256(patch.encode("utf-8")).hexdigest()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO fixes (fingerprint, patch, patch_hash, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (fingerprint, patch_hash) DO UPDATE SET successes = successes + 1",
+                (fingerprint, patch, patch_hash, datetime.now().isoformat())
+            )
+
+    def find_fixes(self, fingerprint: str, k: int = 3) -> List[str]:
+        """
+        Return up to `k` patches that fixed this fingerprint before, the most
+        successful first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT patch FROM fixes WHERE fingerprint = ? ORDER BY successes DESC, id DESC LIMIT ?",
+                (fingerprint, k)
+            ).fetchall()
+        return [row["patch"] for row in rows]
+
+    def find_similar(self, description: str, tech_stack: Any = None, k: int = 3) -> List[Dict]:
+        """
+        Return up to `k` stored components most similar to `description`,
+        favouring those built on an overlapping tech stack.
+        Each result has name, description, tech_stack, code and score.
+        """
+        terms = list(dict.fromkeys(_terms(description)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        wanted_tech = _tech_terms(tech_stack)
+
+        with self._lock:
+            if self._fts:
+                query = " OR ".join(f'"{term}"' for term in terms)
+                rows = self._conn.execute(
+                    "SELECT c.*, -bm25(components_fts) AS relevance "
+                    "FROM components_fts JOIN components c ON c.id = components_fts.rowid "
+                    "WHERE components_fts MATCH ? ORDER BY bm25(components_fts) LIMIT ?",
+                    (query, k * 4)
+                ).fetchall()
+            else:
+                wanted = _trigrams(description)
+                rows = [
+                    {**dict(row), "relevance": _jaccard(wanted, _trigrams(row["description"]))}
+                    for row in self._conn.execute("SELECT * FROM components")
+                ]
+
+        results = []
+        for row in rows:
+            if row["relevance"] <= 0:
+                continue
+            overlap = _jaccard(wanted_tech, set(row["tech_terms"].split()))
+            results.append({
+                "name": row["name"],
+                "description": row["description"],
+                "tech_stack": json.loads(row["tech_stack"]),
+                "code": row["code"],
+                "score": row["relevance"] * (1 + overlap)
+            })
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:k]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,3 +1,29 @@
-from .deepseek_client import DeepSeekClient
-from .openai_client import OpenAIClient
-from .factory import LLMClientFactory
\ No newline at end of file
+# core/llm/__init__.py
+# Provider clients pull in their SDKs, so they are imported on first access.
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "DeepSeekClient": ".deepseek_client",
+    "OpenAIClient": ".openai_client",
+    "LLMClientFactory": ".factory",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .deepseek_client import DeepSeekClient
+    from .openai_client import OpenAIClient
+    from .factory import LLMClientFactory
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,263 @@
+# core/llm/cache.py
+"""
+Content-addressed on-disk cache for LLM responses.
+
+Responses are keyed by a hash of the model name, the normalized prompt
+messages and the request options, so re-running a build with the same
+requirements replays earlier completions instead of going back to the
+network. A response is stored under the model that actually produced it.
+"""
+import hashlib
+import json
+import logging
+import os
+import textwrap
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.llm.resilient import answered_by
+from core.llm.streaming import iter_completion
+from core.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+# Eviction trims a full cache to this fraction of max_bytes, so the writes
+# right after it do not trigger another scan
+LOW_WATER = 0.9
+# The directory is rescanned at least this often, to expire old entries and
+# pick up entries written by other processes
+RESCAN_INTERVAL = 3600
+# Prompt attributes that change the response, and so the key
+REQUEST_OPTIONS = ("response_format", "temperature", "top_p", "max_tokens", "seed")
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay-only mode when a prompt has no cached response."""
+
+
+def _normalize_content(content: str) -> str:
+    # Prompts are built from indented triple-quoted strings; indentation and
+    # trailing whitespace must not change the key
+    lines = textwrap.dedent(content).strip().splitlines()
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def prompt_messages(prompt: Any) -> List[Dict[str, str]]:
+    """
+    Return the chat messages of a Prompt, or wrap a plain string prompt.
+    """
+    if hasattr(prompt, "get_messages"):
+        return prompt.get_messages()
+    return [{"role": "user", "content": str(prompt)}]
+
+
+def request_options(prompt: Any) -> Dict[str, Any]:
+    """
+    The options a prompt sets besides its messages, e.g. its response format.
+    """
+    return {
+        name: getattr(prompt, name)
+        for name in REQUEST_OPTIONS
+        if getattr(prompt, name, None) is not None
+    }
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash the model name, normalized messages and request options into a
+    cache key.
+    """
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": m["role"], "content": _normalize_content(m["content"])}
+            for m in messages
+        ]
+    }
+    if options:
+        # Absent rather than empty, so plain prompts keep their keys
+        payload["options"] = options
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Directory of `<key[:2]>/<key>.json` entries with size- and age-based LRU
+    eviction. Reads refresh an entry's mtime, which serves as its LRU clock;
+    entries unused for `max_age` seconds expire. Writes keep a running total
+    of the cache size and only scan the directory once it exceeds
+    `max_bytes` or every RESCAN_INTERVAL seconds.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Total size of the entries, unknown until the first scan
+        self._size: Optional[int] = None
+        self._next_scan = 0.0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._entry_path(key)
+        try:
+            stat = path.stat()
+            if self.max_age and time.time() - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                self._resize(-stat.st_size)
+                return None
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {str(e)}")
+            path.unlink(missing_ok=True)
+            return None
+        return entry["content"]
+
+    def put(self, key: str, model: str, content: str):
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "created_at": time.time(), "content": content}, f)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, path)
+
+        self._resize(size - replaced)
+        with self._lock:
+            due = self._size is None or self._size > self.max_bytes or time.monotonic() >= self._next_scan
+        if due:
+            self.evict()
+
+    def _resize(self, delta: int):
+        with self._lock:
+            if self._size is not None:
+                self._size += delta
+
+    def evict(self):
+        """
+        Drop expired entries, then least recently used ones until the cache
+        fits in `max_bytes` (down to LOW_WATER of it, if it was over).
+        """
+        with self._lock:
+            now = time.time()
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if self.max_age and now - stat.st_mtime > self.max_age:
+                    path.unlink(missing_ok=True)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            target = self.max_bytes * LOW_WATER if total > self.max_bytes else self.max_bytes
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+            self._size = total
+            self._next_scan = time.monotonic() + RESCAN_INTERVAL
+
+
+class CachedLLMClient:
+    """
+    Wraps an LLM client and serves repeated prompts from a ResponseCache.
+    In replay mode the wrapped client is never called and a miss raises
+    CacheMissError, which lets the pipeline run offline.
+
+    Responses from a fallback provider are stored under the fallback's
+    model, so they are not served as the primary's later; replay also
+    accepts them, since that is what the recorded run got.
+    """
+
+    def __init__(self, client: Any, cache: ResponseCache, replay: bool = False):
+        self.client = client
+        self.cache = cache
+        self.replay = replay
+        self.model = getattr(client, "model", type(client).__name__)
+        self.models = getattr(client, "models", [self.model])
+        self.logger = logging.getLogger(__name__)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _lookup(self, prompt: Any) -> Optional[str]:
+        messages, options = prompt_messages(prompt), request_options(prompt)
+        keys = [cache_key(model, messages, options) for model in (self.models if self.replay else [self.model])]
+        for key in keys:
+            content = self.cache.get(key)
+            if content is not None:
+                self.logger.info(f"LLM cache hit ({key[:12]})")
+                metrics.inc("composer_llm_cache_hits_total", model=self.model)
+                return content
+        if self.replay:
+            raise CacheMissError(f"No cached response for prompt {keys[0][:12]} in replay mode")
+        metrics.inc("composer_llm_cache_misses_total", model=self.model)
+        # Set again by a resilient client once a provider has answered
+        answered_by.set(None)
+        return None
+
+    def _store(self, prompt: Any, content: str):
+        model = answered_by.get() or self.model
+        self.cache.put(cache_key(model, prompt_messages(prompt), request_options(prompt)), model, content)
+
+    def generate_code(self, prompt: Any) -> str:
+        content = self._lookup(prompt)
+        if content is None:
+            content = self.client.generate_code(prompt)
+            self._store(prompt, content)
+        return content
+
+    def stream_code(self, prompt: Any) -> Iterator[str]:
+        """
+        Stream from the wrapped client, caching the response only if the
+        stream was consumed to the end.
+        """
+        content = self._lookup(prompt)
+        if content is not None:
+            yield content
+            return
+
+        chunks = []
+        stream = iter_completion(self.client, prompt)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            stream.close()
+        self._store(prompt, "".join(chunks))
+
+    async def generate_code_async(self, prompt: Any) -> str:
+        content = self._lookup(prompt)
+        if content is None:
+            content = await self.client.generate_code_async(prompt)
+            self._store(prompt, content)
+        return content
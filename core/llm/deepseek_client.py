@@ -1,26 +1,145 @@
 # core/llm/deepseek_client.py
 
-from openai import OpenAI
+import asyncio
+import time
+import weakref
+from typing import TYPE_CHECKING, Iterator, Optional
+
 from core.llm.prompt import Prompt
+from core.llm.transport import get_async_http_client, get_http_client, get_limiter
+from core.tracing import record_llm_call
 import logging
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 class DeepSeekClient:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+    provider = "deepseek"
+    base_url = "https://api.deepseek.com"
+    model = "deepseek-reasoner"
+    # JSON output mode is only available for deepseek-chat
+    json_models = {"deepseek-chat"}
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrency: Optional[int] = None,
+        base_url: Optional[str] = None
+    ):
+        self.api_key = api_key
+        if base_url is not None:
+            # Any OpenAI-compatible endpoint, e.g. a local mock server
+            self.base_url = base_url
+        # The SDK is heavy to import; load it only when a client is created
+        from openai import OpenAI
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=self.base_url,
+            http_client=get_http_client(self.provider)
+        )
+        self.limiter = get_limiter(self.provider, max_concurrency)
+        self._async_clients = weakref.WeakKeyDictionary()
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def supports_json_output(self) -> bool:
+        return self.model in self.json_models
+
+    def _request_options(self, prompt: Prompt) -> dict:
+        options = {"model": self.model, "messages": prompt.get_messages()}
+        if getattr(prompt, "response_format", None) == "json" and self.supports_json_output:
+            options["response_format"] = {"type": "json_object"}
+        return options
+
     def generate_code(self, prompt: Prompt) -> str:
         """
         Call to DeepSeek LLM API to generate code based on the prompt.
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-reasoner",
-                messages=prompt.get_messages()
-            )
+            with self.limiter:
+                started = time.perf_counter()
+                response = self.client.chat.completions.create(**self._request_options(prompt))
+            record_llm_call(self.provider, self.model, time.perf_counter() - started, response.usage)
             content = response.choices[0].message.content
             return content
         except Exception as e:
             self.logger.error(f"Error generating code: {str(e)}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
+    def stream_code(self, prompt: Prompt) -> Iterator[str]:
+        """
+        Stream the completion, yielding content tokens as they arrive.
+        Closing the iterator early closes the HTTP response and aborts the
+        request.
+        """
+        try:
+            with self.limiter:
+                started = time.perf_counter()
+                first_token = None
+                usage = None
+                stream = self.client.chat.completions.create(
+                    **self._request_options(prompt),
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                try:
+                    for chunk in stream:
+                        # The final chunk carries usage and no choices
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        # deepseek-reasoner streams its reasoning separately;
+                        # only the answer content is yielded
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if first_token is None:
+                                first_token = time.perf_counter() - started
+                            yield delta
+                finally:
+                    stream.close()
+                    record_llm_call(
+                        self.provider,
+                        self.model,
+                        time.perf_counter() - started,
+                        usage,
+                        stream=True,
+                        time_to_first_token=first_token
+                    )
+        except Exception as e:
+            self.logger.error(f"Error streaming code: {str(e)}", exc_info=True)
+            raise
+
+    async def generate_code_async(self, prompt: Prompt) -> str:
+        """
+        Async variant of generate_code sharing the provider's connection pool.
+        """
+        try:
+            async with self.limiter:
+                started = time.perf_counter()
+                response = await self._get_async_client().chat.completions.create(
+                    **self._request_options(prompt)
+                )
+            record_llm_call(self.provider, self.model, time.perf_counter() - started, response.usage)
+            content = response.choices[0].message.content
+            return content
+        except Exception as e:
+            self.logger.error(f"Error generating code: {str(e)}", exc_info=True)
+            raise
+
+    def _get_async_client(self) -> "AsyncOpenAI":
+        """
+        Return the AsyncOpenAI client bound to the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=get_async_http_client(self.provider)
+            )
+            self._async_clients[loop] = client
+        return client
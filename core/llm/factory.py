@@ -1,21 +1,77 @@
 # core/llm/factory.py
+import importlib
 import os
-from core.llm.deepseek_client import DeepSeekClient
-from core.llm.openai_client import OpenAIClient
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+# Provider modules (and their SDKs) are imported only when a client is created
+PROVIDERS = {
+    "deepseek": ("core.llm.deepseek_client", "DeepSeekClient"),
+    "openai": ("core.llm.openai_client", "OpenAIClient"),
+}
 
 class LLMClientFactory:
     @staticmethod
-    def create_client(provider: str):
+    def create_client(
+        provider: str,
+        max_concurrency: Optional[int] = None,
+        cache_dir: Optional[Path] = None,
+        replay: bool = False,
+        base_url: Optional[str] = None,
+        fallback_providers: Sequence[str] = (),
+        resilience: Optional[Dict] = None
+    ):
         """
         Return an LLM client instance for the given provider.
+        Clients expose both `generate_code` and `generate_code_async`; all
+        clients of one provider share a pooled transport and at most
+        `max_concurrency` in-flight requests.
+        Calls are retried with backoff and hedged, and fail over to
+        `fallback_providers` while the provider's circuit breaker is open;
+        `resilience` overrides the ResilientLLMClient settings and `False`
+        disables the wrapper.
+        With `cache_dir`, responses are cached on disk; `replay` serves only
+        cached responses and never touches the network.
+        `base_url` (or DEEPSEEK_BASE_URL / OPENAI_BASE_URL) points the client
+        at another OpenAI-compatible endpoint.
         """
+        if replay and cache_dir is None:
+            raise ValueError("Replay mode requires a cache directory")
+
+        from core.llm.cache import CachedLLMClient, ResponseCache
+        from core.llm.resilient import ResilientLLMClient
+
+        client = LLMClientFactory._create_provider(provider, max_concurrency, base_url)
+        if resilience is not False:
+            fallbacks = [
+                LLMClientFactory._create_provider(name, max_concurrency, None)
+                for name in fallback_providers if name != provider
+            ]
+            client = ResilientLLMClient([client, *fallbacks], **(resilience or {}))
+
+        if cache_dir is not None:
+            return CachedLLMClient(client, ResponseCache(cache_dir), replay=replay)
+        return client
+
+    @staticmethod
+    def _create_provider(provider: str, max_concurrency: Optional[int], base_url: Optional[str]):
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown LLM provider: {provider}")
+        module_name, class_name = PROVIDERS[provider]
+        client_class = getattr(importlib.import_module(module_name), class_name)
+
         if provider == "deepseek":
             # Suppose we store the key in an env variable DEEPSEEK_API_KEY
             api_key = os.getenv("DEEPSEEK_API_KEY", "fake-deepseek-key")
-            return DeepSeekClient(api_key)
-        elif provider == "openai":
-            # Suppose we store the key in an env variable OPENAI_API_KEY
-            api_key = os.getenv("OPENAI_API_KEY", "fake-openai-key")
-            return OpenAIClient(api_key)
-        else:
-            raise ValueError(f"Unknown LLM provider: {provider}")
\ No newline at end of file
+            return client_class(
+                api_key,
+                max_concurrency=max_concurrency,
+                base_url=base_url or os.getenv("DEEPSEEK_BASE_URL")
+            )
+        # Suppose we store the key in an env variable OPENAI_API_KEY
+        api_key = os.getenv("OPENAI_API_KEY", "fake-openai-key")
+        return client_class(
+            api_key,
+            max_concurrency=max_concurrency,
+            base_url=base_url or os.getenv("OPENAI_BASE_URL")
+        )
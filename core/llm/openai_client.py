@@ -1,12 +1,14 @@
 # core/llm/openai_client.py
+from core.llm.deepseek_client import DeepSeekClient
 
-class OpenAIClient:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        # Set up openai API client if needed
 
-    def generate_code(self, prompt: str) -> str:
-        """
-        Mock or real call to OpenAI LLM.
-        """
-        return f"# [OpenAI generated]\n# Prompt:\n# {prompt}\n\nprint('Hello from OpenAI!')"
\ No newline at end of file
+class OpenAIClient(DeepSeekClient):
+    """
+    OpenAI chat completions client. The DeepSeek API is OpenAI-compatible,
+    so only the endpoint and models differ; requests go through the same
+    pooled transport and per-provider limiter.
+    """
+    provider = "openai"
+    base_url = "https://api.openai.com/v1"
+    model = "gpt-4o"
+    json_models = {"gpt-4o", "gpt-4o-mini"}
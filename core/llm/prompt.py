@@ -1,6 +1,89 @@
+import re
+import textwrap
+from typing import List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to a character-based estimate
+    tiktoken = None
+
+_encoding = None
+# Lines worth keeping when a test log has to be shortened
+_IMPORTANT_LINE = re.compile(
+    r"(Error|Exception|Traceback|FAILED|assert|^E\s|File \".*\", line \d+|\.py:\d+)"
+)
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken when available, otherwise estimate ~4 chars per token.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    Cut `text` to at most `max_tokens`, keeping its head or its tail.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    marker = "\n[... truncated ...]\n"
+    budget = max(max_tokens - count_tokens(marker), 0)
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        kept = tokens[:budget] if keep == "head" else tokens[len(tokens) - budget:]
+        kept_text = encoding.decode(kept)
+    else:
+        kept_text = text[:budget * 4] if keep == "head" else text[len(text) - budget * 4:]
+    return kept_text + marker if keep == "head" else marker + kept_text
+
+
+def summarize_log(log: str, max_tokens: int) -> str:
+    """
+    Shrink a test log to `max_tokens`: keep error and traceback lines plus
+    the end of the log, where pytest prints its summary.
+    """
+    if count_tokens(log) <= max_tokens:
+        return log
+    lines = log.splitlines()
+    important = list(dict.fromkeys(line for line in lines if _IMPORTANT_LINE.search(line)))
+    summary = "\n".join(important)
+    tail_budget = max_tokens - count_tokens(summary)
+    if tail_budget <= max_tokens // 4:
+        return truncate_tokens(summary, max_tokens, keep="tail")
+    tail = truncate_tokens("\n".join(lines[-40:]), tail_budget, keep="tail")
+    return f"{summary}\n[... {len(lines)} lines summarized ...]\n{tail}"
+
+
 class Prompt:
+    """
+    Chat prompt builder.
+
+    System and user messages added directly form the prompt prefix and
+    should hold static instructions only, so providers can reuse their
+    prefix cache across calls. Per-call data goes into sections, which are
+    rendered last as one user message, each trimmed to its token budget.
+    `response_format = "json"` asks clients that support it for a JSON object.
+    """
+
     def __init__(self):
         self.messages = []
+        self.sections: List[Tuple[str, str]] = []
+        self.response_format: Optional[str] = None
 
     def add_system_message(self, content: str):
         self.messages.append({"role": "system", "content": content})
@@ -8,5 +91,32 @@ class Prompt:
     def add_user_message(self, content: str):
         self.messages.append({"role": "user", "content": content})
 
+    def add_section(self, title: str, content: str, max_tokens: Optional[int] = None, summarize: bool = False):
+        """
+        Add variable data to the trailing user message.
+        With `max_tokens`, the content is trimmed (or, with `summarize`,
+        summarized as a log) to fit.
+        """
+        if max_tokens is not None:
+            if summarize:
+                content = summarize_log(content, max_tokens)
+            else:
+                content = truncate_tokens(content, max_tokens)
+        self.sections.append((title, content))
+
     def get_messages(self):
-        return self.messages 
\ No newline at end of file
+        if not self.sections:
+            return self.messages
+        body = "\n\n".join(f"{title}:\n{content}" for title, content in self.sections)
+        return self.messages + [{"role": "user", "content": body}]
+
+    def token_count(self) -> int:
+        # ~4 tokens of per-message overhead in the chat format
+        return sum(count_tokens(m["content"]) + 4 for m in self.get_messages())
+
+
+def dedent_prompt(text: str) -> str:
+    """
+    Normalize an indented triple-quoted prompt string.
+    """
+    return textwrap.dedent(text).strip()
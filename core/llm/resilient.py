@@ -0,0 +1,424 @@
+# core/llm/resilient.py
+"""
+Fault-tolerant wrapper around one or more LLM clients.
+
+Calls are retried with jittered exponential backoff on retryable errors
+(rate limits, timeouts, connection errors and 5xx responses). Once enough
+latencies are known, a call still running past the provider's p95 gets a
+hedged duplicate and the first response wins; streamed calls are hedged
+on the time to their first chunk. Each provider has a circuit
+breaker; while it is open, calls fail over to the next configured client.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional
+
+from core.tracing import activate, current_span, metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+# Raised by the openai SDK without an HTTP status
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "TimeoutException", "TransportError"}
+
+# Model of the provider that answered the last call in this thread or task
+answered_by: ContextVar[Optional[str]] = ContextVar("answered_by", default=None)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when every configured provider's circuit breaker is open."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait, from a Retry-After header.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and lets a single
+    trial call through once `reset_timeout` seconds have passed.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_neutral(self):
+        """
+        End a call that says nothing about the provider's health (e.g. a
+        rejected request), so a half-open trial does not block forever.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self.samples.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Provider:
+    def __init__(self, client: Any, failure_threshold: int, reset_timeout: float):
+        self.client = client
+        self.name = getattr(client, "provider", type(client).__name__)
+        self.model = getattr(client, "model", self.name)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self.first_chunk = LatencyTracker()
+
+
+class ResilientLLMClient:
+    """
+    Drop-in LLM client delegating to `clients` in order of preference.
+    """
+
+    def __init__(
+        self,
+        clients: List[Any],
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        max_hedges: int = 4,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        if not clients:
+            raise ValueError("ResilientLLMClient needs at least one client")
+        self.providers = [_Provider(c, failure_threshold, reset_timeout) for c in clients]
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        # Threads cannot be cancelled: a losing sync request runs to the end
+        # and holds its limiter slot, so only this many hedged pairs may be
+        # outstanding at once
+        self._hedge_slots = threading.BoundedSemaphore(max_hedges)
+        self.model = self.providers[0].model
+        self.models = [provider.model for provider in self.providers]
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        self.logger = logging.getLogger(__name__)
+
+    def __getattr__(self, name):
+        return getattr(self.providers[0].client, name)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        Full-jitter exponential backoff, never shorter than Retry-After.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        return max(delay, min(retry_after, self.max_delay)) if retry_after is not None else delay
+
+    def _available(self) -> Iterator[_Provider]:
+        for index, provider in enumerate(self.providers):
+            if provider.breaker.allow():
+                if index > 0:
+                    metrics.inc("composer_llm_failovers_total", provider=provider.name)
+                    self.logger.warning(f"Failing over to LLM provider '{provider.name}'")
+                yield provider
+
+    def _call(self, attempt_call: Callable[[_Provider], Any]) -> Any:
+        """
+        Run `attempt_call` with retries on the first provider whose breaker
+        allows it, failing over while breakers open.
+        """
+        last_error: Optional[BaseException] = None
+        for provider in self._available():
+            for attempt in range(self.max_attempts):
+                try:
+                    result = attempt_call(provider)
+                    provider.breaker.record_success()
+                    answered_by.set(provider.model)
+                    return result
+                except Exception as e:
+                    if not is_retryable(e):
+                        provider.breaker.record_neutral()
+                        raise
+                    last_error = e
+                    provider.breaker.record_failure()
+                    if provider.breaker.state != "closed" or attempt == self.max_attempts - 1:
+                        break
+                    delay = self._backoff(attempt, e)
+                    metrics.inc("composer_llm_retries_total", provider=provider.name)
+                    self.logger.warning(
+                        f"LLM call to '{provider.name}' failed ({str(e)}), retrying in {delay:.1f}s"
+                    )
+                    time.sleep(delay)
+                except BaseException:
+                    provider.breaker.record_neutral()
+                    raise
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError("All LLM providers are unavailable (circuit breakers open)")
+
+    def _timed(self, provider: _Provider, call: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = call()
+        provider.latency.record(time.perf_counter() - started)
+        return result
+
+    def _hedged(self, provider: _Provider, prompt: Any) -> str:
+        """
+        Call the provider; if it runs past its p95 latency, race a duplicate
+        request and return whichever succeeds first.
+        """
+        threshold = provider.latency.quantile(self.hedge_quantile) if self.hedge else None
+        if threshold is None:
+            return self._timed(provider, lambda: provider.client.generate_code(prompt))
+
+        span = current_span()
+
+        def request():
+            with activate(span):
+                return self._timed(provider, lambda: provider.client.generate_code(prompt))
+
+        futures = {self._executor.submit(request)}
+        done, _ = wait(futures, timeout=threshold)
+        if not done and self._hedge_slots.acquire(blocking=False):
+            metrics.inc("composer_llm_hedges_total", provider=provider.name)
+            futures.add(self._executor.submit(request))
+            self._release_when_done(list(futures))
+
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower request finishes in the background and is dropped
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _release_when_done(self, futures: List):
+        """Free a hedge slot once both requests of a hedged pair have finished"""
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finished(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._hedge_slots.release()
+
+        for future in futures:
+            future.add_done_callback(finished)
+
+    def generate_code(self, prompt: Any) -> str:
+        return self._call(lambda provider: self._hedged(provider, prompt))
+
+    def stream_code(self, prompt: Any) -> Iterator[str]:
+        """
+        Stream from the first available provider. Errors before the first
+        chunk are retried or failed over, and a stream whose first chunk
+        takes longer than the provider's p95 gets a hedged duplicate; the
+        first to produce a chunk is kept and the other closed. Once output
+        has been yielded the stream cannot be restarted and errors propagate.
+        """
+        def open_stream(provider: _Provider):
+            if not hasattr(provider.client, "stream_code"):
+                return iter([self._hedged(provider, prompt)])
+            first, stream = self._hedged_open(provider, prompt)
+            return self._chain(first, stream) if stream is not None else iter(())
+
+        chunks = self._call(open_stream)
+        try:
+            yield from chunks
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    def _open(self, provider: _Provider, prompt: Any):
+        """Start a stream and wait for its first chunk; (None, None) if it is empty"""
+        started = time.perf_counter()
+        stream = provider.client.stream_code(prompt)
+        try:
+            first = next(stream)
+        except StopIteration:
+            return None, None
+        except BaseException:
+            stream.close()
+            raise
+        provider.first_chunk.record(time.perf_counter() - started)
+        return first, stream
+
+    def _hedged_open(self, provider: _Provider, prompt: Any):
+        """
+        Open a stream; if its first chunk takes longer than the provider's
+        p95, race a duplicate and keep whichever produces a chunk first.
+        """
+        threshold = provider.first_chunk.quantile(self.hedge_quantile) if self.hedge else None
+        if threshold is None:
+            return self._open(provider, prompt)
+
+        span = current_span()
+
+        def request():
+            with activate(span):
+                return self._open(provider, prompt)
+
+        futures = {self._executor.submit(request)}
+        done, _ = wait(futures, timeout=threshold)
+        if not done and self._hedge_slots.acquire(blocking=False):
+            metrics.inc("composer_llm_hedges_total", provider=provider.name)
+            futures.add(self._executor.submit(request))
+            self._release_when_done(list(futures))
+
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The other stream is closed once it has opened
+                    for loser in [*futures, *(d for d in done if d is not future)]:
+                        loser.add_done_callback(self._close_opened)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    @staticmethod
+    def _close_opened(future):
+        if future.exception() is None and future.result()[1] is not None:
+            future.result()[1].close()
+
+    def _chain(self, first: str, stream):
+        try:
+            yield first
+            yield from stream
+        finally:
+            stream.close()
+
+    async def generate_code_async(self, prompt: Any) -> str:
+        last_error: Optional[BaseException] = None
+        for provider in self._available():
+            for attempt in range(self.max_attempts):
+                try:
+                    result = await self._hedged_async(provider, prompt)
+                    provider.breaker.record_success()
+                    answered_by.set(provider.model)
+                    return result
+                except Exception as e:
+                    if not is_retryable(e):
+                        provider.breaker.record_neutral()
+                        raise
+                    last_error = e
+                    provider.breaker.record_failure()
+                    if provider.breaker.state != "closed" or attempt == self.max_attempts - 1:
+                        break
+                    metrics.inc("composer_llm_retries_total", provider=provider.name)
+                    await asyncio.sleep(self._backoff(attempt, e))
+                except BaseException:
+                    # Includes cancellation of the calling task
+                    provider.breaker.record_neutral()
+                    raise
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError("All LLM providers are unavailable (circuit breakers open)")
+
+    async def _hedged_async(self, provider: _Provider, prompt: Any) -> str:
+        async def request():
+            started = time.perf_counter()
+            result = await provider.client.generate_code_async(prompt)
+            provider.latency.record(time.perf_counter() - started)
+            return result
+
+        threshold = provider.latency.quantile(self.hedge_quantile) if self.hedge else None
+        if threshold is None:
+            return await request()
+
+        tasks = {asyncio.ensure_future(request())}
+        done, _ = await asyncio.wait(tasks, timeout=threshold)
+        if not done:
+            metrics.inc("composer_llm_hedges_total", provider=provider.name)
+            tasks.add(asyncio.ensure_future(request()))
+
+        error = None
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Unlike threads, the losing coroutine can actually be cancelled
+            for task in tasks:
+                task.cancel()
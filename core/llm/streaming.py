@@ -0,0 +1,15 @@
+# core/llm/streaming.py
+from typing import Any, Generator
+
+
+def iter_completion(client: Any, prompt: Any) -> Generator[str, None, None]:
+    """
+    Yield a completion chunk by chunk, falling back to a single chunk for
+    clients without streaming support.
+    Closing the generator closes the underlying stream, which cancels the
+    request on the provider side.
+    """
+    if hasattr(client, "stream_code"):
+        yield from client.stream_code(prompt)
+    else:
+        yield client.generate_code(prompt)
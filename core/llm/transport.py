@@ -0,0 +1,173 @@
+# core/llm/transport.py
+"""
+Shared HTTP transport for the LLM clients.
+
+Every client for a given provider reuses one pooled keep-alive connection
+pool (sync and async) and one concurrency limiter, so a process can keep
+many requests in flight without paying connection setup on every call.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+_lock = threading.Lock()
+_sync_clients: Dict[str, "httpx.Client"] = {}
+# Async connection pools are bound to the event loop that created them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_limiters: Dict[str, "ProviderLimiter"] = {}
+
+
+def _client_options() -> Dict:
+    # httpx is imported only once a client is actually created
+    import httpx
+    return {
+        "limits": httpx.Limits(
+            max_connections=64,
+            max_keepalive_connections=32,
+            keepalive_expiry=60.0
+        ),
+        # Reasoning models can take minutes to answer; only connecting should be quick
+        "timeout": httpx.Timeout(600.0, connect=10.0)
+    }
+
+
+class ProviderLimiter:
+    """
+    Caps the number of in-flight requests to one provider.
+    Usable as a context manager from threads and as an async context manager
+    from coroutines; threads and every event loop draw on one shared budget.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._available = max_concurrency
+        # Released slots are handed to waiters in order: threading.Events of
+        # blocked threads and (loop, future) pairs of waiting coroutines
+        self._waiters: Deque = deque()
+
+    def _acquire_or_wait(self, waiter) -> bool:
+        with self._lock:
+            if self._available and not self._waiters:
+                self._available -= 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                if self._hand_over(self._waiters.popleft()):
+                    return
+            self._available += 1
+
+    def _hand_over(self, waiter) -> bool:
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return True
+        loop, future = waiter
+        if future.cancelled():
+            return False
+        try:
+            loop.call_soon_threadsafe(self._grant, future)
+        except RuntimeError:
+            # Its event loop is closed
+            return False
+        return True
+
+    def _grant(self, future: "asyncio.Future"):
+        if future.cancelled():
+            # Cancelled after the slot was handed over; pass it on
+            self.release()
+        else:
+            future.set_result(None)
+
+    def __enter__(self):
+        event = threading.Event()
+        if not self._acquire_or_wait(event):
+            event.wait()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self._acquire_or_wait((loop, future)):
+            return self
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                except ValueError:
+                    pass
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation landed
+                self.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def get_http_client(provider: str) -> "httpx.Client":
+    """
+    Return the process-wide pooled sync HTTP client for a provider.
+    """
+    with _lock:
+        client = _sync_clients.get(provider)
+        if client is None or client.is_closed:
+            import httpx
+            client = httpx.Client(**_client_options())
+            _sync_clients[provider] = client
+        return client
+
+
+def get_async_http_client(provider: str) -> "httpx.AsyncClient":
+    """
+    Return the pooled async HTTP client for a provider on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(provider)
+        if client is None or client.is_closed:
+            import httpx
+            client = httpx.AsyncClient(**_client_options())
+            clients[provider] = client
+        return client
+
+
+def get_limiter(provider: str, max_concurrency: Optional[int] = None) -> ProviderLimiter:
+    """
+    Return the shared concurrency limiter for a provider.
+    The first caller decides the limit; later callers share it, and a
+    conflicting `max_concurrency` is logged and ignored.
+    """
+    with _lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = ProviderLimiter(max_concurrency or DEFAULT_MAX_CONCURRENCY)
+            _limiters[provider] = limiter
+        elif max_concurrency and max_concurrency != limiter.max_concurrency:
+            logger.warning(
+                f"Ignoring max_concurrency={max_concurrency} for '{provider}': "
+                f"its limiter already allows {limiter.max_concurrency} requests"
+            )
+        return limiter
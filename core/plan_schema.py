@@ -0,0 +1,287 @@
+# core/plan_schema.py
+"""
+Schema, validation and local repair of project plans.
+
+`repair_plan` fixes the defects LLMs commonly produce without another
+model call (fences, document markers, list-vs-dict shapes, aliases, missing
+metadata). `validate_plan` then reports the fields that are still unusable,
+so only those have to be requested again.
+"""
+import copy
+import re
+from typing import Any, Dict, List
+
+PLAN_FIELDS = ("project", "directory_structure", "components", "tech_stack")
+
+# Sent with JSON output mode, and documents what validate_plan checks
+PLAN_JSON_SCHEMA = {
+    "type": "object",
+    "required": list(PLAN_FIELDS),
+    "properties": {
+        "project": {"type": "string", "description": "Project name, usable as a directory name"},
+        "directory_structure": {
+            "type": "object",
+            "description": "Folder name -> list of file names",
+            "additionalProperties": {"type": "array", "items": {"type": "string"}}
+        },
+        "components": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "required": ["name", "description"],
+                "properties": {
+                    "name": {"type": "string"},
+                    "description": {"type": "string"},
+                    "depends_on": {"type": "array", "items": {"type": "string"}},
+                    "files": {
+                        "type": "array",
+                        "description": "Paths from directory_structure this component implements",
+                        "items": {"type": "string"}
+                    }
+                }
+            }
+        },
+        "tech_stack": {"type": "array", "minItems": 1, "items": {"type": "string"}},
+        "requirements": {
+            "type": "array",
+            "description": "pip requirements of the third-party packages the code imports, e.g. fastapi==0.110.*",
+            "items": {"type": "string"}
+        },
+        "metadata": {"type": "object"}
+    }
+}
+
+_FIELD_ALIASES = {
+    "technology_stack": "tech_stack",
+    "techstack": "tech_stack",
+    "stack": "tech_stack",
+    "project_name": "project",
+    "name": "project",
+    "structure": "directory_structure",
+    "directories": "directory_structure"
+}
+_UNSAFE_NAME = re.compile(r"[^\w\-.]+")
+# A PyPI name with optional extras and version specifiers; no URLs, paths or pip options
+_REQUIREMENT = re.compile(
+    r"^[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?(?:\[[\w\s,.-]+\])?"
+    r"(?:\s*(?:===|==|~=|!=|<=|>=|<|>)\s*[\w.*+!-]+(?:\s*,\s*(?:===|==|~=|!=|<=|>=|<|>)\s*[\w.*+!-]+)*)?$"
+)
+
+
+def _path_segment(name: str) -> str:
+    # Project and component names become directories; "../x" or "a/b" must not
+    return _UNSAFE_NAME.sub("_", name.strip()).strip("._")
+
+
+def repair_plan_text(text: str) -> str:
+    """
+    Drop markdown fences and YAML document markers around a plan.
+    """
+    lines = [
+        line for line in text.strip().splitlines()
+        if not line.strip().startswith("```") and line.strip() not in ("---", "...")
+    ]
+    return "\n".join(lines)
+
+
+def repair_plan(plan: Any) -> Dict:
+    """
+    Return a copy of `plan` with common structural defects fixed.
+    """
+    if not isinstance(plan, dict):
+        return {}
+    plan = copy.deepcopy(plan)
+    for alias, field in _FIELD_ALIASES.items():
+        if alias in plan and field not in plan:
+            plan[field] = plan.pop(alias)
+
+    if isinstance(plan.get("project"), str):
+        # The project name becomes a directory under the output dir
+        plan["project"] = _path_segment(plan["project"])
+    if "directory_structure" in plan:
+        plan["directory_structure"] = _repair_structure(plan["directory_structure"])
+    if "components" in plan:
+        plan["components"] = _repair_components(plan["components"])
+    if "tech_stack" in plan:
+        plan["tech_stack"] = _repair_tech_stack(plan["tech_stack"])
+    plan["requirements"] = _repair_requirements(plan.get("requirements"))
+    if not isinstance(plan.get("metadata"), dict):
+        plan["metadata"] = {}
+    return plan
+
+
+def validate_plan(plan: Dict) -> Dict[str, str]:
+    """
+    Map every missing or invalid required field to a description of the problem.
+    """
+    problems = {}
+    if not isinstance(plan.get("project"), str) or not plan["project"]:
+        problems["project"] = "missing or not a non-empty string"
+
+    structure = plan.get("directory_structure")
+    if not isinstance(structure, dict):
+        problems["directory_structure"] = "missing or not a mapping of folder names to file lists"
+    elif not all(isinstance(files, list) for files in structure.values()):
+        problems["directory_structure"] = "every folder must map to a list of files"
+
+    components = plan.get("components")
+    if not isinstance(components, list) or not components:
+        problems["components"] = "missing or not a non-empty list"
+    else:
+        invalid = [
+            str(index) for index, component in enumerate(components)
+            if not isinstance(component, dict)
+            or not isinstance(component.get("name"), str) or not component["name"]
+            or not isinstance(component.get("description"), str) or not component["description"]
+        ]
+        names = [c.get("name") for c in components if isinstance(c, dict)]
+        if invalid:
+            problems["components"] = f"entries {', '.join(invalid)} need a 'name' and a 'description'"
+        elif len(set(names)) != len(names):
+            problems["components"] = "component names must be unique"
+        elif any(name != _path_segment(name) for name in names):
+            problems["components"] = "component names must be usable as a single directory name"
+
+    if not isinstance(plan.get("tech_stack"), list) or not plan["tech_stack"]:
+        problems["tech_stack"] = "missing or not a non-empty list"
+    return problems
+
+
+def planned_files(structure: Any) -> List[str]:
+    """
+    Flatten a directory structure into relative file paths.
+    """
+    paths = []
+    if not isinstance(structure, dict):
+        return paths
+    for folder, files in structure.items():
+        folder = str(folder).strip("/")
+        for item in _as_file_list(files):
+            if isinstance(item, dict):
+                paths += [f"{folder}/{path}" for path in planned_files(item)]
+            elif isinstance(item, str) and not item.endswith("/"):
+                paths.append(f"{folder}/{item.strip('/')}" if folder else item.strip("/"))
+    return paths
+
+
+def component_files(plan: Dict, component: Dict) -> List[str]:
+    """
+    The planned Python files a component implements: its `files` entry, or
+    else the files named after it (`auth.py`, `test_auth.py` for "auth").
+    Other planned files (configs, READMEs, requirements) are not generated
+    as code. Package markers are left to the build.
+    """
+    planned = [path for path in planned_files(plan.get("directory_structure")) if path.endswith(".py")]
+    declared = component.get("files")
+    if isinstance(declared, list) and declared:
+        known = set(planned)
+        return [
+            path for path in declared
+            if isinstance(path, str) and path.endswith(".py") and (path in known or not known)
+        ]
+
+    name = _UNSAFE_NAME.sub("_", component["name"].lower())
+    matched = []
+    for path in planned:
+        stem = path.rsplit("/", 1)[-1].rsplit(".", 1)[0].lower()
+        if stem.startswith("test_"):
+            stem = stem[len("test_"):]
+        elif stem.endswith("_test"):
+            stem = stem[:-len("_test")]
+        if stem == name:
+            matched.append(path)
+    return matched
+
+
+def _repair_structure(structure: Any) -> Any:
+    if isinstance(structure, list):
+        # ["src/main.py", "tests/"] or [{"src": [...]}, ...]
+        repaired: Dict[str, List] = {}
+        for item in structure:
+            if isinstance(item, dict):
+                for folder, files in item.items():
+                    repaired.setdefault(str(folder), []).extend(_as_file_list(files))
+            elif isinstance(item, str):
+                folder, _, rest = item.strip().strip("/").partition("/")
+                files = repaired.setdefault(folder, [])
+                if rest:
+                    files.append(rest)
+        return repaired
+    if isinstance(structure, dict):
+        return {str(folder): _as_file_list(files) for folder, files in structure.items()}
+    return structure
+
+
+def _as_file_list(files: Any) -> List:
+    if files is None:
+        return []
+    if isinstance(files, (str, dict)):
+        return [files]
+    return list(files)
+
+
+def _repair_components(components: Any) -> Any:
+    if isinstance(components, dict):
+        # {name: description} or {name: {description: ...}}
+        components = [
+            {"name": name, **value} if isinstance(value, dict) else {"name": name, "description": value}
+            for name, value in components.items()
+        ]
+    if not isinstance(components, list):
+        return components
+
+    repaired = []
+    for component in components:
+        if isinstance(component, str):
+            component = {"name": component, "description": component}
+        if isinstance(component, dict):
+            component = dict(component)
+            if "depends_on" not in component and "dependencies" in component:
+                component["depends_on"] = component.pop("dependencies")
+            depends_on = component.get("depends_on")
+            if depends_on is None:
+                component["depends_on"] = []
+            elif isinstance(depends_on, str):
+                component["depends_on"] = [depends_on]
+            if isinstance(component["depends_on"], list):
+                # Named like the components they refer to
+                component["depends_on"] = [
+                    _path_segment(name) if isinstance(name, str) else name
+                    for name in component["depends_on"]
+                ]
+            if isinstance(component.get("files"), str):
+                component["files"] = [component["files"]]
+            if isinstance(component.get("name"), str):
+                # Each component is built in `<project>/<name>/`
+                component["name"] = _path_segment(component["name"])
+        repaired.append(component)
+    return repaired
+
+
+def _repair_requirements(requirements: Any) -> List[str]:
+    """
+    The plan's pip requirements as a list of plain `name[extras]<spec>`
+    strings. Anything else (URLs, paths, pip options, prose) is dropped:
+    only packages the plan names explicitly are ever installed.
+    """
+    if isinstance(requirements, str):
+        requirements = re.split(r"[\n;]+", requirements)
+    if not isinstance(requirements, list):
+        return []
+    repaired = []
+    for requirement in requirements:
+        requirement = str(requirement).strip()
+        if _REQUIREMENT.match(requirement) and requirement not in repaired:
+            repaired.append(requirement)
+    return repaired
+
+
+def _repair_tech_stack(tech_stack: Any) -> Any:
+    if isinstance(tech_stack, str):
+        return [tech_stack]
+    if isinstance(tech_stack, dict):
+        return [f"{key}: {value}" if isinstance(value, (str, int, float)) else str(key) for key, value in tech_stack.items()]
+    if isinstance(tech_stack, list):
+        return [str(item) if not isinstance(item, dict) else ", ".join(f"{k}: {v}" for k, v in item.items()) for item in tech_stack]
+    return tech_stack
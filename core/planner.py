@@ -1,11 +1,24 @@
 # core/planner.py
+import json
 import yaml
-from typing import Dict, List
-from core.llm.prompt import Prompt
-from core.llm.deepseek_client import DeepSeekClient
-from utils.parser import parse_llm_output
+from typing import TYPE_CHECKING, Dict, List, Optional
+from core.llm.prompt import Prompt, dedent_prompt
+from core.llm.streaming import iter_completion
+from core.plan_schema import PLAN_FIELDS, PLAN_JSON_SCHEMA, repair_plan, repair_plan_text, validate_plan
+from utils.parser import IncrementalYAMLParser, MalformedOutputError, parse_llm_output
 import logging
 import os
+import subprocess
+
+if TYPE_CHECKING:
+    from core.llm.deepseek_client import DeepSeekClient
+    from utils.environments import EnvironmentManager
+
+FIELDS_PROMPT = dedent_prompt("""
+    You complete a project plan that is missing some fields or has invalid ones.
+    Return ONLY the requested top-level fields, in the same format as the plan,
+    following the stated shape. Don't show markdown code block in the response.
+""")
 
 
 class Planner:
@@ -16,8 +29,17 @@ class Planner:
     - Structuring plans with resolved dependencies
     """
 
-    def __init__(self, llm_client: DeepSeekClient):
+    REQUIRED_FIELDS = PLAN_FIELDS
+
+    def __init__(
+        self,
+        llm_client: "DeepSeekClient",
+        streaming: bool = False,
+        environments: Optional["EnvironmentManager"] = None
+    ):
         self.client = llm_client
+        self.streaming = streaming
+        self.environments = environments
         self.logger = logging.getLogger(__name__)
         self.required_components = {
             'web_service': ['database', 'auth', 'api'],
@@ -101,9 +123,17 @@ class Planner:
         components:
           - name: <component_name>
             description: <component_requirements>
+            depends_on:
+              - <names of components this one builds on, empty if none>
+            files:
+              - <paths from directory_structure this component implements, e.g. src/auth.py, tests/test_auth.py>
         
         tech_stack:
           - List of technologies and versions
+
+        requirements:
+          - <pip requirement for every third-party package the code imports, e.g. fastapi==0.110.*>
+          # Empty if only the standard library is used. Nothing else is installed.
         
         The directory_structure MUST be a dictionary where each key is a folder name and its value is a list of files.
         Example directory_structure:
@@ -120,14 +150,23 @@ class Planner:
 
         try:
             prompt_obj = Prompt()
+            if self._json_mode():
+                # Structured output: the provider guarantees a JSON object
+                system_msg += (
+                    "\nRespond with a single JSON object instead of YAML, matching this JSON schema:\n"
+                    + json.dumps(PLAN_JSON_SCHEMA)
+                )
+                prompt_obj.response_format = "json"
             prompt_obj.add_system_message(system_msg)
             prompt_obj.add_user_message(requirements)
-            response = self.client.generate_code(prompt_obj)
-            self.logger.info(f"Generated plan: {response}")
-            
-            sanitized_response = self._sanitize_response(response)
-            plan = self._parse_plan(sanitized_response)
+            if self.streaming and not self._json_mode():
+                plan = self._stream_plan(prompt_obj)
+            else:
+                response = self.client.generate_code(prompt_obj)
+                self.logger.info(f"Generated plan: {response}")
+                plan = self._load_plan_text(response)
             
+            plan = self._finalize_plan(self._validate_plan(requirements, plan))
             self._save_plan_to_file(plan, "latest_plan.yaml")
             self.logger.info("Generated Plan:\n" + yaml.dump(plan, default_flow_style=False))
             
@@ -136,39 +175,122 @@ class Planner:
             self.logger.error(f"Error creating plan: {str(e)}", exc_info=True)
             raise
 
+    def _json_mode(self) -> bool:
+        return bool(getattr(self.client, "supports_json_output", False))
+
     def _sanitize_response(self, response: str) -> str:
         """
         Sanitize the response to ensure it is valid YAML.
         """
-        sanitized = response.replace("```yaml", "").replace("```", "").strip()
-        return sanitized
+        return repair_plan_text(response)
 
     def _parse_plan(self, raw_plan: str) -> Dict:
         """
         Parse a raw YAML plan text into a Python dictionary and apply additional processing.
         """
+        return self._finalize_plan(self._load_plan_text(raw_plan))
+
+    def _load_plan_text(self, raw_plan: str) -> Dict:
+        """
+        Parse YAML or JSON plan text after stripping fences and document markers.
+        """
         try:
-            lines = raw_plan.split("\n")
-            lines = [line for line in lines if not line.strip().startswith("```yaml") and not line.strip().startswith("```") and not line.strip().startswith("---")]
-            raw_plan = "\n".join(lines)
-            plan = yaml.safe_load(raw_plan)
-            if "metadata" not in plan:
-                plan["metadata"] = {}
-            plan["metadata"]["version"] = "1.0.0"
-
-            plan["dependencies"] = self._resolve_dependencies(plan.get("technology_stack", []))
-            return plan
+            # JSON is valid YAML, so one loader covers both output modes
+            plan = yaml.safe_load(repair_plan_text(raw_plan))
         except yaml.YAMLError as e:
             self.logger.error(f"YAML parsing error: {str(e)}", exc_info=True)
             raise ValueError(f"Invalid plan format: {str(e)}")
+        if not isinstance(plan, dict):
+            raise ValueError(f"Invalid plan format: expected a mapping, got {type(plan).__name__}")
+        return plan
 
-    def _resolve_dependencies(self, tech_stack: List[str]) -> Dict:
+    def _validate_plan(self, requirements: str, plan: Dict) -> Dict:
         """
-        Resolve dependencies dynamically for the given tech stack.
+        Repair the plan locally and re-request only the fields that are still
+        missing or invalid. Raises ValueError if the plan remains unusable,
+        before any project files are created.
         """
-        return {
-            "resolved_dependencies": [f"{tech}-1.0.0" for tech in tech_stack]
-        }
+        plan = repair_plan(plan)
+        problems = validate_plan(plan)
+        if not problems:
+            return plan
+
+        self.logger.warning(f"Re-requesting invalid plan fields: {problems}")
+        fields = self._request_fields(requirements, plan, problems)
+        plan = repair_plan({**plan, **fields})
+        problems = validate_plan(plan)
+        if problems:
+            raise ValueError(
+                "Invalid plan format: " + "; ".join(f"{field}: {problem}" for field, problem in problems.items())
+            )
+        return plan
+
+    def _request_fields(self, requirements: str, plan: Dict, problems: Dict[str, str]) -> Dict:
+        """
+        Ask the LLM for just the given fields, with the valid rest of the plan as context.
+        """
+        valid = {key: value for key, value in plan.items() if key not in problems}
+        prompt_obj = Prompt()
+        prompt_obj.add_system_message(FIELDS_PROMPT)
+        if self._json_mode():
+            prompt_obj.response_format = "json"
+        prompt_obj.add_section("Requirements", requirements)
+        prompt_obj.add_section("Current plan", yaml.safe_dump(valid, default_flow_style=False).strip())
+        prompt_obj.add_section(
+            "Fields to provide",
+            "\n".join(
+                f"- {field} ({problem}), shape: {json.dumps(PLAN_JSON_SCHEMA['properties'][field])}"
+                for field, problem in problems.items()
+            )
+        )
+        fields = self._load_plan_text(self.client.generate_code(prompt_obj))
+        return {key: value for key, value in fields.items() if key in problems}
+
+    def _stream_plan(self, prompt_obj: Prompt) -> Dict:
+        """
+        Stream the plan completion through an incremental YAML parser and
+        cancel the request as soon as the output is clearly malformed.
+        """
+        # Fences and wrong shapes are repaired afterwards; only unparseable
+        # output aborts the stream
+        parser = IncrementalYAMLParser(skip_fences=True)
+        chunks = iter_completion(self.client, prompt_obj)
+        try:
+            for chunk in chunks:
+                parser.feed(chunk)
+            plan = parser.close()
+        except MalformedOutputError as e:
+            self.logger.error(f"Aborting plan generation: {str(e)}")
+            raise ValueError(f"Invalid plan format: {str(e)}")
+        finally:
+            chunks.close()
+        return plan
+
+    def _finalize_plan(self, plan: Dict) -> Dict:
+        """
+        Add metadata and resolved dependencies to a parsed plan.
+        """
+        if not isinstance(plan.get("metadata"), dict):
+            plan["metadata"] = {}
+        plan["metadata"]["version"] = "1.0.0"
+
+        plan["dependencies"] = self._resolve_dependencies(plan.get("requirements") or [])
+        return plan
+
+    def _resolve_dependencies(self, requirements: List[str]) -> Dict:
+        """
+        Resolve the plan's declared pip requirements into a lock of pinned
+        versions. The tech stack is never guessed into packages. Without an
+        environment manager, or if resolution fails, only the unpinned
+        requirements are recorded.
+        """
+        if self.environments is None or not requirements:
+            return {"requirements": requirements, "lock": None}
+        try:
+            return {"requirements": requirements, "lock": self.environments.resolve(requirements)}
+        except (RuntimeError, OSError, subprocess.SubprocessError) as e:
+            self.logger.warning(f"Could not resolve dependencies: {str(e)}")
+            return {"requirements": requirements, "lock": None}
 
     def _save_plan_to_file(self, plan: Dict, filename: str):
         """
@@ -0,0 +1,113 @@
+# core/scheduler.py
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentScheduler:
+    """
+    Run plan components concurrently while respecting declared dependencies.
+
+    Components may list the names of the components they build on under
+    `depends_on` (or `dependencies`). Every component whose dependencies have
+    completed is submitted to a bounded worker pool, so independent
+    components are built side by side.
+    """
+
+    def __init__(
+        self,
+        components: List[Dict],
+        max_workers: int = 4,
+        completed: Optional[Set[str]] = None
+    ):
+        self.components = {component["name"]: component for component in components}
+        self.max_workers = max(1, int(max_workers))
+        # Components finished by an earlier run satisfy dependencies on them
+        self.completed = set(completed or ())
+        self.graph = self._build_graph(components)
+
+    def _build_graph(self, components: List[Dict]) -> Dict[str, Set[str]]:
+        """
+        Map every component name to the set of component names it depends on.
+        """
+        graph = {}
+        for component in components:
+            declared = component.get("depends_on", component.get("dependencies")) or []
+            if isinstance(declared, str):
+                declared = [declared]
+
+            deps = set()
+            for dep in declared:
+                if dep == component["name"] or dep in self.completed:
+                    continue
+                if dep not in self.components:
+                    logger.warning(
+                        f"Component '{component['name']}' depends on unknown component '{dep}', ignoring"
+                    )
+                    continue
+                deps.add(dep)
+            graph[component["name"]] = deps
+
+        self._check_cycles(graph)
+        return graph
+
+    def _check_cycles(self, graph: Dict[str, Set[str]]):
+        """
+        Raise ValueError if the dependency graph is not a DAG.
+        """
+        remaining = {name: set(deps) for name, deps in graph.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(
+                    f"Circular component dependencies: {sorted(remaining)}"
+                )
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(self, task: Callable[[Dict], Any]) -> Dict[str, Any]:
+        """
+        Call `task(component)` for every component, in dependency order.
+
+        Stops scheduling new components after the first failure, waits for the
+        ones already running, then re-raises that failure.
+        """
+        results = {}
+        pending = {name: set(deps) for name, deps in self.graph.items()}
+        running = {}
+        failure = None
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="component"
+        ) as executor:
+            while pending or running:
+                if failure is None:
+                    for name in [n for n, deps in pending.items() if not deps]:
+                        del pending[name]
+                        future = executor.submit(task, self.components[name])
+                        running[future] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Component '{name}' failed: {str(e)}")
+                        if failure is None:
+                            failure = e
+                        continue
+                    for deps in pending.values():
+                        deps.discard(name)
+
+        if failure is not None:
+            raise failure
+        return results
@@ -0,0 +1,157 @@
+# core/server.py
+import json
+import logging
+import os
+import re
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from core.jobs import BuildQueue
+from core.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_PATH = re.compile(r"^/jobs/([\w\-]+)$")
+EVENTS_PATH = re.compile(r"^/jobs/([\w\-]+)/events$")
+
+
+class _BuildRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API over a BuildQueue:
+
+        POST /jobs          {"requirements": "...", "id": optional} -> 202 job
+        GET  /jobs          all jobs
+        GET  /jobs/<id>     one job, including its result once finished
+        GET  /jobs/<id>/events?since=<seq>[&follow=1]
+                            build journal events; with follow=1, streamed as
+                            JSON lines until the build finishes
+        GET  /status        queue depth and job counts
+        GET  /metrics       Prometheus text metrics
+    """
+    queue: BuildQueue = None  # Set on the per-server subclass
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_metrics(self):
+        stats = self.queue.stats()
+        gauges = {"composer_queue_depth": stats["queue_depth"]}
+        for status in ("queued", "running", "success", "failed"):
+            gauges[f"composer_jobs_{status}"] = stats[status]
+        body = metrics.render_prometheus(gauges).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_events(self, job_id: str, query: dict):
+        try:
+            since = int(query.get("since", ["0"])[0])
+        except ValueError:
+            return self._send_json(400, {"error": "'since' must be an integer"})
+        if query.get("follow", ["0"])[0] not in ("1", "true"):
+            return self._send_json(200, self.queue.events(job_id, since))
+
+        # HTTP/1.0: the body ends when the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for event in self.queue.follow(job_id, since):
+                self.wfile.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"Event stream of job {job_id} closed by the client")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        match = EVENTS_PATH.match(url.path)
+        if match:
+            if self.queue.get(match.group(1)) is None:
+                return self._send_json(404, {"error": "Unknown job"})
+            return self._send_events(match.group(1), parse_qs(url.query))
+
+        if url.path == "/metrics":
+            return self._send_metrics()
+        if url.path == "/status":
+            return self._send_json(200, self.queue.stats())
+        if url.path == "/jobs":
+            return self._send_json(200, self.queue.jobs())
+
+        match = JOB_PATH.match(url.path)
+        if match:
+            job = self.queue.get(match.group(1))
+            if job is None:
+                return self._send_json(404, {"error": "Unknown job"})
+            return self._send_json(200, job)
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/jobs":
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            requirements = payload.get("requirements")
+            if not requirements:
+                return self._send_json(400, {"error": "Missing 'requirements'"})
+            job_id = self.queue.submit(requirements, job_id=payload.get("id"))
+        except (ValueError, AttributeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, self.queue.get(job_id))
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix-socket"
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        # Attributes BaseHTTPRequestHandler expects from an HTTPServer
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def serve(
+    queue: BuildQueue,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    socket_path: Optional[Path] = None
+):
+    """
+    Serve the build API until interrupted, over TCP or a Unix socket.
+    """
+    handler = type("BuildRequestHandler", (_BuildRequestHandler,), {"queue": queue})
+    if socket_path is not None:
+        if socket_path.exists():
+            os.unlink(socket_path)
+        server = _ThreadingUnixHTTPServer(str(socket_path), handler)
+        logger.info(f"Composer server listening on unix socket {socket_path}")
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        logger.info(f"Composer server listening on http://{host}:{server.server_port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down server")
+    finally:
+        server.server_close()
+        queue.shutdown()
+        if socket_path is not None and socket_path.exists():
+            os.unlink(socket_path)
@@ -0,0 +1,265 @@
+# core/tracing.py
+"""
+Lightweight build tracing and process-wide metrics.
+
+A Tracer records nested timing spans (build > component > iteration >
+stage) for one build and exports them as a JSON trace. Spans are tracked
+per thread, so LLM clients can attach request latency and token usage to
+whatever span is active via `record_llm_call`. Every finished span and LLM
+call also feeds the process-wide `metrics` registry, which renders in
+Prometheus text format.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+_local = threading.local()
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, kind: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.thread = threading.current_thread().name
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start_perf
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration": self.duration,
+            "thread": self.thread,
+            "attrs": self.attrs
+        }
+
+
+def _stack() -> List[Span]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_span() -> Optional[Span]:
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def activate(span: Optional[Span]):
+    """
+    Make `span` the active span on this thread, e.g. in a worker thread
+    doing work on behalf of another thread's span.
+    """
+    if span is None:
+        yield
+        return
+    stack = _stack()
+    stack.append(span)
+    try:
+        yield
+    finally:
+        stack.remove(span)
+
+
+class Tracer:
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, kind: str = "stage", parent: Optional[Span] = None, **attrs):
+        """
+        Time a block as a child of `parent`, the active span of this tracer
+        on the current thread, or the root span, in that order.
+        """
+        if parent is None:
+            active = current_span()
+            parent = active if active is not None and active.tracer is self else self.root
+        span = Span(self, name, kind, parent, attrs)
+        if self.root is None:
+            self.root = span
+
+        stack = _stack()
+        stack.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span.attrs["error"] = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            span.finish()
+            stack.remove(span)
+            with self._lock:
+                self.spans.append(span)
+            metrics.observe("composer_stage_seconds", span.duration, stage=name)
+
+    def add_span(self, name: str, kind: str, duration: float, **attrs) -> Span:
+        """
+        Record an already finished span under the active span.
+        """
+        active = current_span()
+        parent = active if active is not None and active.tracer is self else self.root
+        span = Span(self, name, kind, parent, attrs)
+        span.start -= duration
+        span.duration = duration
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "trace_id": self.root.id if self.root else None,
+            "spans": [span.to_dict() for span in spans],
+            "breakdown": self.breakdown()
+        }
+
+    def export(self, path: Path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage count, total and max seconds, plus LLM token totals.
+        """
+        summary: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            if span.duration is None:
+                continue
+            entry = summary.setdefault(span.name, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += span.duration
+            entry["max"] = max(entry["max"], span.duration)
+            for key in ("prompt_tokens", "completion_tokens"):
+                if key in span.attrs:
+                    entry[key] = entry.get(key, 0) + (span.attrs[key] or 0)
+        return summary
+
+
+def format_breakdown(tracer: Tracer) -> str:
+    """
+    Render a tracer's breakdown as a table, slowest stages first.
+    """
+    rows = sorted(tracer.breakdown().items(), key=lambda item: item[1]["total"], reverse=True)
+    lines = [f"{'stage':<24}{'count':>8}{'total s':>12}{'max s':>10}{'tokens in':>12}{'tokens out':>12}"]
+    for name, entry in rows:
+        lines.append(
+            f"{name:<24}{entry['count']:>8}{entry['total']:>12.2f}{entry['max']:>10.2f}"
+            f"{entry.get('prompt_tokens', ''):>12}{entry.get('completion_tokens', ''):>12}"
+        )
+    return "\n".join(lines)
+
+
+def record_llm_call(
+    provider: str,
+    model: str,
+    latency: float,
+    usage: Any = None,
+    stream: bool = False,
+    time_to_first_token: Optional[float] = None
+):
+    """
+    Record one LLM request on the active span (if any) and in the metrics.
+    `usage` is the response's usage object or dict.
+    """
+    if usage is not None and not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    # DeepSeek reports prompt prefix cache hits separately
+    cached_tokens = usage.get("prompt_cache_hit_tokens") or 0
+
+    metrics.inc("composer_llm_requests_total", provider=provider, model=model)
+    metrics.observe("composer_llm_request_seconds", latency, provider=provider, model=model)
+    metrics.inc("composer_llm_tokens_total", prompt_tokens, provider=provider, type="prompt")
+    metrics.inc("composer_llm_tokens_total", completion_tokens, provider=provider, type="completion")
+    if cached_tokens:
+        metrics.inc("composer_llm_tokens_total", cached_tokens, provider=provider, type="prompt_cache_hit")
+
+    active = current_span()
+    if active is not None:
+        attrs = {
+            "provider": provider,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "prompt_cache_hit_tokens": cached_tokens,
+            "stream": stream
+        }
+        if time_to_first_token is not None:
+            attrs["time_to_first_token"] = time_to_first_token
+        active.tracer.add_span("llm_request", "llm", latency, **attrs)
+
+
+class Metrics:
+    """
+    Minimal thread-safe counters and summaries with Prometheus text output.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+        self._summaries: Dict[Tuple[str, Tuple], List[float]] = defaultdict(lambda: [0, 0.0])
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            summary = self._summaries[(name, tuple(sorted(labels.items())))]
+            summary[0] += 1
+            summary[1] += value
+
+    def render_prometheus(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        def fmt(labels: Tuple) -> str:
+            if not labels:
+                return ""
+            inner = ",".join(f'{k}="{str(v)}"' for k, v in labels)
+            return "{" + inner + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{fmt(labels)} {value}")
+        for (name, labels), (count, total) in summaries:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            lines.append(f"{name}_count{fmt(labels)} {count}")
+            lines.append(f"{name}_sum{fmt(labels)} {total}")
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
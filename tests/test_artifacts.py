@@ -0,0 +1,73 @@
+# tests/test_artifacts.py
+import os
+
+import pytest
+
+from utils.artifacts import ArtifactStore, latest_iteration
+
+
+def write(store: ArtifactStore, component: str, iteration: int, content: bytes) -> str:
+    digest = store.put(content)
+    store.link(digest, store.project_path / component / f"iteration_{iteration}" / "main.py")
+    store.record(component, iteration, {"main.py": digest})
+    return digest
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = ArtifactStore(tmp_path)
+    first = write(store, "auth", 1, b"A = 1\n")
+    assert write(store, "auth", 2, b"A = 1\n") == first
+    one, two = (tmp_path / "auth" / f"iteration_{n}" / "main.py" for n in (1, 2))
+    assert os.path.samefile(one, two)
+    # Iteration files are read-only links to the blob
+    assert one.stat().st_mode & 0o222 == 0
+    assert one.stat().st_nlink == 3
+
+
+def test_latest_follows_new_iterations_and_promotion(tmp_path):
+    store = ArtifactStore(tmp_path)
+    for iteration in (1, 2, 3):
+        write(store, "auth", iteration, f"A = {iteration}\n".encode())
+    assert latest_iteration(tmp_path, "auth") == 3
+    assert os.readlink(tmp_path / "auth" / "latest") == "iteration_3"
+
+    # A concurrent round's winner stays latest while its losers finish
+    store.promote("auth", 2, hold_until=4)
+    write(store, "auth", 4, b"A = 4\n")
+    assert latest_iteration(tmp_path, "auth") == 2
+    write(store, "auth", 5, b"A = 5\n")
+    assert latest_iteration(tmp_path, "auth") == 5
+
+    with pytest.raises(FileNotFoundError):
+        store.promote("auth", 9)
+
+
+def test_latest_falls_back_to_refs_without_the_link(tmp_path):
+    store = ArtifactStore(tmp_path)
+    write(store, "auth", 1, b"A = 1\n")
+    (tmp_path / "auth" / "latest").unlink()
+    assert latest_iteration(tmp_path, "auth") == 1
+    assert latest_iteration(tmp_path, "unknown") is None
+
+
+def test_compacted_iterations_are_restored(tmp_path):
+    store = ArtifactStore(tmp_path)
+    for iteration in (1, 2, 3):
+        write(store, "auth", iteration, f"A = {iteration}\n".encode())
+    store.compact("auth", keep=1)
+    assert not (tmp_path / "auth" / "iteration_1" / "main.py").exists()
+    assert (tmp_path / "auth" / "iteration_3" / "main.py").exists()
+    assert list(store.objects_path.rglob("*.gz"))
+
+    path = store.materialize("auth", 1)
+    assert (path / "main.py").read_text() == "A = 1\n"
+
+
+def test_compaction_keeps_the_promoted_iteration(tmp_path):
+    store = ArtifactStore(tmp_path)
+    for iteration in (1, 2, 3):
+        write(store, "auth", iteration, f"A = {iteration}\n".encode())
+    store.promote("auth", 1, hold_until=3)
+    store.compact("auth", keep=1)
+    assert (tmp_path / "auth" / "iteration_1" / "main.py").read_text() == "A = 1\n"
+    assert not (tmp_path / "auth" / "iteration_2" / "main.py").exists()
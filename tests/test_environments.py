@@ -0,0 +1,91 @@
+# tests/test_environments.py
+import json
+import subprocess
+
+import pytest
+
+from utils.environments import EnvironmentManager, distribution_of, stack_packages
+
+
+class FakePip:
+    """Stands in for pip: resolves from `index` and "downloads" empty wheels"""
+
+    def __init__(self, wheelhouse, index):
+        self.wheelhouse = wheelhouse
+        self.index = index
+        self.calls = []
+
+    def __call__(self, *args):
+        self.calls.append(args[0])
+        if args[0] == "install":
+            report_path = args[args.index("--report") + 1]
+            values = {report_path, str(self.wheelhouse)}
+            requirements = [arg for arg in args[1:] if not arg.startswith("-") and arg not in values]
+            unknown = [name for name in requirements if name not in self.index]
+            if unknown:
+                stderr = f"ERROR: No matching distribution found for {unknown[0]}"
+                return subprocess.CompletedProcess(args, 1, "", stderr)
+            report = {"install": [
+                {"metadata": {"name": name, "version": self.index[name]},
+                 "download_info": {"archive_info": {"hashes": {"sha256": "0" * 64}}}}
+                for name in requirements
+            ]}
+            with open(report_path, "w") as f:
+                json.dump(report, f)
+        elif args[0] == "download":
+            for spec in args:
+                if "==" in spec:
+                    name, version = spec.split("==")
+                    (self.wheelhouse / f"{name.replace('-', '_')}-{version}-py3-none-any.whl").touch()
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = EnvironmentManager(cache_dir=tmp_path)
+    manager._pip = FakePip(manager.wheelhouse, {"flask": "3.0.2", "python-dotenv": "1.0.1"})
+    return manager
+
+
+def test_distribution_names():
+    assert distribution_of("Flask-3.0.2-py3-none-any.whl") == ("flask", "3.0.2")
+    assert distribution_of("python_dotenv-1.0.1-1-py3-none-any.whl") == ("python_dotenv", "1.0.1")
+    assert distribution_of("zope.interface-6.2.tar.gz") == ("zope_interface", "6.2")
+    assert distribution_of("README.md") is None
+
+
+def test_stack_packages():
+    stack = ["Python 3.11", "framework: FastAPI 0.110", "database: PostgreSQL", "SQLAlchemy"]
+    assert stack_packages(stack) == [("fastapi", "0.110"), ("sqlalchemy", None)]
+
+
+def test_resolve_pins_and_fills_the_wheelhouse(manager):
+    lock = manager.resolve(["flask", "python-dotenv"])
+    assert [(p["name"], p["version"]) for p in lock["packages"]] == [("flask", "3.0.2"), ("python-dotenv", "1.0.1")]
+    assert {path.name for path in manager.wheelhouse.iterdir()} == {
+        "flask-3.0.2-py3-none-any.whl", "python_dotenv-1.0.1-py3-none-any.whl"
+    }
+    assert "flask==3.0.2" in manager.lock_text(lock)
+
+
+def test_unknown_requirements_are_dropped(manager):
+    lock = manager.resolve(["flask", "no-such-package"])
+    assert lock["dropped"] == ["no-such-package"]
+    assert lock["requirements"] == ["flask"]
+
+
+def test_cached_lock_refills_a_pruned_wheelhouse(manager):
+    first = manager.resolve(["flask"])
+    for wheel in manager.wheelhouse.iterdir():
+        wheel.unlink()
+    manager._pip.calls.clear()
+
+    assert manager.resolve(["flask"]) == first
+    # Resolved from the cached lock, but the wheel is downloaded again
+    assert manager._pip.calls == ["download"]
+
+    manager.offline = True
+    for wheel in manager.wheelhouse.iterdir():
+        wheel.unlink()
+    with pytest.raises(RuntimeError, match="missing from the wheelhouse"):
+        manager.resolve(["flask"])
@@ -0,0 +1,85 @@
+# tests/test_failures.py
+from core.failures import fingerprint, repeated_failures
+
+PYTEST_LOG = """\
+=================================== FAILURES ===================================
+________________________________ test_checksum _________________________________
+
+    def test_checksum():
+>       assert checksum(b"abc") == {value}
+E       assert 17 == {value}
+
+{root}/auth/iteration_{iteration}/test_main.py:{line}: AssertionError
+___________________________ test_parse[case-{case}] ____________________________
+
+    def test_parse(case):
+>       parse(case)
+
+{root}/auth/iteration_{iteration}/test_main.py:30:
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+    def parse(text):
+>       return int(text)
+E       ValueError: invalid literal for int() with base 10: 'x'
+
+{root}/auth/iteration_{iteration}/main.py:{line}: ValueError
+=========================== short test summary info ============================
+"""
+
+
+def pytest_result(**values) -> dict:
+    params = {"root": "/tmp/services/app", "iteration": 1, "line": 12, "value": 42, "case": 1}
+    params.update(values)
+    return {"passed": False, "error": "2 tests failed", "logs": PYTEST_LOG.format(**params)}
+
+
+def test_pytest_failures_name_type_file_and_test():
+    assert fingerprint(pytest_result()) == (
+        "AssertionError@test_main.py:test_checksum | ValueError@main.py:test_parse"
+    )
+
+
+def test_pytest_fingerprint_ignores_volatile_details():
+    first = fingerprint(pytest_result())
+    later = fingerprint(pytest_result(root="/other/place", iteration=7, line=99, value=7, case=3))
+    assert later == first
+
+
+def test_gate_fingerprint_tells_missing_modules_apart():
+    def gate_result(module: str) -> dict:
+        error = f"main.py:3: ImportError: No module named '{module}'"
+        return {"passed": False, "error": f"Pre-test check failed: {error}", "logs": error}
+
+    assert fingerprint(gate_result("requests")) == "ImportError@main.py: No module named 'requests'"
+    assert fingerprint(gate_result("requests")) != fingerprint(gate_result("yaml"))
+
+
+def test_gate_fingerprint_ignores_line_numbers_and_iterations():
+    first = {"error": "Pre-test check failed: /p/a/iteration_1/main.py:3: SyntaxError: invalid syntax"}
+    later = {"error": "Pre-test check failed: /p/a/iteration_4/main.py:17: SyntaxError: invalid syntax"}
+    assert fingerprint(first) == fingerprint(later) == "SyntaxError@main.py: invalid syntax"
+
+
+def test_timeout_fingerprint():
+    assert fingerprint({"error": "Tests timed out after 60s", "logs": ""}) == "Timeout"
+
+
+def test_traceback_fallback():
+    logs = """Traceback (most recent call last):
+  File "/tmp/app/auth/iteration_2/main.py", line 8, in load
+    return json.loads(text)
+json.decoder.JSONDecodeError: Expecting value: line 1 column 1 (char 0)
+"""
+    assert fingerprint({"error": "Crashed", "logs": logs}) == "json.decoder.JSONDecodeError@main.py:load"
+
+
+def test_first_line_fallback_masks_numbers():
+    first = fingerprint({"error": "Exit code 4 after 12 tests\ndetails", "logs": ""})
+    assert first == fingerprint({"error": "Exit code 5 after 3 tests", "logs": ""})
+    assert "details" not in first
+
+
+def test_repeated_failures_counts_the_trailing_run():
+    assert repeated_failures(["a", "b", "b", "b"]) == 3
+    assert repeated_failures(["b", "b", "a"]) == 1
+    assert repeated_failures([]) == 0
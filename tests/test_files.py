@@ -0,0 +1,66 @@
+# tests/test_files.py
+from utils.bundle import bundle_files
+from utils.files import MAIN_FILE, PACKAGE_MARKER, ProjectManager
+from utils.gate import CodeGate
+from utils.test_runner import TestRunner
+
+MODELS = {
+    "src/models.py": "class User:\n    name = 'ada'\n",
+    "tests/test_models.py": "from src.models import User\n\n\ndef test_user():\n    assert User.name == 'ada'\n",
+}
+API = {
+    "src/api.py": "from src.models import User\n\n\ndef who():\n    return User.name\n",
+    "tests/test_api.py": "from src.api import who\n\n\ndef test_who():\n    assert who() == 'ada'\n",
+}
+
+
+def make_project(tmp_path):
+    manager = ProjectManager()
+    project = tmp_path / "app"
+    manager.create(project, {"src": ["__init__.py", "models.py", "api.py"], "tests": ["test_api.py"]})
+    return manager, project
+
+
+def test_single_file_iterations_are_versioned(tmp_path):
+    manager, project = make_project(tmp_path)
+    first = manager.write_code(project, "auth", "A = 1\n", 1)
+    second = manager.write_code(project, "auth", "A = 2\n", 2)
+    assert (first / MAIN_FILE).read_text() == "A = 1\n"
+    assert (second / MAIN_FILE).read_text() == "A = 2\n"
+    assert manager.materialize_latest(project, "auth") == second
+
+
+def test_iteration_packages_extend_project_packages(tmp_path):
+    manager, project = make_project(tmp_path)
+    iteration = manager.write_code(project, "models", bundle_files(MODELS), 1)
+    assert (iteration / "src" / "__init__.py").read_text() == PACKAGE_MARKER
+
+    manager.promote_iteration(project, "models", 1)
+    assert (project / "src" / "models.py").read_text() == MODELS["src/models.py"]
+    # The project's own package marker is kept
+    assert (project / "src" / "__init__.py").read_text() == ""
+
+
+def test_component_imports_a_promoted_component(tmp_path):
+    manager, project = make_project(tmp_path)
+    manager.write_code(project, "models", bundle_files(MODELS), 1)
+    manager.promote_iteration(project, "models", 1)
+    iteration = manager.write_code(project, "api", bundle_files(API), 1)
+
+    gate = CodeGate().check(iteration, roots=[project])
+    assert gate["passed"], gate["errors"]
+
+    result = TestRunner(max_workers=1, sandbox=False).execute(project, "api", 1)
+    assert result["passed"], result["logs"]
+
+
+def test_gate_reports_imports_hidden_by_a_shadowing_package(tmp_path):
+    manager, project = make_project(tmp_path)
+    manager.write_code(project, "models", bundle_files(MODELS), 1)
+    manager.promote_iteration(project, "models", 1)
+    # A regular package in the iteration hides the project's src.models
+    iteration = manager.write_code(project, "api", bundle_files({**API, "src/__init__.py": "VERSION = 1\n"}), 1)
+
+    gate = CodeGate().check(iteration, roots=[project])
+    assert not gate["passed"]
+    assert "No module named 'src.models'" in gate["error"]
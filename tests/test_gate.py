@@ -0,0 +1,70 @@
+# tests/test_gate.py
+import pytest
+
+from utils.gate import CodeGate, analyze_source
+
+
+def rules(source: str) -> list:
+    return [finding["rule"] for finding in analyze_source(source)["findings"]]
+
+
+@pytest.mark.parametrize("source, rule", [
+    ("import os\n", "unused-import"),
+    ("try:\n    pass\nexcept:\n    pass\n", "bare-except"),
+    ("from os import *\n", "star-import"),
+    ("x = 1\nif x == None:\n    pass\n", "none-comparison"),
+    ("x = f'plain'\n", "fstring-without-placeholders"),
+    ("def f(items=[]):\n    return items\n", "mutable-default"),
+    ("def f():\n    pass\n\n\ndef f():\n    pass\n", "redefined"),
+    (f"x = '{'a' * 130}'\n", "line-too-long"),
+])
+def test_lint_rules(source, rule):
+    assert rule in rules(source)
+
+
+def test_clean_code_has_no_findings():
+    assert rules("import os\n\n\ndef cwd(path=None):\n    return path if path is not None else os.getcwd()\n") == []
+
+
+def test_compiler_only_errors_are_reported():
+    result = analyze_source("def f():\n    pass\nreturn 1\n")
+    assert result["error"].startswith("3: SyntaxError")
+
+
+def test_imports_resolve_against_roots_stdlib_and_environment(tmp_path):
+    project, iteration = tmp_path / "app", tmp_path / "app" / "auth" / "iteration_1"
+    (project / "lib").mkdir(parents=True)
+    (project / "lib" / "__init__.py").write_text("")
+    (project / "lib" / "core.py").write_text("")
+    site_packages = tmp_path / "site-packages"
+    (site_packages / "thirdparty").mkdir(parents=True)
+    (site_packages / "thirdparty" / "__init__.py").write_text("")
+    iteration.mkdir(parents=True)
+    (iteration / "helpers.py").write_text("")
+    (iteration / "main.py").write_text(
+        "import json\nimport helpers\nimport thirdparty\nfrom lib import core\n\n"
+        "print(json, helpers, thirdparty, core)\n"
+    )
+
+    gate = CodeGate()
+    assert gate.check(iteration, roots=[project], site_packages=[site_packages])["passed"]
+
+    (iteration / "main.py").write_text("import lib.missing\nimport not_installed_anywhere\n")
+    result = gate.check(iteration, roots=[project], site_packages=[site_packages])
+    assert not result["passed"]
+    assert result["errors"] == [
+        "main.py:1: ImportError: No module named 'lib.missing'",
+        "main.py:2: ImportError: No module named 'not_installed_anywhere'",
+    ]
+    assert result["error"].endswith("(+1 more)")
+
+
+def test_results_are_cached_by_content(tmp_path):
+    (tmp_path / "a.py").write_text("A = 1\n")
+    (tmp_path / "b.py").write_text("B = 1\n")
+    gate = CodeGate()
+    assert gate.check(tmp_path, roots=[])["cache_hits"] == 0
+    (tmp_path / "b.py").write_text("B = 2\n")
+    # A copy elsewhere has the same content, so it is not parsed again
+    (tmp_path / "c.py").write_text("A = 1\n")
+    assert gate.check(tmp_path, roots=[])["cache_hits"] == 2
@@ -0,0 +1,77 @@
+# tests/test_imports.py
+from utils.imports import ImportGraph
+
+EXTEND_PATH = "from pkgutil import extend_path\n__path__ = extend_path(__path__, __name__)\n"
+
+
+def write(files: dict):
+    for path, content in files.items():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def test_regular_package_shadows_later_roots(tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    write({
+        first / "src" / "__init__.py": "",
+        first / "src" / "api.py": "",
+        second / "src" / "__init__.py": "",
+        second / "src" / "models.py": "",
+    })
+    modules = ImportGraph([first, second]).modules
+    assert modules["src"] == first / "src" / "__init__.py"
+    assert "src.api" in modules
+    assert "src.models" not in modules
+
+
+def test_extend_path_package_spans_roots(tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    write({
+        first / "src" / "__init__.py": EXTEND_PATH,
+        first / "src" / "api.py": "",
+        second / "src" / "__init__.py": "",
+        second / "src" / "api.py": "",
+        second / "src" / "models.py": "",
+    })
+    modules = ImportGraph([first, second]).modules
+    assert modules["src.api"] == first / "src" / "api.py"
+    assert modules["src.models"] == second / "src" / "models.py"
+
+
+def test_namespace_package_spans_roots(tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    write({first / "ns" / "a.py": "", second / "ns" / "b.py": ""})
+    modules = ImportGraph([first, second]).modules
+    assert {"ns.a", "ns.b"} <= set(modules)
+    assert "ns" not in modules
+
+
+def test_module_shadows_later_package(tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    write({first / "util.py": "", second / "util" / "__init__.py": "", second / "util" / "io.py": ""})
+    modules = ImportGraph([first, second]).modules
+    assert modules["util"] == first / "util.py"
+    assert "util.io" not in modules
+
+
+def test_iteration_folders_are_not_indexed(tmp_path):
+    write({tmp_path / "auth" / "iteration_1" / "main.py": "", tmp_path / "app.py": ""})
+    assert set(ImportGraph([tmp_path]).modules) == {"app"}
+
+
+def test_closure_follows_local_imports(tmp_path):
+    write({
+        tmp_path / "app.py": "import helpers\nimport json\n",
+        tmp_path / "helpers.py": "from . import nothing\nfrom lib import core\n",
+        tmp_path / "lib" / "__init__.py": "",
+        tmp_path / "lib" / "core.py": "",
+        tmp_path / "unused.py": "",
+    })
+    graph = ImportGraph([tmp_path])
+    closure = graph.closure(tmp_path / "app.py")
+    assert closure == {
+        tmp_path / "app.py",
+        tmp_path / "helpers.py",
+        tmp_path / "lib" / "__init__.py",
+        tmp_path / "lib" / "core.py",
+    }
@@ -0,0 +1,95 @@
+# tests/test_jobs.py
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from core.jobs import BuildQueue
+from core.server import _BuildRequestHandler
+
+
+class FakeComposer:
+    """Builds instantly into `<output_dir>/<job id>/project`"""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.current_project = None
+        self.forgotten = []
+
+    def new_session(self, output_dir: Path) -> "FakeComposer":
+        session = FakeComposer(output_dir)
+        session.forgotten = self.forgotten
+        return session
+
+    def build_service(self, requirements: str) -> dict:
+        self.current_project = self.output_dir / "project"
+        status = "error" if requirements == "fail" else "success"
+        return {"status": status, "path": str(self.current_project)}
+
+    def forget_project(self, project_path: Path):
+        self.forgotten.append(project_path)
+
+
+@pytest.fixture
+def composer(tmp_path):
+    return FakeComposer(tmp_path)
+
+
+def test_jobs_build_in_their_own_directories(composer, tmp_path):
+    queue = BuildQueue(composer, max_jobs=2)
+    first = queue.submit("todo app", job_id="first")
+    second = queue.submit("fail")
+    queue.wait()
+    assert queue.get(first)["status"] == "success"
+    assert queue.get(first)["path"] == str(tmp_path / "first" / "project")
+    assert queue.get(second)["status"] == "failed"
+    assert queue.stats()["success"] == 1
+    queue.shutdown()
+
+
+def test_invalid_and_duplicate_job_ids_are_refused(composer):
+    queue = BuildQueue(composer)
+    with pytest.raises(ValueError):
+        queue.submit("todo app", job_id="../escape")
+    queue.submit("todo app", job_id="same")
+    with pytest.raises(ValueError):
+        queue.submit("todo app", job_id="same")
+    queue.shutdown()
+
+
+def test_evicted_jobs_release_their_projects(composer, tmp_path):
+    queue = BuildQueue(composer, max_jobs=1, keep_finished=1)
+    for job_id in ("a", "b", "c"):
+        queue.submit("todo app", job_id=job_id)
+        queue.wait([job_id])
+    assert [job["id"] for job in queue.jobs()] == ["c"]
+    assert composer.forgotten == [tmp_path / "a" / "project", tmp_path / "b" / "project"]
+    queue.shutdown()
+
+
+def test_server_routes_ignore_query_strings(composer):
+    queue = BuildQueue(composer)
+    handler = type("Handler", (_BuildRequestHandler,), {"queue": queue, "log_message": lambda *args: None})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        request = urllib.request.Request(
+            f"{base}/jobs?source=test",
+            data=json.dumps({"requirements": "todo app", "id": "web"}).encode("utf-8"),
+            method="POST"
+        )
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 202
+        queue.wait(["web"])
+        with urllib.request.urlopen(f"{base}/jobs/web?verbose=1") as response:
+            assert json.load(response)["status"] == "success"
+        with urllib.request.urlopen(f"{base}/status?x=1") as response:
+            assert json.load(response)["success"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        queue.shutdown()
@@ -0,0 +1,104 @@
+# tests/test_journal.py
+import json
+
+from utils.journal import BuildJournal, read_events, replay
+
+
+def build_events(journal: BuildJournal):
+    journal.append("build_started", durable=True, requirements="todo app", tech_plan={"project": "todo"}, components={
+        "api": {"status": "pending", "iterations": 0},
+        "db": {"status": "pending", "iterations": 0}
+    })
+    journal.append("component", name="api", iterations=1)
+    journal.append("component", name="db", status="passed", iterations=1)
+    journal.append("component", name="api", status="passed", iterations=2)
+
+
+def test_replay_folds_events_into_state():
+    events = [
+        {"seq": 1, "time": "t1", "event": "build_started", "data": {
+            "requirements": "r", "components": {"api": {"status": "pending", "iterations": 0}}
+        }},
+        {"seq": 2, "time": "t2", "event": "component", "data": {"name": "api", "iterations": 1}},
+        {"seq": 3, "time": "t3", "event": "component", "data": {"name": "api", "status": "passed"}},
+        {"seq": 4, "time": "t4", "event": "build_finished", "data": {"status": "success", "iterations": 1}},
+    ]
+    state = replay(events)
+    assert state["requirements"] == "r"
+    assert state["components"] == {"api": {"status": "passed", "iterations": 1}}
+    assert state["status"] == "success"
+    assert state["seq"] == 4
+    assert state["timestamp"] == "t4"
+
+
+def test_replay_restart_clears_previous_error():
+    events = [
+        {"seq": 1, "event": "build_finished", "data": {"status": "failed", "error": "boom"}},
+        {"seq": 2, "event": "build_started", "data": {"components": {}}},
+    ]
+    state = replay(events)
+    assert state["status"] == "in_progress"
+    assert "error" not in state
+
+
+def test_replay_starts_from_snapshot():
+    events = [
+        {"seq": 5, "event": "snapshot", "data": {"status": "in_progress", "components": {"api": {"iterations": 2}}}},
+        {"seq": 6, "event": "component", "data": {"name": "api", "status": "passed"}},
+    ]
+    assert replay(events)["components"] == {"api": {"iterations": 2, "status": "passed"}}
+
+
+def test_journal_appends_numbered_events(tmp_path):
+    path = tmp_path / "build_journal.jsonl"
+    journal = BuildJournal(path)
+    build_events(journal)
+    journal.close()
+
+    events = read_events(path)
+    assert [event["seq"] for event in events] == [1, 2, 3, 4]
+    assert [event["seq"] for event in read_events(path, since=2)] == [3, 4]
+    assert replay(events)["components"]["api"] == {"status": "passed", "iterations": 2}
+
+    # Reopening continues the numbering
+    journal = BuildJournal(path)
+    assert journal.append("component", name="db", iterations=2) == 5
+    journal.close()
+
+
+def test_read_events_leaves_partial_line(tmp_path):
+    path = tmp_path / "build_journal.jsonl"
+    complete = json.dumps({"seq": 1, "event": "component", "data": {"name": "api"}})
+    path.write_text(complete + "\n" + '{"seq": 2, "event": "comp', encoding="utf-8")
+    assert [event["seq"] for event in read_events(path)] == [1]
+
+
+def test_compact_keeps_state_and_sequence(tmp_path):
+    path = tmp_path / "build_journal.jsonl"
+    journal = BuildJournal(path)
+    build_events(journal)
+    before = journal.snapshot()
+
+    journal.compact()
+    events = read_events(path)
+    assert len(events) == 1
+    assert events[0]["event"] == "snapshot"
+    assert events[0]["seq"] == 4
+    assert replay(events)["components"] == before["components"]
+    assert replay(events)["requirements"] == "todo app"
+
+    # Appends after compaction continue where the journal left off
+    assert journal.append("build_finished", durable=True, status="success") == 5
+    state = journal.snapshot()
+    assert state["status"] == "success"
+    assert state["components"] == before["components"]
+    journal.close()
+
+
+def test_write_snapshot(tmp_path):
+    journal = BuildJournal(tmp_path / "build_journal.jsonl")
+    build_events(journal)
+    state = journal.write_snapshot(tmp_path / "build_state.json")
+    journal.close()
+    assert json.loads((tmp_path / "build_state.json").read_text(encoding="utf-8")) == state
+    assert state["status"] == "in_progress"
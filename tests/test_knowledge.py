@@ -0,0 +1,53 @@
+# tests/test_knowledge.py
+import pytest
+
+from core.knowledge import KnowledgeBase
+
+AUTH = "JWT authentication with login and token refresh endpoints"
+
+
+@pytest.fixture
+def kb(tmp_path):
+    kb = KnowledgeBase(tmp_path / "knowledge.db")
+    yield kb
+    kb.close()
+
+
+def test_similar_components_are_found(kb):
+    kb.store_success("auth", "AUTH = 1\n", ["FastAPI", "PyJWT"], description=AUTH)
+    kb.store_success("reports", "REPORTS = 1\n", ["pandas"], description="Monthly sales report as CSV export")
+
+    results = kb.find_similar("user login with JWT token authentication", ["FastAPI"])
+    assert [result["name"] for result in results] == ["auth"]
+    assert results[0]["code"] == "AUTH = 1\n"
+    assert results[0]["tech_stack"] == ["FastAPI", "PyJWT"]
+    assert kb.find_similar("the and with") == []
+
+
+def test_matching_tech_stack_ranks_first(kb):
+    kb.store_success("auth_flask", "A = 1\n", ["Flask"], description=AUTH)
+    kb.store_success("auth_fastapi", "B = 1\n", ["FastAPI"], description=AUTH)
+    results = kb.find_similar(AUTH, ["FastAPI"])
+    assert [result["name"] for result in results] == ["auth_fastapi", "auth_flask"]
+
+
+def test_identical_code_is_stored_once(kb):
+    kb.store_success("auth", "AUTH = 1\n", [], description=AUTH)
+    kb.store_success("auth", "AUTH = 1\n", [], description=AUTH)
+    assert len(kb.find_similar(AUTH)) == 1
+
+
+def test_fixes_rank_by_successes(kb):
+    kb.store_fix("ImportError@main.py", "patch a")
+    kb.store_fix("ImportError@main.py", "patch b")
+    kb.store_fix("ImportError@main.py", "patch b")
+    kb.store_fix("Timeout", "patch c")
+    assert kb.find_fixes("ImportError@main.py") == ["patch b", "patch a"]
+    assert kb.find_fixes("ImportError@main.py", k=1) == ["patch b"]
+    assert kb.find_fixes("unknown") == []
+
+
+def test_trigram_fallback_without_fts(kb):
+    kb._fts = False
+    kb.store_success("auth", "AUTH = 1\n", [], description=AUTH)
+    assert kb.find_similar("JWT authentication login")[0]["name"] == "auth"
@@ -0,0 +1,95 @@
+# tests/test_llm_cache.py
+import os
+import time
+
+import pytest
+
+from core.llm.cache import CacheMissError, CachedLLMClient, ResponseCache, cache_key
+from core.llm.prompt import Prompt
+from core.llm.resilient import ResilientLLMClient
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+class FakeClient:
+    def __init__(self, model: str, down: bool = False):
+        self.provider = model
+        self.model = model
+        self.down = down
+        self.calls = 0
+
+    def generate_code(self, prompt):
+        self.calls += 1
+        if self.down:
+            raise Unavailable()
+        return f"{self.model} answer"
+
+
+def json_prompt(text: str) -> Prompt:
+    prompt = Prompt()
+    prompt.add_user_message(text)
+    prompt.response_format = "json"
+    return prompt
+
+
+def test_key_ignores_indentation_but_not_model():
+    messages = [{"role": "user", "content": "    Build it\n      now  "}]
+    assert cache_key("m", messages) == cache_key("m", [{"role": "user", "content": "Build it\n  now"}])
+    assert cache_key("m", messages) != cache_key("other", messages)
+
+
+def test_request_options_are_part_of_the_key(tmp_path):
+    primary = FakeClient("primary")
+    client = CachedLLMClient(primary, ResponseCache(tmp_path))
+    client.generate_code("plan")
+    client.generate_code(json_prompt("plan"))
+    client.generate_code(json_prompt("plan"))
+    assert primary.calls == 2
+
+
+def test_failover_responses_are_stored_under_the_answering_model(tmp_path):
+    primary, backup = FakeClient("primary", down=True), FakeClient("backup")
+    resilient = ResilientLLMClient(
+        [primary, backup], base_delay=0, max_attempts=1, failure_threshold=1, reset_timeout=0
+    )
+    client = CachedLLMClient(resilient, ResponseCache(tmp_path))
+    assert client.generate_code("plan") == "backup answer"
+
+    # Not served as the primary's response once the primary is back
+    primary.down = False
+    assert client.generate_code("plan") == "primary answer"
+
+    # Replay reproduces what the recorded run got
+    (tmp_path / "replay").mkdir()
+    recorded = CachedLLMClient(resilient, ResponseCache(tmp_path / "replay"))
+    primary.down = True
+    recorded.generate_code("plan")
+    offline = ResilientLLMClient([FakeClient("primary"), FakeClient("backup")])
+    replay = CachedLLMClient(offline, ResponseCache(tmp_path / "replay"), replay=True)
+    assert replay.generate_code("plan") == "backup answer"
+    with pytest.raises(CacheMissError):
+        replay.generate_code("something else")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=500)
+    for index in range(3):
+        cache.put(f"{index:02d}" + "0" * 62, "m", "x" * 100)
+        # Distinct mtimes order the entries
+        path = cache._entry_path(f"{index:02d}" + "0" * 62)
+        os.utime(path, (time.time() - 100 + index, time.time() - 100 + index))
+    cache.get("00" + "0" * 62)
+    cache.put("03" + "0" * 62, "m", "x" * 100)
+    assert cache.get("00" + "0" * 62) is not None
+    assert cache.get("01" + "0" * 62) is None
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ResponseCache(tmp_path, max_age=60)
+    key = "ab" * 32
+    cache.put(key, "m", "old")
+    old = time.time() - 120
+    os.utime(cache._entry_path(key), (old, old))
+    assert cache.get(key) is None
@@ -0,0 +1,25 @@
+# tests/test_llm_clients.py
+import asyncio
+
+from benchmarks.mock_llm import MockLLMServer, ScriptedLLM
+from core.llm.factory import LLMClientFactory
+from core.llm.prompt import Prompt
+from core.llm.transport import get_http_client
+
+
+def prompt() -> Prompt:
+    prompt = Prompt()
+    prompt.add_system_message("You write Python code.")
+    prompt.add_user_message("Implement component 'auth'.")
+    return prompt
+
+
+def test_openai_client_calls_the_endpoint_over_the_shared_pool():
+    with MockLLMServer(ScriptedLLM(components=1)) as server:
+        client = LLMClientFactory.create_client("openai", base_url=server.url, resilience=False)
+        assert client.client._client is get_http_client("openai")
+
+        assert client.generate_code(prompt())
+        assert "".join(client.stream_code(prompt()))
+        assert asyncio.run(client.generate_code_async(prompt()))
+        assert server.model.stats["requests"] == 3
@@ -0,0 +1,14 @@
+# tests/test_lru.py
+from utils.lru import LRUCache
+
+
+def test_least_recently_used_entry_is_dropped():
+    cache = LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+    assert "b" not in cache
+    assert cache["a"] == 1 and cache["c"] == 3
+    assert len(cache) == 2
+    assert cache.get("b", "missing") == "missing"
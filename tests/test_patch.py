@@ -0,0 +1,113 @@
+# tests/test_patch.py
+import pytest
+
+from utils.bundle import bundle_files, split_bundle
+from utils.patch import PatchError, apply_patch, parse_edit_blocks
+
+CODE = """def add(a, b):
+    return a - b
+
+
+def mul(a, b):
+    return a * b
+"""
+
+
+def edit_block(search: str, replace: str) -> str:
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+
+def test_edit_block_replaces_matching_lines():
+    patched = apply_patch(CODE, edit_block("    return a - b", "    return a + b"))
+    assert "return a + b" in patched
+    assert "return a * b" in patched
+
+
+def test_edit_block_ignores_trailing_whitespace():
+    patched = apply_patch(CODE, edit_block("    return a - b   ", "    return a + b"))
+    assert "return a + b" in patched
+
+
+def test_several_edit_blocks_apply_in_order():
+    response = edit_block("    return a - b", "    return a + b") + edit_block("    return a * b", "    return b * a")
+    patched = apply_patch(CODE, response)
+    assert "return a + b" in patched and "return b * a" in patched
+
+
+def test_empty_search_appends():
+    patched = apply_patch(CODE, edit_block("", "\n\ndef sub(a, b):\n    return a - b"))
+    assert patched.rstrip().endswith("return a - b")
+    assert patched.startswith(CODE.rstrip())
+
+
+def test_ambiguous_edit_block_is_rejected():
+    code = "x = 1\nx = 1\n"
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_patch(code, edit_block("x = 1", "x = 2"))
+
+
+def test_unmatched_edit_block_is_rejected():
+    with pytest.raises(PatchError, match="does not match"):
+        apply_patch(CODE, edit_block("    return a / b", "    return a // b"))
+
+
+def test_unterminated_edit_block_is_rejected():
+    with pytest.raises(PatchError, match="Unterminated"):
+        parse_edit_blocks("<<<<<<< SEARCH\nx = 1\n=======\nx = 2\n")
+
+
+def test_unified_diff_is_located_by_context():
+    # The line numbers are wrong on purpose; the context decides
+    diff = """--- a/main.py
++++ b/main.py
+@@ -40,2 +40,2 @@
+ def add(a, b):
+-    return a - b
++    return a + b
+"""
+    patched = apply_patch(CODE, diff)
+    assert "return a + b" in patched
+    assert "return a - b" not in patched
+
+
+def test_unified_diff_tolerates_blank_context_without_space():
+    diff = """@@ -2,4 +2,4 @@
+     return a - b
+
+-
++# Multiplication
+ def mul(a, b):
+"""
+    patched = apply_patch(CODE, diff)
+    assert "# Multiplication\ndef mul(a, b):" in patched
+
+
+def test_ambiguous_diff_is_rejected():
+    code = "def f():\n    pass\n\n\ndef g():\n    pass\n"
+    diff = "@@ -1,1 +1,1 @@\n-    pass\n+    return 1\n"
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_patch(code, diff)
+
+
+def test_result_must_compile():
+    with pytest.raises(PatchError, match="does not compile"):
+        apply_patch(CODE, edit_block("    return a - b", "    return a +"))
+
+
+def test_noop_patch_is_rejected():
+    with pytest.raises(PatchError, match="does not change"):
+        apply_patch(CODE, edit_block("    return a - b", "    return a - b"))
+
+
+def test_response_without_edits_is_rejected():
+    with pytest.raises(PatchError, match="neither"):
+        apply_patch(CODE, "Looks fine to me.")
+
+
+def test_bundle_files_are_checked_separately():
+    bundle = bundle_files({"src/a.py": "A = 1\n", "src/b.py": "B = 2\n"})
+    patched = apply_patch(bundle, edit_block("B = 2", "B = 3"))
+    assert split_bundle(patched)["src/b.py"].strip() == "B = 3"
+
+    with pytest.raises(PatchError, match="src/a.py does not compile"):
+        apply_patch(bundle, edit_block("A = 1", "A = ("))
@@ -0,0 +1,64 @@
+# tests/test_plan_schema.py
+from core.plan_schema import component_files, repair_plan, repair_plan_text, validate_plan
+
+
+def test_fences_and_document_markers_are_dropped():
+    text = "```yaml\n---\nproject: todo\n...\n```"
+    assert repair_plan_text(text) == "project: todo"
+
+
+def test_common_shapes_are_repaired():
+    plan = repair_plan({
+        "project_name": "My Todo/App",
+        "structure": ["src/main.py", "tests/test_main.py", "docs/"],
+        "components": {"main": "Entry point", "db": {"description": "Storage", "dependencies": "main"}},
+        "stack": {"language": "Python 3.11", "framework": "FastAPI"},
+    })
+    assert plan["project"] == "My_Todo_App"
+    assert plan["directory_structure"] == {"src": ["main.py"], "tests": ["test_main.py"], "docs": []}
+    assert plan["components"][1] == {"name": "db", "description": "Storage", "depends_on": ["main"]}
+    assert plan["tech_stack"] == ["language: Python 3.11", "framework: FastAPI"]
+    assert plan["requirements"] == [] and plan["metadata"] == {}
+    assert validate_plan(plan) == {}
+
+
+def test_component_names_become_single_path_segments():
+    plan = repair_plan({
+        "components": [
+            {"name": "../escape", "description": "d"},
+            {"name": "api/v1", "description": "d", "depends_on": ["../escape"]},
+            {"name": " .hidden ", "description": "d"},
+        ]
+    })
+    assert [c["name"] for c in plan["components"]] == ["escape", "api_v1", "hidden"]
+    assert plan["components"][1]["depends_on"] == ["escape"]
+
+
+def test_unsafe_component_names_fail_validation():
+    plan = {
+        "project": "todo",
+        "directory_structure": {"src": ["main.py"]},
+        "components": [{"name": "../x", "description": "d"}],
+        "tech_stack": ["python"],
+    }
+    assert "components" in validate_plan(plan)
+    # Nothing usable is left of a name made only of dots and slashes
+    assert "components" in validate_plan({**plan, **repair_plan({"components": [{"name": "../", "description": "d"}]})})
+
+
+def test_requirements_keep_only_package_specifiers():
+    plan = repair_plan({"requirements": "fastapi>=0.110\n--index-url http://evil\n./local\nhttps://x/y.whl;pydantic[email]"})
+    assert plan["requirements"] == ["fastapi>=0.110", "pydantic[email]"]
+
+
+def test_validation_reports_each_broken_field():
+    problems = validate_plan({"project": "", "components": [{"name": "a"}, "b"], "tech_stack": []})
+    assert set(problems) == {"project", "directory_structure", "components", "tech_stack"}
+    duplicate = validate_plan({"components": [{"name": "a", "description": "x"}] * 2})
+    assert duplicate["components"] == "component names must be unique"
+
+
+def test_component_files_match_by_name_or_declaration():
+    plan = {"directory_structure": {"src": ["auth.py", "db.py"], "tests": ["test_auth.py"], "": ["README.md"]}}
+    assert component_files(plan, {"name": "Auth"}) == ["src/auth.py", "tests/test_auth.py"]
+    assert component_files(plan, {"name": "x", "files": ["src/db.py", "src/other.py", "README.md"]}) == ["src/db.py"]
@@ -0,0 +1,126 @@
+# tests/test_resilient.py
+import threading
+import time
+
+import pytest
+
+from core.llm.resilient import CircuitBreaker, CircuitOpenError, ResilientLLMClient
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+class Rejected(Exception):
+    status_code = 400
+
+
+class FakeClient:
+    """Answers with `name`, after failing with each error in `errors` in turn"""
+
+    def __init__(self, name: str, errors=(), delays=()):
+        self.provider = name
+        self.errors = list(errors)
+        self.delays = list(delays)
+        self.calls = 0
+        self.closed = threading.Semaphore(0)
+
+    def _next(self):
+        self.calls += 1
+        if self.delays:
+            time.sleep(self.delays.pop(0))
+        if self.errors:
+            raise self.errors.pop(0)
+
+    def generate_code(self, prompt):
+        self._next()
+        return f"{self.provider}: {prompt}"
+
+    def stream_code(self, prompt):
+        self._next()
+        try:
+            yield f"{self.provider}"
+            yield f": {prompt}"
+        finally:
+            self.closed.release()
+
+
+def resilient(*clients, **options) -> ResilientLLMClient:
+    return ResilientLLMClient(list(clients), base_delay=0, **options)
+
+
+def prime(client: ResilientLLMClient, seconds: float):
+    # Enough samples for a p95, so the next slow call gets hedged
+    for provider in client.providers:
+        provider.latency.samples.extend([seconds] * 20)
+        provider.first_chunk.samples.extend([seconds] * 20)
+
+
+def test_retryable_errors_are_retried():
+    primary = FakeClient("primary", errors=[Unavailable(), TimeoutError()])
+    assert resilient(primary).generate_code("x") == "primary: x"
+    assert primary.calls == 3
+
+
+def test_other_errors_propagate_without_retry():
+    primary = FakeClient("primary", errors=[Rejected()])
+    with pytest.raises(Rejected):
+        resilient(primary).generate_code("x")
+    assert primary.calls == 1
+
+
+def test_open_breaker_fails_over():
+    primary = FakeClient("primary", errors=[Unavailable()] * 10)
+    client = resilient(primary, FakeClient("backup"), failure_threshold=2)
+    assert client.generate_code("x") == "backup: x"
+    assert primary.calls == 2
+    # While open, the primary is skipped entirely
+    assert client.generate_code("y") == "backup: y"
+    assert primary.calls == 2
+
+
+def test_all_breakers_open():
+    client = resilient(FakeClient("primary", errors=[Unavailable()] * 10), failure_threshold=1)
+    with pytest.raises(Unavailable):
+        client.generate_code("x")
+    with pytest.raises(CircuitOpenError):
+        client.generate_code("x")
+
+
+def test_breaker_half_opens_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial call at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_slow_call_is_hedged():
+    primary = FakeClient("primary", delays=[1.0, 0])
+    client = resilient(primary)
+    prime(client, 0.01)
+    started = time.perf_counter()
+    assert client.generate_code("x") == "primary: x"
+    assert time.perf_counter() - started < 0.9
+    assert primary.calls == 2
+
+
+def test_slow_first_chunk_is_hedged_and_loser_closed():
+    primary = FakeClient("primary", delays=[1.0, 0])
+    client = resilient(primary)
+    prime(client, 0.01)
+    started = time.perf_counter()
+    assert "".join(client.stream_code("x")) == "primary: x"
+    assert time.perf_counter() - started < 0.9
+    assert primary.calls == 2
+    # Both the consumed stream and the slow one, once it opened
+    assert primary.closed.acquire(timeout=2) and primary.closed.acquire(timeout=2)
+
+
+def test_stream_is_retried_before_the_first_chunk():
+    primary = FakeClient("primary", errors=[Unavailable()])
+    assert "".join(resilient(primary).stream_code("x")) == "primary: x"
+    assert primary.calls == 2
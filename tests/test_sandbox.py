@@ -0,0 +1,30 @@
+# tests/test_sandbox.py
+import threading
+
+import pytest
+
+from utils.sandbox import SandboxClosedError, SandboxPool
+
+
+def test_close_wakes_runs_waiting_for_a_worker(tmp_path):
+    # No workers: every run waits for one to become idle
+    pool = SandboxPool(size=0, preload=[], memory_limit=0, test_timeout=1)
+    errors = []
+
+    def run():
+        try:
+            pool.run(tmp_path, [], [], tmp_path / "log.xml", timeout=1)
+        except SandboxClosedError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    pool.close()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(errors) == 3
+
+    with pytest.raises(SandboxClosedError):
+        pool.run(tmp_path, [], [], tmp_path / "log.xml", timeout=1)
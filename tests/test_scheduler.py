@@ -0,0 +1,60 @@
+# tests/test_scheduler.py
+import threading
+import time
+
+import pytest
+
+from core.scheduler import ComponentScheduler
+
+
+def components(**depends_on):
+    return [{"name": name, "depends_on": deps} for name, deps in depends_on.items()]
+
+
+def test_dependencies_finish_first():
+    finished = []
+    lock = threading.Lock()
+
+    def task(component):
+        time.sleep(0.01)
+        with lock:
+            finished.append(component["name"])
+        return component["name"].upper()
+
+    scheduler = ComponentScheduler(components(api=["db", "auth"], db=[], auth=["db"], ui=["api"]), max_workers=4)
+    assert scheduler.run(task) == {"db": "DB", "auth": "AUTH", "api": "API", "ui": "UI"}
+    assert finished == ["db", "auth", "api", "ui"]
+
+
+def test_independent_components_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    scheduler = ComponentScheduler(components(a=[], b=[], c=[]), max_workers=3)
+    # Deadlocks (and times out) unless all three run at once
+    assert len(scheduler.run(lambda component: barrier.wait())) == 3
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError, match="Circular"):
+        ComponentScheduler(components(a=["b"], b=["a"]))
+
+
+def test_unknown_self_and_completed_dependencies_are_ignored():
+    scheduler = ComponentScheduler(
+        [{"name": "api", "dependencies": "db"}, {"name": "ui", "depends_on": ["ui", "missing", "api"]}],
+        completed={"db"}
+    )
+    assert scheduler.graph == {"api": set(), "ui": {"api"}}
+
+
+def test_failure_stops_scheduling_dependents():
+    started = []
+
+    def task(component):
+        started.append(component["name"])
+        if component["name"] == "db":
+            raise RuntimeError("db failed")
+
+    scheduler = ComponentScheduler(components(db=[], api=["db"]), max_workers=1)
+    with pytest.raises(RuntimeError, match="db failed"):
+        scheduler.run(task)
+    assert started == ["db"]
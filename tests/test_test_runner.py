@@ -0,0 +1,35 @@
+# tests/test_test_runner.py
+from utils.files import ProjectManager
+from utils.test_runner import TestRunner
+
+CODE = "import dep\n\n\ndef test_dep():\n    assert dep.VALUE == 1\n"
+
+
+def make_runner(site_packages, environment):
+    runner = TestRunner(max_workers=1, sandbox=False)
+    runner.prepare([], site_packages, environment=environment)
+    return runner
+
+
+def runs(runner, project) -> int:
+    """Number of test processes a run of the component needed"""
+    result = runner.execute(project, "auth")
+    assert result["passed"], result["logs"]
+    return 1 if result["logs"] else 0
+
+
+def test_results_are_memoized_per_environment(tmp_path):
+    site_packages = tmp_path / "site-packages"
+    site_packages.mkdir()
+    (site_packages / "dep.py").write_text("VALUE = 1\n")
+    project = tmp_path / "app"
+    ProjectManager().write_code(project, "auth", CODE, 1)
+
+    runner = make_runner(site_packages, "lock-a")
+    assert runs(runner, project) == 1
+    assert runs(runner, project) == 0
+
+    # Installed packages are not hashed; the environment stands for them
+    (site_packages / "dep.py").write_text("VALUE = 1  # reinstalled\n")
+    assert runs(runner, project) == 0
+    assert runs(make_runner(site_packages, "lock-b"), project) == 1
@@ -0,0 +1,66 @@
+# tests/test_transport.py
+import asyncio
+import threading
+import time
+
+from core.llm.transport import ProviderLimiter
+
+
+def test_threads_never_exceed_the_limit():
+    limiter = ProviderLimiter(2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with limiter:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+    assert limiter._available == 2
+
+
+def test_threads_and_coroutines_share_one_budget():
+    limiter = ProviderLimiter(1)
+    order = []
+    limiter.__enter__()
+
+    async def call():
+        async with limiter:
+            order.append("coroutine")
+
+    def release_later():
+        time.sleep(0.05)
+        order.append("thread released")
+        limiter.__exit__(None, None, None)
+
+    threading.Thread(target=release_later).start()
+    asyncio.run(call())
+    assert order == ["thread released", "coroutine"]
+    assert limiter._available == 1
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = ProviderLimiter(1)
+
+    async def scenario():
+        async with limiter:
+            waiter = asyncio.ensure_future(limiter.__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        # The slot is free again: this would block forever otherwise
+        await asyncio.wait_for(limiter.__aenter__(), timeout=1)
+        await limiter.__aexit__(None, None, None)
+
+    asyncio.run(scenario())
+    assert limiter._available == 1
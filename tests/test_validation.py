@@ -0,0 +1,125 @@
+# tests/test_validation.py
+import pytest
+
+from utils.bundle import bundle_files
+from utils.files import ProjectManager
+from utils.gate import CodeGate
+from utils.validation import SecurityValidator, collect_project_files, scan_source
+
+
+def rules(source: str) -> list:
+    return [finding["rule"] for finding in scan_source(source)["findings"]]
+
+
+@pytest.mark.parametrize("source, rule", [
+    ("eval(data)", "eval-exec"),
+    ("import subprocess\nsubprocess.run(cmd, shell=True)", "subprocess-shell"),
+    ("import os\nos.system(cmd)", "subprocess-shell"),
+    ("import pickle\npickle.loads(blob)", "insecure-deserialization"),
+    ("import yaml\nyaml.load(text)", "insecure-deserialization"),
+    ("cursor.execute(f'SELECT * FROM users WHERE id = {user_id}')", "sql-formatting"),
+    ("cursor.execute('DELETE FROM t WHERE id = %s' % user_id)", "sql-formatting"),
+    ("SECRET_KEY = 'k3J9x!pQ2vLm8ZrT'", "hardcoded-secret"),
+    ("connect(password='Zq8#mW2v!rT5')", "hardcoded-secret"),
+    ("settings = {'api_key': 'sk-4f9a8b7c6d5e'}", "hardcoded-secret"),
+])
+def test_rules_report_insecure_code(source, rule):
+    assert rule in rules(source)
+
+
+@pytest.mark.parametrize("source", [
+    "import subprocess\nsubprocess.run(['ls', '-l'])",
+    "import yaml\nyaml.load(text, Loader=yaml.SafeLoader)",
+    "cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))",
+    "from os import environ\nSECRET_KEY = environ['SECRET_KEY']",
+])
+def test_rules_accept_safe_code(source):
+    assert rules(source) == []
+
+
+@pytest.mark.parametrize("source", [
+    'oauth2 = OAuth2PasswordBearer(tokenUrl="/auth/token")',
+    'TOKEN_TYPE = "bearer_token"',
+    'password_field = "password_hash"',
+    'AUTH_HEADER = "X-Api-Token-Value"',
+    'token_endpoint = "https://example.com/oauth/token"',
+    'api_key = "changeme"',
+    'db_password = "xxxxxxxxxxxxxxxx"',
+])
+def test_secret_rule_ignores_names_paths_and_placeholders(source):
+    assert "hardcoded-secret" not in rules(source)
+
+
+def test_aliases_are_resolved():
+    assert "subprocess-shell" in rules("from os import system as run\nrun(cmd)")
+
+
+def test_only_high_severity_findings_fail():
+    validator = SecurityValidator()
+    medium = validator.validate("SECRET_KEY = 'k3J9x!pQ2vLm8ZrT'\n")
+    assert medium["passed"]
+    assert medium["issues"] == []
+    assert "hardcoded-secret" in medium["warnings"][0]
+
+    high = validator.validate("import os\nos.system(cmd)\n")
+    assert not high["passed"]
+    assert "subprocess-shell" in high["issues"][0]
+
+
+def test_each_bundle_file_is_scanned():
+    code = bundle_files({"src/a.py": "A = 1\n", "src/b.py": "import os\nos.system(cmd)\n"})
+    report = SecurityValidator().validate(code)
+    assert not report["passed"]
+    assert report["findings"][0]["file"] == "src/b.py"
+
+
+def test_non_python_bundle_files_are_refused():
+    code = bundle_files({"src/a.py": "A = 1\n", "config.yaml": "cmd: rm -rf /\n"})
+    report = SecurityValidator().validate(code)
+    assert not report["passed"]
+    assert "non-Python" in report["issues"][0]
+
+
+def test_unparseable_files_are_left_to_the_gate(tmp_path):
+    code = bundle_files({"src/a.py": "def broken(:\n", "src/b.py": "B = 1\n"})
+    report = SecurityValidator().validate(code)
+    assert report["passed"]
+    assert "src/a.py" in report["skipped"][0]
+
+    iteration = ProjectManager().write_code(tmp_path, "auth", code, 1)
+    gate = CodeGate().check(iteration, roots=[tmp_path])
+    assert not gate["passed"]
+    assert "SyntaxError" in gate["error"]
+
+
+def test_full_audit_caches_by_content(tmp_path):
+    (tmp_path / "app.py").write_text("import os\nos.system(cmd)\n")
+    (tmp_path / "config.py").write_text("SECRET_KEY = 'k3J9x!pQ2vLm8ZrT'\n")
+    validator = SecurityValidator()
+    first = validator.full_audit(tmp_path)
+    assert not first["passed"]
+    assert "app.py:2" in first["details"]
+    assert any("hardcoded-secret" in warning for warning in first["warnings"])
+
+    (tmp_path / "app.py").write_text("import os\nprint(os.getcwd())\n")
+    second = validator.full_audit(tmp_path)
+    assert second["passed"]
+    assert second["cache_hits"] == 1
+
+
+def test_final_checks_read_the_promoted_iteration(tmp_path):
+    manager = ProjectManager()
+    # Losing candidates of a round are written after the winner
+    manager.write_code(tmp_path, "auth", "A = 1\n", 1)
+    manager.write_code(tmp_path, "auth", "import os\nos.system(cmd)\n", 2)
+    manager.promote_iteration(tmp_path, "auth", 1, hold_until=2)
+    manager.write_code(tmp_path, "api", "B = 1\n", 1)
+    manager.write_code(tmp_path, "api", "def broken(:\n", 2)
+    manager.promote_iteration(tmp_path, "api", 1, hold_until=2)
+
+    assert collect_project_files(tmp_path) == [
+        tmp_path / "api" / "iteration_1" / "main.py",
+        tmp_path / "auth" / "iteration_1" / "main.py",
+    ]
+    assert SecurityValidator().full_audit(tmp_path)["passed"]
+    assert manager.check_style(tmp_path)["passed"]
@@ -0,0 +1,251 @@
+# utils/artifacts.py
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import stat
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = Path(".composer")
+LATEST_LINK = "latest"
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+ITERATION_DIR = re.compile(r"^iteration_(\d+)$")
+
+
+def _refs_name(component: str) -> str:
+    return f"{hashlib.sha256(component.encode('utf-8')).hexdigest()[:16]}.json"
+
+
+def latest_iteration(project_path: Path, component: str) -> Optional[int]:
+    """
+    The iteration a component's `latest` points at, read without creating a
+    store. This is the promoted one, which need not be the highest number:
+    losing candidates of a concurrent round are written after it.
+    """
+    match = None
+    try:
+        match = ITERATION_DIR.match(os.readlink(project_path / component / LATEST_LINK))
+    except OSError:
+        pass
+    if match:
+        return int(match.group(1))
+    try:
+        with open(project_path / STORE_DIR / "refs" / _refs_name(component), encoding="utf-8") as f:
+            return json.load(f).get("latest")
+    except FileNotFoundError:
+        return None
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated code of one project.
+
+    File contents are stored once under `.composer/objects/<hash>` and every
+    iteration folder holds read-only hardlinks to them, so retries that
+    regenerate identical files cost no extra disk space. A per-component ref
+    file maps iterations to file hashes, which lets old iterations be
+    compressed away and materialized again on demand. `<component>/latest`
+    is kept pointing at the newest iteration.
+    """
+
+    def __init__(self, project_path: Path):
+        self.project_path = project_path
+        self.objects_path = project_path / STORE_DIR / "objects"
+        self.refs_path = project_path / STORE_DIR / "refs"
+        self.tmp_path = project_path / STORE_DIR / "tmp"
+        for path in (self.objects_path, self.refs_path, self.tmp_path):
+            path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.objects_path / digest[:2] / digest
+
+    def put(self, content: bytes) -> str:
+        """
+        Store `content` and return its hash.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        blob = self._blob_path(digest)
+        with self._lock:
+            if blob.exists():
+                return digest
+            self._restore_blob(digest)
+            if blob.exists():
+                return digest
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.tmp_path / f"{digest}.{threading.get_ident()}"
+            tmp.write_bytes(content)
+            os.chmod(tmp, READ_ONLY)
+            os.replace(tmp, blob)
+        return digest
+
+    def adopt(self, path: Path) -> str:
+        """
+        Move an already written file into the store, leaving a hardlink in
+        its place, and return its hash.
+        """
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        blob = self._blob_path(digest)
+        with self._lock:
+            self._restore_blob(digest)
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.chmod(path, READ_ONLY)
+                try:
+                    os.link(path, blob)
+                    return digest
+                except OSError:
+                    shutil.copy2(path, blob)
+            self.link(digest, path)
+        return digest
+
+    def link(self, digest: str, dest: Path):
+        """
+        Place the blob `digest` at `dest`, as a hardlink where possible.
+        """
+        with self._lock:
+            self._restore_blob(digest)
+            blob = self._blob_path(digest)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                # Cross-device or unsupported filesystem
+                shutil.copy2(blob, tmp)
+            os.replace(tmp, dest)
+
+    def record(self, component: str, iteration: int, files: Dict[str, str]):
+        """
+        Remember which blobs make up an iteration and point `latest` at it.
+        """
+        with self._lock:
+            refs = self._load_refs(component)
+            refs["iterations"][str(iteration)] = files
+            if iteration > refs.get("held", 0):
+                refs["latest"] = max(int(i) for i in refs["iterations"])
+            self._save_refs(component, refs)
+            self._update_latest_link(component, refs["latest"])
+
+    def promote(self, component: str, iteration: int, hold_until: Optional[int] = None):
+        """
+        Point `latest` at an older iteration, e.g. the one candidate of a
+        concurrent round that passed. Iterations up to `hold_until` recorded
+        afterwards (losing candidates still finishing) leave it there.
+        """
+        with self._lock:
+            refs = self._load_refs(component)
+            if str(iteration) not in refs["iterations"]:
+                raise FileNotFoundError(f"No iteration {iteration} stored for component '{component}'")
+            refs["latest"] = iteration
+            if hold_until is not None:
+                refs["held"] = hold_until
+            self._save_refs(component, refs)
+            self._update_latest_link(component, iteration)
+
+    def files(self, component: str, iteration: int) -> Dict[str, str]:
+        """
+        Map the file names of an iteration to their blob hashes.
+        """
+        with self._lock:
+            files = self._load_refs(component)["iterations"].get(str(iteration))
+        if files is None:
+            raise FileNotFoundError(f"No iteration {iteration} stored for component '{component}'")
+        return files
+
+    def materialize(self, component: str, iteration: Optional[int] = None) -> Path:
+        """
+        Make sure an iteration's files exist on disk and return its folder.
+        Defaults to the latest iteration.
+        """
+        with self._lock:
+            refs = self._load_refs(component)
+            if iteration is None:
+                iteration = refs.get("latest")
+            files = refs["iterations"].get(str(iteration))
+            if files is None:
+                raise FileNotFoundError(f"No iteration {iteration} stored for component '{component}'")
+            iteration_path = self.project_path / component / f"iteration_{iteration}"
+            for name, digest in files.items():
+                if not (iteration_path / name).exists():
+                    self.link(digest, iteration_path / name)
+        return iteration_path
+
+    def compact(self, component: str, keep: int):
+        """
+        Drop the files of all but the newest `keep` iterations of a component
+        and gzip blobs no longer linked from any uncompacted iteration. The
+        latest iteration is always kept.
+        """
+        with self._lock:
+            refs = self._load_refs(component)
+            iterations = sorted(int(i) for i in refs["iterations"])
+            old = [
+                i for i in iterations[:-keep]
+                if i not in refs.get("compacted", []) and i != refs.get("latest")
+            ] if keep else []
+            if not old:
+                return
+
+            for iteration in old:
+                iteration_path = self.project_path / component / f"iteration_{iteration}"
+                for name in refs["iterations"][str(iteration)]:
+                    (iteration_path / name).unlink(missing_ok=True)
+            refs["compacted"] = sorted(set(refs.get("compacted", [])) | set(old))
+            self._save_refs(component, refs)
+
+            for iteration in old:
+                for digest in refs["iterations"][str(iteration)].values():
+                    blob = self._blob_path(digest)
+                    # st_nlink == 1 means no iteration folder links to it anymore
+                    if blob.exists() and blob.stat().st_nlink == 1:
+                        with open(blob, "rb") as src, gzip.open(blob.with_suffix(".gz"), "wb") as dst:
+                            shutil.copyfileobj(src, dst)
+                        os.chmod(blob.with_suffix(".gz"), READ_ONLY)
+                        blob.unlink()
+
+    def _restore_blob(self, digest: str):
+        blob = self._blob_path(digest)
+        compressed = blob.with_suffix(".gz")
+        if blob.exists() or not compressed.exists():
+            return
+        tmp = self.tmp_path / f"{digest}.{threading.get_ident()}"
+        with gzip.open(compressed, "rb") as src, open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.chmod(tmp, READ_ONLY)
+        os.replace(tmp, blob)
+        compressed.unlink()
+
+    def _update_latest_link(self, component: str, iteration: int):
+        link = self.project_path / component / LATEST_LINK
+        tmp = link.with_name(f".{LATEST_LINK}.{threading.get_ident()}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.symlink(f"iteration_{iteration}", tmp, target_is_directory=True)
+            os.replace(tmp, link)
+        except OSError as e:
+            logger.debug(f"Could not update latest link for {component}: {str(e)}")
+
+    def _refs_file(self, component: str) -> Path:
+        return self.refs_path / _refs_name(component)
+
+    def _load_refs(self, component: str) -> Dict:
+        try:
+            with open(self._refs_file(component), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"component": component, "iterations": {}, "latest": None}
+
+    def _save_refs(self, component: str, refs: Dict):
+        path = self._refs_file(component)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(refs, f, indent=2)
+        os.replace(tmp, path)
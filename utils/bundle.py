@@ -0,0 +1,41 @@
+# utils/bundle.py
+"""
+Code bundles: the files of a multi-file component joined into one string,
+each under a `# === file: <path> ===` header.
+"""
+import re
+from pathlib import PurePosixPath
+from typing import Dict, Optional
+
+# Separates the files of a multi-file component in its code bundle
+FILE_HEADER = "# === file: {path} ==="
+_FILE_HEADER = re.compile(r"^# === file: (.+?) ===$", re.MULTILINE)
+
+
+def bundle_files(files: Dict[str, str]) -> str:
+    """
+    Join the files of a component into one code bundle. The bundle is what
+    validation, debugging and the knowledge base see as the component's code.
+    """
+    return "\n".join(
+        f"{FILE_HEADER.format(path=path)}\n{content.rstrip()}\n"
+        for path, content in files.items()
+    )
+
+
+def split_bundle(code: str) -> Optional[Dict[str, str]]:
+    """
+    Split a code bundle into {relative path: content}, or None for plain
+    single-file code.
+    """
+    headers = list(_FILE_HEADER.finditer(code))
+    if not headers:
+        return None
+    files = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        path = PurePosixPath(header.group(1).strip())
+        if path.is_absolute() or ".." in path.parts:
+            raise ValueError(f"Refusing to write outside the component: {path}")
+        end = following.start() if following else len(code)
+        files[str(path)] = code[header.end():end].strip("\n") + "\n"
+    return files
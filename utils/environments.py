@@ -0,0 +1,327 @@
+# utils/environments.py
+"""
+Dependency resolution and shared virtual environments for generated projects.
+
+A plan's declared pip requirements are resolved once into a lock of pinned,
+hashed packages, and the packages are kept in a local wheelhouse. Only
+wheels are used, so no package's build scripts ever run on the host.
+Environments are built from the wheelhouse only and keyed by a hash of the
+lock, so every project with the same dependency set reuses one environment;
+projects get a hardlinked clone of it as `<project>/.venv`. With `offline`,
+resolution and installs never leave the wheelhouse.
+
+    cache_dir/
+        wheelhouse/         downloaded wheels
+        locks/<key>.json    resolved locks, keyed by the requirements
+        envs/<hash>/        shared environments, keyed by the lock
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import venv
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = "requirements.lock"
+ENV_MARKER = ".composer-env"
+
+# Tech stack entries that are not pip-installable packages
+NON_PACKAGES = {
+    "python", "python3", "cpython", "docker", "kubernetes", "postgresql",
+    "postgres", "mysql", "sqlite", "redis-server", "nginx", "linux", "git"
+}
+_WORD = re.compile(r"^[A-Za-z][\w.\-]*$")
+_VERSION = re.compile(r"^v?(\d+(?:\.\d+)*)$")
+_MISSING = re.compile(
+    r"(?:No matching distribution found for|Could not find a version that satisfies the requirement) ([^\s(]+)"
+)
+MAX_DROPPED = 5
+_SDIST_SUFFIXES = (".tar.gz", ".tar.bz2", ".zip")
+
+
+def stack_packages(tech_stack: Iterable) -> List[Tuple[str, Optional[str]]]:
+    """
+    (distribution name, version) for every tech stack entry that names a
+    Python package, e.g. "framework: FastAPI 0.110" -> ("fastapi", "0.110").
+    """
+    if isinstance(tech_stack, dict):
+        tech_stack = [f"{key}: {value}" for key, value in tech_stack.items()]
+    packages = []
+    for entry in tech_stack or []:
+        words = str(entry).split(":")[-1].split()
+        for index, word in enumerate(words):
+            name = word.lower().rstrip(".,")
+            if not _WORD.match(name):
+                continue
+            if name not in NON_PACKAGES and name not in (p for p, _ in packages):
+                following = words[index + 1] if index + 1 < len(words) else ""
+                version = _VERSION.match(following.rstrip(".,"))
+                packages.append((name, version.group(1) if version else None))
+            break  # Only the first word names the technology
+    return packages
+
+
+def _canonical(name: str) -> str:
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+def _requirement_name(requirement: str) -> str:
+    return _canonical(re.split(r"[=<>~!\[;]", requirement, maxsplit=1)[0].strip())
+
+
+def distribution_of(filename: str) -> Optional[Tuple[str, str]]:
+    """
+    Canonical (name, version) of a wheel or sdist file name, e.g.
+    "Flask-3.0.2-py3-none-any.whl" -> ("flask", "3.0.2"), or None for
+    anything else.
+    """
+    if filename.endswith(".whl"):
+        # name-version(-build)?-python-abi-platform.whl, "-" escaped as "_" in fields
+        parts = filename[:-len(".whl")].split("-")
+        if len(parts) not in (5, 6):
+            return None
+        return _canonical(parts[0]), parts[1].lower()
+    for suffix in _SDIST_SUFFIXES:
+        if filename.endswith(suffix):
+            # name-version.tar.gz; the name itself may contain dashes
+            name, _, version = filename[:-len(suffix)].rpartition("-")
+            if not name or not version[:1].isdigit():
+                return None
+            return _canonical(name), version.lower()
+    return None
+
+
+class EnvironmentManager:
+    """
+    Resolves requirements to locks and provides environments for them.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = Path("~/.cache/composer"),
+        offline: bool = False,
+        index_url: Optional[str] = None,
+        timeout: float = 600
+    ):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.wheelhouse = self.cache_dir / "wheelhouse"
+        self.offline = offline
+        self.index_url = index_url
+        self.timeout = timeout
+        for path in (self.wheelhouse, self.cache_dir / "locks", self.cache_dir / "envs"):
+            path.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def _python_tag(self) -> str:
+        return f"{sys.implementation.name}{sys.version_info.major}.{sys.version_info.minor}-{platform.machine()}"
+
+    def _index_args(self) -> List[str]:
+        args = ["--find-links", str(self.wheelhouse)]
+        if self.offline:
+            return args + ["--no-index"]
+        if self.index_url:
+            return args + ["--index-url", self.index_url]
+        return args
+
+    def _pip(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-m", "pip", "--disable-pip-version-check", *args],
+            capture_output=True,
+            text=True,
+            timeout=self.timeout
+        )
+
+    def resolve(self, requirements: List[str]) -> Dict:
+        """
+        Pin `requirements` and their dependencies, and make sure every pinned
+        package is in the wheelhouse. Locks are cached per requirement set;
+        a cached lock whose environment is not built yet has its wheels
+        checked again, since the wheelhouse may have been pruned since.
+        Requirements with no wheel for this interpreter are dropped with a
+        warning.
+        """
+        requirements = sorted(set(requirements))
+        key = hashlib.sha256(json.dumps([self._python_tag, requirements]).encode()).hexdigest()[:16]
+        lock_path = self.cache_dir / "locks" / f"{key}.json"
+        try:
+            with open(lock_path, encoding="utf-8") as f:
+                lock = json.load(f)
+        except FileNotFoundError:
+            pass
+        else:
+            if not (self.cache_dir / "envs" / lock["hash"] / ENV_MARKER).exists():
+                self._fill_wheelhouse(lock["packages"])
+            return lock
+
+        packages, dropped = self._resolve(requirements)
+        self._fill_wheelhouse(packages)
+        pins = sorted(f"{p['name']}=={p['version']}" for p in packages)
+        lock = {
+            "requirements": [r for r in requirements if r not in dropped],
+            "dropped": dropped,
+            "packages": packages,
+            "python": self._python_tag,
+            "hash": hashlib.sha256(json.dumps([self._python_tag, pins]).encode()).hexdigest()[:16]
+        }
+        tmp_path = lock_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(lock, f, indent=2)
+        os.replace(tmp_path, lock_path)
+        return lock
+
+    def _resolve(self, requirements: List[str]) -> Tuple[List[Dict], List[str]]:
+        remaining, dropped = list(requirements), []
+        while True:
+            if not remaining:
+                return [], dropped
+            with tempfile.TemporaryDirectory(prefix="composer-resolve-") as tmp:
+                report_path = Path(tmp) / "report.json"
+                result = self._pip(
+                    "install", "--dry-run", "--ignore-installed", "--only-binary=:all:", "--quiet",
+                    "--report", str(report_path), *self._index_args(), *remaining
+                )
+                if result.returncode == 0:
+                    with open(report_path, encoding="utf-8") as f:
+                        report = json.load(f)
+                    break
+
+            # Misspelled names and sdist-only packages; drop and retry
+            missing = _MISSING.search(result.stderr)
+            name = missing and next(
+                (r for r in remaining if _requirement_name(r) == _requirement_name(missing.group(1))),
+                None
+            )
+            if not name or len(dropped) >= MAX_DROPPED:
+                raise RuntimeError(f"Dependency resolution failed: {result.stderr.strip()[-2000:]}")
+            logger.warning(f"No distribution found for '{name}', leaving it out of the lock")
+            remaining.remove(name)
+            dropped.append(name)
+
+        packages = []
+        for item in report.get("install", []):
+            hashes = item.get("download_info", {}).get("archive_info", {}).get("hashes", {})
+            packages.append({
+                "name": _canonical(item["metadata"]["name"]).replace("_", "-"),
+                "version": item["metadata"]["version"],
+                "sha256": hashes.get("sha256")
+            })
+        return sorted(packages, key=lambda p: p["name"]), dropped
+
+    def _fill_wheelhouse(self, packages: List[Dict]):
+        present = {distribution_of(path.name) for path in self.wheelhouse.iterdir()}
+        missing = [
+            f"{p['name']}=={p['version']}" for p in packages
+            if (_canonical(p["name"]), p["version"].lower()) not in present
+        ]
+        if not missing:
+            return
+        if self.offline:
+            raise RuntimeError(f"Packages missing from the wheelhouse: {', '.join(missing)}")
+        logger.info(f"Downloading {len(missing)} packages into the wheelhouse")
+        result = self._pip(
+            "download", "--no-deps", "--only-binary=:all:", "--dest", str(self.wheelhouse),
+            *self._index_args(), *missing
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Downloading dependencies failed: {result.stderr.strip()[-2000:]}")
+
+    def lock_text(self, lock: Dict) -> str:
+        """
+        The lock as a pip requirements file with hashes.
+        """
+        lines = [f"# Resolved for {lock['python']}, environment {lock['hash']}"]
+        for package in lock["packages"]:
+            line = f"{package['name']}=={package['version']}"
+            if package["sha256"]:
+                line += f" \\\n    --hash=sha256:{package['sha256']}"
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+    def environment(self, lock: Dict) -> Path:
+        """
+        The shared environment for `lock`, built from the wheelhouse on first
+        use. Concurrent builders of the same environment wait for each other.
+        """
+        env_path = self.cache_dir / "envs" / lock["hash"]
+        if (env_path / ENV_MARKER).exists():
+            return env_path
+
+        with open(env_path.with_suffix(".lock"), "w") as guard:
+            fcntl.flock(guard, fcntl.LOCK_EX)
+            if (env_path / ENV_MARKER).exists():
+                return env_path
+            # Left behind by an interrupted build
+            shutil.rmtree(env_path, ignore_errors=True)
+
+            logger.info(f"Building environment {lock['hash']} ({len(lock['packages'])} packages)")
+            venv.EnvBuilder(with_pip=False, symlinks=True).create(env_path)
+            (env_path / LOCK_FILE).write_text(self.lock_text(lock), encoding="utf-8")
+            if lock["packages"]:
+                result = self._pip(
+                    "--python", str(self._python(env_path)), "install", "--no-deps", "--no-index",
+                    "--find-links", str(self.wheelhouse), "-r", str(env_path / LOCK_FILE)
+                )
+                if result.returncode != 0:
+                    shutil.rmtree(env_path, ignore_errors=True)
+                    raise RuntimeError(f"Installing dependencies failed: {result.stderr.strip()[-2000:]}")
+            (env_path / ENV_MARKER).write_text(lock["hash"], encoding="utf-8")
+        return env_path
+
+    def materialize(self, lock: Dict, project_path: Path) -> Path:
+        """
+        Give the project a `.venv` cloned from the shared environment of
+        `lock`, and write the lock to `<project>/requirements.lock`.
+        """
+        (project_path / LOCK_FILE).write_text(self.lock_text(lock), encoding="utf-8")
+        return self.clone(self.environment(lock), project_path / ".venv")
+
+    def clone(self, env_path: Path, dest: Path) -> Path:
+        """
+        Hardlink `env_path` to `dest`. Files that mention the environment's
+        own path are rewritten, which breaks their link, so the shared
+        environment is never modified through a clone.
+        """
+        marker = (env_path / ENV_MARKER).read_text(encoding="utf-8")
+        try:
+            if (dest / ENV_MARKER).read_text(encoding="utf-8") == marker:
+                return dest
+        except OSError:
+            pass
+        shutil.rmtree(dest, ignore_errors=True)
+        shutil.copytree(env_path, dest, symlinks=True, copy_function=_link_or_copy)
+
+        old, new = str(env_path).encode(), str(dest).encode()
+        for path in [dest / "pyvenv.cfg", *(dest / "bin").iterdir()]:
+            if path.is_symlink() or not path.is_file():
+                continue
+            content = path.read_bytes()
+            if old in content:
+                mode = path.stat().st_mode
+                path.unlink()
+                path.write_bytes(content.replace(old, new))
+                path.chmod(mode)
+        return dest
+
+    def _python(self, env_path: Path) -> Path:
+        return env_path / "bin" / "python"
+
+    def site_packages(self, env_path: Path) -> Path:
+        return env_path / "lib" / f"python{sys.version_info.major}.{sys.version_info.minor}" / "site-packages"
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different filesystem or links not supported
+        shutil.copy2(src, dst)
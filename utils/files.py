@@ -1,12 +1,62 @@
 # utils/files.py
+import hashlib
 import os
 import logging
-from pathlib import Path
-from typing import Dict, Any
+import threading
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, Iterable, Optional, Union
+
+from utils.artifacts import ArtifactStore
+from utils.bundle import split_bundle
+from utils.gate import CodeGate
 
 logger = logging.getLogger(__name__)
+# Full generated code goes to this logger at DEBUG level; attach a handler to
+# it to keep a code log without bloating the INFO log
+code_logger = logging.getLogger("composer.code")
+
+MAIN_FILE = "main.py"
+EMPTY_DIGEST = hashlib.sha256(b"").hexdigest()
+# `__init__.py` of an iteration folder that is also a package in the project:
+# the package then spans both, iteration files first, instead of shadowing
+# the project's modules
+PACKAGE_MARKER = "from pkgutil import extend_path\n__path__ = extend_path(__path__, __name__)\n"
+MARKER_DIGEST = hashlib.sha256(PACKAGE_MARKER.encode("utf-8")).hexdigest()
+
 
 class ProjectManager:
+    def __init__(self, keep_iterations: Optional[int] = None, gate: Optional[CodeGate] = None):
+        """
+        `keep_iterations`: if set, older iterations of a component are
+        compacted (their files removed and blobs compressed) after each write.
+        `gate` lints the project in `check_style`, sharing its cache of
+        already checked files.
+        """
+        self.keep_iterations = keep_iterations
+        self.gate = gate or CodeGate()
+        self._stores: Dict[Path, ArtifactStore] = {}
+        self._lock = threading.Lock()
+
+    def artifact_store(self, project_path: Path) -> ArtifactStore:
+        """
+        Return the content-addressed artifact store of a project.
+        """
+        with self._lock:
+            store = self._stores.get(project_path)
+            if store is None:
+                store = ArtifactStore(project_path)
+                self._stores[project_path] = store
+            return store
+
+    def forget(self, project_path: Path):
+        """
+        Drop a finished project's artifact store; it is reopened on demand.
+        """
+        resolved = Path(project_path).resolve()
+        with self._lock:
+            for path in [path for path in self._stores if path.resolve() == resolved]:
+                del self._stores[path]
+
     def create(self, path: Path, structure: Dict[str, Any]):
         """
         Create the directory structure based on a dictionary like:
@@ -35,29 +85,114 @@ class ProjectManager:
                         for nested_folder, nested_files in item.items():
                             self.create(folder_path / nested_folder, nested_files)
 
-    def write_code(self, project_path: Path, component_name: str, code: str, iteration: int) -> Path:
+    def write_code(
+        self,
+        project_path: Path,
+        component_name: str,
+        code: Union[str, Iterable[str]],
+        iteration: int
+    ) -> Path:
         """
         Write code to a component-specific folder, versioned by iteration.
         E.g.  <project_path>/<component_name>/iteration_<n>/main.py
+        `code` may also be an iterable of streamed chunks, which are written
+        through as they arrive. A multi-file bundle (see `bundle_files`) is
+        written as its files, at their planned paths inside the folder.
+        The file is a hardlink into the project's artifact store, so identical
+        code across iterations is stored once.
         """
+        store = self.artifact_store(project_path)
         comp_path = project_path / component_name / f"iteration_{iteration}"
         comp_path.mkdir(parents=True, exist_ok=True)
-        main_file = comp_path / "main.py"
+        main_file = comp_path / MAIN_FILE
         
-        with open(main_file, "w", encoding="utf-8") as f:
-            f.write(code)
+        files = split_bundle(code) if isinstance(code, str) else None
+        if files is not None:
+            digests = {}
+            for name, content in self._with_package_markers(project_path, files).items():
+                digests[name] = store.put(content.encode("utf-8"))
+                store.link(digests[name], comp_path / name)
+            store.record(component_name, iteration, digests)
+            if self.keep_iterations:
+                store.compact(component_name, keep=self.keep_iterations)
+            logger.info(f"Wrote {len(files)} files for {component_name} (iteration {iteration}) to {comp_path}")
+            if code_logger.isEnabledFor(logging.DEBUG):
+                code_logger.debug(f"Code written for {component_name} (iteration {iteration}):\n{code}")
+            return comp_path
+
+        if isinstance(code, str):
+            digest = store.put(code.encode("utf-8"))
+            store.link(digest, main_file)
+        else:
+            main_file.unlink(missing_ok=True)
+            with open(main_file, "w", encoding="utf-8") as f:
+                for chunk in code:
+                    f.write(chunk)
+                    f.flush()
+            digest = store.adopt(main_file)
+        store.record(component_name, iteration, {MAIN_FILE: digest})
+        if self.keep_iterations:
+            store.compact(component_name, keep=self.keep_iterations)
         
-        logger.info(f"Wrote code for {component_name} (iteration {iteration}) to {main_file}")
-        logger.info(f"Code written: {code}")
+        logger.info(f"Wrote code for {component_name} (iteration {iteration}) to {main_file} [{digest[:12]}]")
+        if code_logger.isEnabledFor(logging.DEBUG):
+            code_logger.debug(f"Code written for {component_name} (iteration {iteration}):\n{main_file.read_text(encoding='utf-8')}")
         return comp_path
 
+    def _with_package_markers(self, project_path: Path, files: Dict[str, str]) -> Dict[str, str]:
+        """
+        Give every folder of the bundle that is a regular package in the
+        project a PACKAGE_MARKER `__init__.py` (unless the bundle has a
+        non-empty one). Without it the project's package would shadow the
+        iteration's files on the test path; with an empty one the
+        iteration's package would shadow the project's other modules.
+        """
+        files = dict(files)
+        for name in list(files):
+            for parent in PurePosixPath(name).parents:
+                init = str(parent / "__init__.py")
+                if parent.parts and not files.get(init, "").strip() and (project_path / init).is_file():
+                    files[init] = PACKAGE_MARKER
+        return files
+
+    def promote_iteration(
+        self,
+        project_path: Path,
+        component_name: str,
+        iteration: int,
+        hold_until: Optional[int] = None
+    ):
+        """
+        Make `iteration` the component's latest version, and keep it so
+        against iterations up to `hold_until` written later. The files of a
+        multi-file iteration are also placed at their planned paths in the
+        project.
+        """
+        store = self.artifact_store(project_path)
+        store.promote(component_name, iteration, hold_until=hold_until)
+        files = store.files(component_name, iteration)
+        if set(files) != {MAIN_FILE}:
+            for name, digest in files.items():
+                if digest in (EMPTY_DIGEST, MARKER_DIGEST) and (project_path / name).exists():
+                    # A package marker; keep whatever the project has there
+                    continue
+                store.link(digest, project_path / name)
+
+    def materialize_latest(self, project_path: Path, component_name: str) -> Path:
+        """
+        Return the folder of a component's latest iteration, restoring its
+        files from the artifact store if they were compacted.
+        """
+        return self.artifact_store(project_path).materialize(component_name)
+
     def check_style(self, project_path: Path):
         """
-        Placeholder for style/lint checks.
-        Could call flake8 or black here. We just return a stub.
+        Lint the project's current code. Files that do not compile fail the
+        check; lint findings are returned as warnings.
         """
-        # Suppose everything is fine:
+        result = self.gate.check_project(project_path)
         return {
-            "passed": True,
-            "warnings": []
+            "passed": result["passed"],
+            "errors": result["errors"],
+            "warnings": result["warnings"]
         }
\ No newline at end of file
@@ -0,0 +1,294 @@
+# utils/gate.py
+"""
+Fast local checks that run before a component's tests.
+
+Every file is parsed once; the tree is compiled (catching the syntax errors
+only the compiler reports, like `return` outside a function), its imports
+are collected and all lint rules run in a single walk. Results are cached
+by content hash, so unchanged files are never parsed again. Imports are
+then resolved against the project, the standard library and the installed
+environment. Syntax errors and unresolvable imports fail the gate within
+milliseconds instead of after a test process has started; lint findings
+are reported as warnings.
+"""
+import ast
+import hashlib
+import importlib.machinery
+import logging
+import site
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from utils.imports import ImportGraph
+from utils.lru import LRUCache
+from utils.validation import PARALLEL_THRESHOLD, collect_project_files
+
+logger = logging.getLogger(__name__)
+
+MAX_LINE_LENGTH = 120
+MAX_CACHED_RESULTS = 20000
+MUTABLE_DEFAULTS = (ast.List, ast.Dict, ast.Set, ast.ListComp, ast.DictComp, ast.SetComp)
+
+
+class _LintVisitor(ast.NodeVisitor):
+    """
+    Collects imports and evaluates every lint rule in one walk over a module.
+    """
+
+    def __init__(self):
+        self.findings: List[Dict] = []
+        # (module, line) of imports that must resolve; guarded ones are skipped
+        self.imports: List[List] = []
+        self._imported: Dict[str, ast.AST] = {}
+        self._used = set()
+        self._guarded = 0
+
+    def _report(self, node: ast.AST, rule: str, message: str):
+        self.findings.append({"rule": rule, "line": getattr(node, "lineno", 0), "message": message})
+
+    def finish(self, tree: ast.Module):
+        exported = set()
+        for node in tree.body:
+            # Names listed in __all__ count as used
+            if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "__all__" for t in node.targets):
+                if isinstance(node.value, (ast.List, ast.Tuple)):
+                    exported |= {e.value for e in node.value.elts if isinstance(e, ast.Constant)}
+        for name, node in self._imported.items():
+            if name not in self._used and name not in exported:
+                self._report(node, "unused-import", f"'{name}' imported but unused")
+
+    def visit_Try(self, node: ast.Try):
+        # Optional dependencies are imported inside try blocks
+        self._guarded += 1
+        for child in node.body:
+            self.visit(child)
+        self._guarded -= 1
+        for handler in node.handlers:
+            if handler.type is None:
+                self._report(handler, "bare-except", "bare 'except:' also catches KeyboardInterrupt and SystemExit")
+            self.visit(handler)
+        for child in node.orelse + node.finalbody:
+            self.visit(child)
+
+    def visit_If(self, node: ast.If):
+        type_checking = "TYPE_CHECKING" in ast.dump(node.test)
+        self._guarded += type_checking
+        for child in node.body:
+            self.visit(child)
+        self._guarded -= type_checking
+        self.visit(node.test)
+        for child in node.orelse:
+            self.visit(child)
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            if not self._guarded:
+                self.imports.append([alias.name, node.lineno])
+            self._imported.setdefault(alias.asname or alias.name.split(".")[0], node)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module and not node.level and not self._guarded and node.module != "__future__":
+            self.imports.append([node.module, node.lineno])
+        for alias in node.names:
+            if alias.name == "*":
+                self._report(node, "star-import", f"'from {node.module} import *' hides where names come from")
+            elif node.module != "__future__":
+                self._imported.setdefault(alias.asname or alias.name, node)
+
+    def visit_Name(self, node: ast.Name):
+        self._used.add(node.id)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            if isinstance(default, MUTABLE_DEFAULTS):
+                self._report(default, "mutable-default", f"mutable default argument in '{node.name}'")
+        self._check_redefinitions(node.body)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self._check_redefinitions(node.body)
+        self.generic_visit(node)
+
+    def visit_Module(self, node: ast.Module):
+        self._check_redefinitions(node.body)
+        self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare):
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(right, ast.Constant) and right.value is None:
+                self._report(node, "none-comparison", "compare to None with 'is' / 'is not'")
+        self.generic_visit(node)
+
+    def visit_JoinedStr(self, node: ast.JoinedStr):
+        if not any(isinstance(value, ast.FormattedValue) for value in node.values):
+            self._report(node, "fstring-without-placeholders", "f-string without placeholders")
+        self.generic_visit(node)
+
+    def _check_redefinitions(self, body: List[ast.stmt]):
+        seen = set()
+        for statement in body:
+            if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                # Overloads and property setters legitimately reuse a name
+                if statement.name in seen and not getattr(statement, "decorator_list", None):
+                    self._report(statement, "redefined", f"'{statement.name}' redefines an earlier definition")
+                seen.add(statement.name)
+
+
+def analyze_source(source: str, filename: str = "<generated>") -> Dict:
+    """
+    Parse `source` once: compile it, collect its imports and lint it.
+    Returns {"error": "<line>: <message>" | None, "imports": [[module, line]],
+    "findings": [...]}.
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+        compile(tree, filename, "exec")
+    except SyntaxError as e:
+        return {"error": f"{e.lineno or 0}: SyntaxError: {e.msg}", "imports": [], "findings": []}
+    except ValueError as e:
+        # e.g. null bytes in the source
+        return {"error": f"0: {str(e)}", "imports": [], "findings": []}
+
+    visitor = _LintVisitor()
+    visitor.visit(tree)
+    visitor.finish(tree)
+    for number, line in enumerate(source.splitlines(), start=1):
+        if len(line) > MAX_LINE_LENGTH:
+            visitor.findings.append({
+                "rule": "line-too-long",
+                "line": number,
+                "message": f"line is {len(line)} characters (> {MAX_LINE_LENGTH})"
+            })
+    visitor.findings.sort(key=lambda finding: finding["line"])
+    return {"error": None, "imports": visitor.imports, "findings": visitor.findings}
+
+
+def _analyze_file(path: str) -> Dict:
+    # Module-level so it can run in a process pool
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return analyze_source(f.read(), filename=Path(path).name)
+
+
+class CodeGate:
+    """
+    Syntax, import and lint checks for generated code, cached by content hash.
+    The caches keep the most recently used `MAX_CACHED_RESULTS` entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._analyzed = LRUCache(MAX_CACHED_RESULTS)
+        self._external = LRUCache(MAX_CACHED_RESULTS)
+
+    def check(self, iteration_path: Path, roots: Iterable[Path], site_packages: Iterable[Path] = ()) -> Dict:
+        """
+        Check every Python file under an iteration folder. Imports must
+        resolve under `roots` (as on the test path), in the standard library
+        or in an installed environment (`site_packages` or the interpreter's).
+        """
+        return self._check(
+            sorted(iteration_path.rglob("*.py")),
+            base=iteration_path,
+            roots=[iteration_path, *roots],
+            site_packages=site_packages,
+            resolve_imports=True
+        )
+
+    def check_project(self, project_path: Path) -> Dict:
+        """
+        Lint the latest iteration of every component and the project's own
+        files. Import resolution is left to the per-component gate.
+        """
+        return self._check(
+            collect_project_files(project_path),
+            base=project_path,
+            roots=[project_path],
+            site_packages=(),
+            resolve_imports=False
+        )
+
+    def _check(
+        self,
+        files: List[Path],
+        base: Path,
+        roots: List[Path],
+        site_packages: Iterable[Path],
+        resolve_imports: bool
+    ) -> Dict:
+        hashes = {path: hashlib.sha256(path.read_bytes()).hexdigest() for path in files}
+        with self._lock:
+            # Held locally: a large project can push its own results out of the cache
+            analyzed = {digest: self._analyzed.get(digest) for digest in set(hashes.values())}
+        pending = [path for path in files if analyzed[hashes[path]] is None]
+        if len(pending) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(_analyze_file, [str(p) for p in pending], chunksize=8))
+        else:
+            results = [_analyze_file(str(path)) for path in pending]
+        with self._lock:
+            for path, result in zip(pending, results):
+                analyzed[hashes[path]] = self._analyzed[hashes[path]] = result
+
+        local = set(ImportGraph(roots).modules) if resolve_imports else set()
+        search_path = [str(p) for p in site_packages] + site.getsitepackages() + [site.getusersitepackages()]
+        errors, warnings = [], []
+        for path in files:
+            result = analyzed[hashes[path]]
+            relative = str(path.relative_to(base))
+            if result["error"]:
+                errors.append(f"{relative}:{result['error']}")
+                continue
+            if resolve_imports:
+                for module, line in result["imports"]:
+                    if not self._resolves(module, local, search_path) and not self._is_sibling(module, path):
+                        errors.append(f"{relative}:{line}: ImportError: No module named '{module}'")
+            warnings.extend(
+                f"{relative}:{finding['line']}: [{finding['rule']}] {finding['message']}"
+                for finding in result["findings"]
+            )
+
+        logger.debug(
+            f"Pre-test gate: {len(files)} files ({len(files) - len(pending)} cached), "
+            f"{len(errors)} errors, {len(warnings)} warnings"
+        )
+        error = ""
+        if errors:
+            error = f"Pre-test check failed: {errors[0]}"
+            if len(errors) > 1:
+                error += f" (+{len(errors) - 1} more)"
+        return {
+            "passed": not errors,
+            "error": error,
+            "errors": errors,
+            "warnings": warnings,
+            "files": len(files),
+            "cache_hits": len(files) - len(pending)
+        }
+
+    def _is_sibling(self, module: str, path: Path) -> bool:
+        # pytest puts a test file's own folder first on sys.path
+        top = module.split(".")[0]
+        return (path.parent / f"{top}.py").is_file() or (path.parent / top).is_dir()
+
+    def _resolves(self, module: str, local: set, search_path: List[str]) -> bool:
+        top = module.split(".")[0]
+        if any(name == module or name.startswith(module + ".") for name in local):
+            return True
+        if any(name == top or name.startswith(top + ".") for name in local):
+            # A local package without the requested submodule
+            return False
+        if top in sys.stdlib_module_names or top in sys.builtin_module_names:
+            return True
+        key = (top, tuple(search_path))
+        with self._lock:
+            found = self._external.get(key)
+        if found is None:
+            found = importlib.machinery.PathFinder.find_spec(top, search_path) is not None
+            with self._lock:
+                self._external[key] = found
+        return found
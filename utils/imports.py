@@ -0,0 +1,196 @@
+# utils/imports.py
+import ast
+import hashlib
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+ITERATION_DIR = re.compile(r"^iteration_\d+$")
+SKIPPED_DIRS = {"__pycache__", "node_modules", "venv", ".venv"}
+MAX_CACHED_FILES = 20000
+
+
+class ImportGraph:
+    """
+    Static import graph of the Python files reachable from a list of search
+    roots (in sys.path order).
+
+    Only imports that resolve to files under the roots are tracked; the
+    standard library and installed packages are ignored. File hashes and
+    parsed imports are cached by (path, mtime, size) for the most recently
+    used files, so rebuilding a graph after a small change only re-reads the
+    changed files.
+    """
+
+    _lock = threading.Lock()
+    _file_cache = LRUCache(MAX_CACHED_FILES)
+
+    def __init__(self, roots: Iterable[Path]):
+        self.roots = [Path(root) for root in roots]
+        self.modules = self._index_modules()
+        self.paths = {path: name for name, path in self.modules.items()}
+
+    def _index_modules(self) -> Dict[str, Path]:
+        """
+        Map dotted module names to files, resolving each name the way the
+        import system does: along the roots in order, the first regular
+        package or module wins and hides the same name in later roots, and
+        only a name found nowhere else is a namespace package spanning them
+        all. Packages that call `pkgutil.extend_path` span every root too.
+        Iteration directories below a root belong to other components and
+        are not indexed.
+        """
+        modules: Dict[str, Path] = {}
+        self._index_package([], [root for root in self.roots if root.is_dir()], modules)
+        return modules
+
+    def _index_package(self, parts: List[str], search_path: List[Path], modules: Dict[str, Path]):
+        names = []
+        for directory in search_path:
+            try:
+                entries = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry[:-3] if entry.endswith(".py") else entry
+                if name not in names and name != "__init__" and self._importable(directory, entry):
+                    names.append(name)
+
+        for name in names:
+            portions = []
+            for directory in search_path:
+                package = directory / name
+                if (package / "__init__.py").is_file():
+                    modules[".".join([*parts, name])] = package / "__init__.py"
+                    if self._extends_path(package / "__init__.py"):
+                        portions = [package, *portions, *self._portions(search_path, directory, name)]
+                    else:
+                        portions = [package]
+                    break
+                if (directory / f"{name}.py").is_file():
+                    modules[".".join([*parts, name])] = directory / f"{name}.py"
+                    portions = []
+                    break
+                if package.is_dir():
+                    portions.append(package)
+            if portions:
+                self._index_package([*parts, name], portions, modules)
+
+    def _portions(self, search_path: List[Path], after: Path, name: str) -> List[Path]:
+        # Same-named directories of the roots after `after`, for extend_path
+        return [d / name for d in search_path[search_path.index(after) + 1:] if (d / name).is_dir()]
+
+    def _importable(self, directory: Path, entry: str) -> bool:
+        if entry.startswith(".") or entry in SKIPPED_DIRS or ITERATION_DIR.match(entry):
+            return False
+        if entry.endswith(".py"):
+            return (directory / entry).is_file()
+        return (directory / entry).is_dir()
+
+    def _extends_path(self, init: Path) -> bool:
+        try:
+            return "extend_path(" in init.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return False
+
+    def _load(self, path: Path) -> Tuple[str, List[Tuple[str, int]]]:
+        """
+        Return (content hash, [(imported name, relative level)]) for a file.
+        """
+        stat = path.stat()
+        cache_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._file_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        source = path.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()
+        imports = []
+        try:
+            tree = ast.parse(source, filename=str(path))
+        except (SyntaxError, ValueError):
+            tree = None
+        if tree is not None:
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    imports.extend((alias.name, 0) for alias in node.names)
+                elif isinstance(node, ast.ImportFrom):
+                    base = node.module or ""
+                    imports.append((base, node.level))
+                    imports.extend(
+                        (f"{base}.{alias.name}" if base else alias.name, node.level)
+                        for alias in node.names if alias.name != "*"
+                    )
+
+        with self._lock:
+            self._file_cache[cache_key] = (digest, imports)
+        return digest, imports
+
+    def file_hash(self, path: Path) -> str:
+        return self._load(path)[0]
+
+    def _resolve(self, name: str, level: int, importer: Optional[str]) -> Optional[Path]:
+        if level:
+            if importer is None:
+                return None
+            package = importer.split(".")
+            # A module's package is its parent; a package's __init__ is its own
+            if self.modules.get(importer, Path()).name != "__init__.py":
+                package = package[:-1]
+            package = package[:len(package) - (level - 1)] if level > 1 else package
+            name = ".".join([*package, name] if name else package)
+
+        parts = name.split(".")
+        while parts:
+            path = self.modules.get(".".join(parts))
+            if path is not None:
+                return path
+            parts.pop()
+        return None
+
+    def dependencies(self, path: Path) -> Set[Path]:
+        """
+        Files under the roots that `path` imports directly.
+        """
+        importer = self.paths.get(path)
+        _, imports = self._load(path)
+        resolved = set()
+        for name, level in imports:
+            target = self._resolve(name, level, importer)
+            if target is not None and target != path:
+                resolved.add(target)
+        return resolved
+
+    def closure(self, path: Path) -> Set[Path]:
+        """
+        `path` plus every local file it imports, transitively.
+        """
+        seen = {path}
+        stack = [path]
+        while stack:
+            for dep in self.dependencies(stack.pop()):
+                if dep not in seen:
+                    seen.add(dep)
+                    stack.append(dep)
+        return seen
+
+    def fingerprint(self, paths: Iterable[Path]) -> str:
+        """
+        Content hash of a set of files, independent of where they live on
+        disk, so identical code in different iteration directories matches.
+        """
+        entries = sorted(
+            (self.paths.get(path, path.name), self.file_hash(path)) for path in paths
+        )
+        digest = hashlib.sha256()
+        for name, file_hash in entries:
+            digest.update(f"{name}\0{file_hash}\n".encode("utf-8"))
+        return digest.hexdigest()
@@ -0,0 +1,235 @@
+# utils/journal.py
+"""
+Append-only build journal.
+
+Every change to a build's state is one JSON line appended to
+`build_journal.jsonl`, so a write costs the size of the change rather than
+of the whole state, and concurrent components never overwrite each other.
+Lines are flushed to the OS immediately (readers see them at once) and
+fsynced in batches: after `fsync_batch` events, `fsync_interval` seconds, or
+right away for durable events such as the end of a build.
+
+The build state is the journal replayed (see `replay`); `snapshot` and
+`write_snapshot` produce it on demand. `read_events` and `follow` tail the
+journal for dashboards.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "build_journal.jsonl"
+SNAPSHOT_FILE = "build_state.json"
+# Events after which a build is over; `follow` stops there
+FINAL_EVENTS = ("build_finished",)
+
+
+def replay(events: Iterable[Dict]) -> Dict[str, Any]:
+    """
+    Fold journal events into the build state:
+    {"timestamp", "requirements", "tech_plan", "status", "components", ...}.
+    """
+    state: Dict[str, Any] = {"components": {}}
+    for event in events:
+        kind = event.get("event")
+        data = event.get("data", {})
+        if kind == "snapshot":
+            state = {**data, "components": dict(data.get("components", {}))}
+        elif kind == "build_started":
+            state.update(data)
+            state["status"] = "in_progress"
+            state["components"] = dict(data.get("components", {}))
+            state.pop("error", None)
+        elif kind == "component":
+            name = data["name"]
+            changes = {key: value for key, value in data.items() if key != "name"}
+            state["components"][name] = {**state["components"].get(name, {}), **changes}
+        elif kind == "build_finished":
+            state.update(data)
+        state["timestamp"] = event.get("time", state.get("timestamp"))
+        state["seq"] = event.get("seq", state.get("seq", 0))
+    return state
+
+
+def _parse_lines(chunk: str) -> List[Dict]:
+    events = []
+    for line in chunk.splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            logger.warning(f"Skipping corrupt journal line: {line[:80]}")
+    return events
+
+
+def read_events(path: Path, since: int = 0) -> List[Dict]:
+    """
+    Events of a journal with a sequence number above `since`. A line still
+    being written (no trailing newline yet) is left for the next read.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return []
+    complete = text[:text.rfind("\n") + 1]
+    return [event for event in _parse_lines(complete) if event.get("seq", 0) > since]
+
+
+def follow(
+    path: Path,
+    since: int = 0,
+    poll_interval: float = 0.25,
+    timeout: Optional[float] = None,
+    stop: Optional[threading.Event] = None
+) -> Iterator[Dict]:
+    """
+    Yield a journal's events as they are appended, starting after `since`.
+    Ends after the build finishes, after `timeout` seconds or once `stop`
+    is set. Survives the journal being compacted underneath.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    handle, inode, buffer = None, None, ""
+    try:
+        while True:
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current is not None and current != inode:
+                # First open, or the journal was replaced by `compact`
+                if handle is not None:
+                    handle.close()
+                handle, inode, buffer = open(path, encoding="utf-8"), current, ""
+
+            if handle is not None:
+                buffer += handle.read()
+                complete, buffer = buffer[:buffer.rfind("\n") + 1], buffer[buffer.rfind("\n") + 1:]
+                for event in _parse_lines(complete):
+                    if event.get("seq", 0) <= since:
+                        continue
+                    since = event["seq"]
+                    yield event
+                    if event.get("event") in FINAL_EVENTS:
+                        return
+
+            if stop is not None and stop.is_set():
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(poll_interval)
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+class BuildJournal:
+    """
+    Writer side of a build journal. Safe to share between threads.
+    """
+
+    def __init__(self, path: Path, fsync_interval: float = 0.5, fsync_batch: int = 64):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self._lock = threading.Lock()
+        self._seq = max((event.get("seq", 0) for event in read_events(path)), default=0)
+        self._file = None
+        self._pending = 0
+        self._synced_at = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+
+    def append(self, event: str, durable: bool = False, **data) -> int:
+        """
+        Append one event and return its sequence number. `durable` events
+        are fsynced before returning, the others within `fsync_interval`.
+        """
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._seq += 1
+            record = {"seq": self._seq, "time": datetime.now().isoformat(), "event": event, "data": data}
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+            self._pending += 1
+            if (
+                durable
+                or self._pending >= self.fsync_batch
+                or time.monotonic() - self._synced_at >= self.fsync_interval
+            ):
+                self._sync_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.fsync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+            return self._seq
+
+    def sync(self):
+        """Fsync every event appended so far"""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The build state as of the last appended event"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        return replay(read_events(self.path))
+
+    def write_snapshot(self, path: Path) -> Dict[str, Any]:
+        """
+        Write the current build state to `path` as one JSON document,
+        atomically, and return it.
+        """
+        state = self.snapshot()
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return state
+
+    def compact(self):
+        """
+        Replace the journal with a single snapshot event. Sequence numbers
+        continue, so followers skip what they already saw.
+        """
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            state = replay(read_events(self.path))
+            if not state.get("seq"):
+                return
+            state.pop("seq")
+            record = {"seq": self._seq, "time": datetime.now().isoformat(), "event": "snapshot", "data": state}
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -1,6 +1,7 @@
 import json
+import re
 import yaml
-from typing import Any
+from typing import Any, Dict, List, Optional
 
 def parse_llm_output(output: str) -> Any:
     try:
@@ -10,4 +11,97 @@ def parse_llm_output(output: str) -> Any:
             return yaml.safe_load(output)
         return output
     except Exception as e:
-        raise ValueError(f"LLM output parsing failed: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"LLM output parsing failed: {str(e)}")
+
+class MalformedOutputError(ValueError):
+    """Raised as soon as streamed LLM output is known to be unusable."""
+
+
+class IncrementalYAMLParser:
+    """
+    Parse a YAML mapping as it streams in, one top-level section at a time.
+
+    A section is complete once the next top-level key starts, so each section
+    is parsed exactly once and problems surface while the completion is still
+    running: markdown fences, prose instead of `key:` lines, YAML syntax
+    errors, and sections of the wrong type. `close()` checks that every
+    required key was present and returns the parsed mapping. With
+    `skip_fences`, markdown fence lines are dropped instead of rejected.
+    """
+
+    _TOP_LEVEL_KEY = re.compile(r"^[A-Za-z_][\w\-]*\s*:")
+
+    def __init__(
+        self,
+        required_keys=(),
+        section_types: Optional[Dict[str, type]] = None,
+        skip_fences: bool = False
+    ):
+        self.required_keys = tuple(required_keys)
+        self.skip_fences = skip_fences
+        self.section_types = section_types or {}
+        self.data: Dict[str, Any] = {}
+        self._pending = ""
+        self._section: List[str] = []
+
+    def feed(self, chunk: str):
+        self._pending += chunk
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._feed_line(line)
+
+    def close(self) -> Dict[str, Any]:
+        if self._pending:
+            self._feed_line(self._pending)
+            self._pending = ""
+        self._close_section()
+
+        missing = [key for key in self.required_keys if key not in self.data]
+        if missing:
+            raise MalformedOutputError(f"Missing required fields: {', '.join(missing)}")
+        return self.data
+
+    def _feed_line(self, line: str):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if self.skip_fences:
+                return
+            raise MalformedOutputError("Output is wrapped in a markdown code block")
+        if stripped == "---":
+            return
+        if not stripped or stripped.startswith("#"):
+            if self._section:
+                self._section.append(line)
+            return
+
+        # Lists may sit at column 0 under their key, as yaml.dump writes them
+        if line[0] in " \t-":
+            if not self._section:
+                raise MalformedOutputError(f"Unexpected content before the first key: {stripped[:60]!r}")
+            self._section.append(line)
+            return
+
+        if not self._TOP_LEVEL_KEY.match(line):
+            raise MalformedOutputError(f"Expected a top-level 'key:' line, got: {stripped[:60]!r}")
+        self._close_section()
+        self._section = [line]
+
+    def _close_section(self):
+        if not self._section:
+            return
+        text = "\n".join(self._section)
+        self._section = []
+        try:
+            parsed = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise MalformedOutputError(f"Invalid YAML: {str(e)}")
+        if not isinstance(parsed, dict):
+            raise MalformedOutputError(f"Expected a mapping, got: {text[:60]!r}")
+
+        for key, value in parsed.items():
+            expected = self.section_types.get(key)
+            if expected is not None and not isinstance(value, expected):
+                raise MalformedOutputError(
+                    f"Field '{key}' must be a {expected.__name__}, got {type(value).__name__}"
+                )
+        self.data.update(parsed)
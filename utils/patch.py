@@ -0,0 +1,155 @@
+# utils/patch.py
+"""
+Apply LLM-produced edits to a source file.
+
+Two formats are understood: search/replace edit blocks
+
+    <<<<<<< SEARCH
+    old lines
+    =======
+    new lines
+    >>>>>>> REPLACE
+
+and unified diffs (`@@ -l,n +l,n @@` hunks). Every edit must match the
+current code unambiguously and the result must still compile (every Python
+file of a multi-file bundle separately), otherwise PatchError is raised and
+the caller falls back to regenerating the file.
+"""
+import re
+from typing import List, Tuple
+
+from utils.bundle import split_bundle
+
+SEARCH_MARKER = "<<<<<<< SEARCH"
+DIVIDER = "======="
+REPLACE_MARKER = ">>>>>>> REPLACE"
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when an edit cannot be applied to the code."""
+
+
+def parse_edit_blocks(text: str) -> List[Tuple[str, str]]:
+    """
+    Extract (search, replace) pairs from search/replace edit blocks.
+    """
+    blocks = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        if lines[i].strip() != SEARCH_MARKER:
+            i += 1
+            continue
+        search, replace = [], []
+        i += 1
+        while i < len(lines) and lines[i].strip() != DIVIDER:
+            search.append(lines[i])
+            i += 1
+        i += 1
+        while i < len(lines) and lines[i].strip() != REPLACE_MARKER:
+            replace.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise PatchError("Unterminated edit block")
+        i += 1
+        blocks.append(("\n".join(search), "\n".join(replace)))
+    return blocks
+
+
+def _find_lines(code_lines: List[str], search_lines: List[str]) -> int:
+    """
+    Index of the unique occurrence of `search_lines` in `code_lines`,
+    compared exactly and then ignoring trailing whitespace.
+    """
+    for normalize in (lambda line: line, lambda line: line.rstrip()):
+        target = [normalize(line) for line in search_lines]
+        matches = [
+            i for i in range(len(code_lines) - len(target) + 1)
+            if [normalize(line) for line in code_lines[i:i + len(target)]] == target
+        ]
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            raise PatchError(f"Edit matches {len(matches)} places: {search_lines[0].strip()!r}")
+    raise PatchError(f"Edit does not match the code: {search_lines[0].strip() if search_lines else ''!r}")
+
+
+def apply_edit_blocks(code: str, blocks: List[Tuple[str, str]]) -> str:
+    lines = code.splitlines()
+    for search, replace in blocks:
+        search_lines = search.splitlines()
+        if not search_lines:
+            # An empty search appends to the file
+            lines.extend(replace.splitlines())
+            continue
+        start = _find_lines(lines, search_lines)
+        lines[start:start + len(search_lines)] = replace.splitlines()
+    return "\n".join(lines) + "\n"
+
+
+def apply_unified_diff(code: str, diff: str) -> str:
+    """
+    Apply the hunks of a unified diff, locating each hunk by its context
+    and removed lines rather than trusting the line numbers.
+    """
+    lines = code.splitlines()
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        if _HUNK_HEADER.match(line):
+            current = []
+            hunks.append(current)
+        elif current is not None and line[:1] in (" ", "-", "+"):
+            current.append(line)
+        elif current is not None and line == "":
+            # Blank context lines often lose their leading space
+            current.append(" ")
+        elif line.startswith(("---", "+++", "diff ", "index ")):
+            current = None
+    if not hunks:
+        raise PatchError("No diff hunks found")
+
+    for hunk in hunks:
+        while hunk and hunk[-1] == " ":
+            hunk.pop()
+        old = [line[1:] for line in hunk if line[0] in (" ", "-")]
+        new = [line[1:] for line in hunk if line[0] in (" ", "+")]
+        if not old:
+            lines.extend(new)
+            continue
+        start = _find_lines(lines, old)
+        lines[start:start + len(old)] = new
+    return "\n".join(lines) + "\n"
+
+
+def apply_patch(code: str, response: str) -> str:
+    """
+    Apply edit blocks or a unified diff from an LLM response to `code` and
+    check that the result is valid, changed Python.
+    """
+    if SEARCH_MARKER in response:
+        blocks = parse_edit_blocks(response)
+        if not blocks:
+            raise PatchError("No edit blocks found")
+        patched = apply_edit_blocks(code, blocks)
+    elif "@@" in response:
+        patched = apply_unified_diff(code, response)
+    else:
+        raise PatchError("Response contains neither edit blocks nor a diff")
+
+    if patched.strip() == code.strip():
+        raise PatchError("Patch does not change the code")
+    try:
+        files = split_bundle(patched) or {"main.py": patched}
+    except ValueError as e:
+        raise PatchError(str(e))
+    for name, content in files.items():
+        if not name.endswith(".py"):
+            continue
+        try:
+            compile(content, name, "exec")
+        except SyntaxError as e:
+            raise PatchError(f"Patched {name} does not compile: {e.msg} (line {e.lineno})")
+    return patched
@@ -0,0 +1,231 @@
+# utils/pytest_worker.py
+"""
+Entry point for the isolated pytest subprocesses started by TestRunner.
+
+    python pytest_worker.py <memory_limit_bytes> <test_timeout_seconds> [pytest args...]
+    python pytest_worker.py --serve <json options>
+
+Applies resource limits to the process before importing anything from the
+code under test, and fails any single test that runs longer than the
+per-test timeout.
+
+With `--serve` the script becomes a pre-warmed sandbox worker: it imports
+pytest and the tech stack's heavy modules once, then reads one JSON run
+request per line from stdin and forks a sandboxed child for each, so runs
+skip interpreter startup and dependency imports. It answers with the
+child's pid and later its return code, and exits after `max_runs` runs.
+"""
+import fcntl
+import json
+import os
+import resource
+import signal
+import socket
+import struct
+import sys
+import tempfile
+
+# Keep this script's directory (composer's utils package) from shadowing
+# modules of the project under test
+sys.path.pop(0)
+
+import pytest
+
+# Environment variables never passed to code under test
+_SECRET_MARKERS = ("KEY", "TOKEN", "SECRET", "PASSWORD", "CREDENTIAL")
+_LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost", "", None}
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+# struct ifreq: interface name, then the flags of the union, padded to 40 bytes
+_IFREQ = "16sH22x"
+_SIOCGIFFLAGS = 0x8913
+_SIOCSIFFLAGS = 0x8914
+_IFF_UP = 0x1
+
+
+class _PerTestTimeout:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def _on_timeout(self, signum, frame):
+        raise TimeoutError(f"Test exceeded the {self.seconds:g}s time limit")
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        previous = signal.signal(signal.SIGALRM, self._on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def main(argv) -> int:
+    memory_limit = int(argv[0])
+    test_timeout = float(argv[1])
+
+    if memory_limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    plugins = [_PerTestTimeout(test_timeout)] if test_timeout > 0 else []
+    return pytest.main(argv[2:], plugins=plugins)
+
+
+def _preload(modules) -> list:
+    loaded = []
+    for name in modules:
+        try:
+            __import__(name)
+            loaded.append(name)
+        except Exception:
+            # Not installed or broken; tests that need it fail on their own
+            pass
+    return loaded
+
+
+def _install_guards(writable_roots):
+    """
+    Block network access to anything but loopback and file writes outside
+    `writable_roots`. Audit hooks cannot be removed, which is fine for a
+    child that runs exactly one test session.
+    """
+    roots = [os.path.realpath(root) for root in writable_roots]
+
+    def writable(path) -> bool:
+        path = os.path.realpath(os.fsdecode(path))
+        return any(path == root or path.startswith(root + os.sep) for root in roots)
+
+    def hook(event, args):
+        if event == "open":
+            path, mode, flags = args
+            if isinstance(path, int) or path is None:
+                return
+            writing = (mode is not None and any(c in mode for c in "wax+")) or (flags or 0) & _WRITE_FLAGS
+            if writing and not writable(path):
+                raise PermissionError(f"Sandbox: writing to {path} is not allowed")
+        elif event in ("os.remove", "os.rmdir", "os.mkdir", "os.rename", "os.chmod", "shutil.rmtree"):
+            for path in args[:2 if event == "os.rename" else 1]:
+                if isinstance(path, (str, bytes, os.PathLike)) and not writable(path):
+                    raise PermissionError(f"Sandbox: modifying {path} is not allowed")
+        elif event in ("socket.connect", "socket.bind", "socket.sendto"):
+            address = args[1]
+            if isinstance(address, tuple) and address[0] not in _LOCAL_HOSTS:
+                raise PermissionError(f"Sandbox: network access to {address[0]} is not allowed")
+        elif event == "socket.getaddrinfo":
+            if args[0] not in _LOCAL_HOSTS:
+                raise PermissionError(f"Sandbox: resolving {args[0]} is not allowed")
+
+    sys.addaudithook(hook)
+
+
+def _bring_up_loopback():
+    """
+    Set the IFF_UP flag of `lo`, which starts out down in a new network
+    namespace; as the namespace's root we may.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        request = struct.pack(_IFREQ, b"lo", 0)
+        flags = struct.unpack(_IFREQ, fcntl.ioctl(sock, _SIOCGIFFLAGS, request))[1]
+        fcntl.ioctl(sock, _SIOCSIFFLAGS, struct.pack(_IFREQ, b"lo", flags | _IFF_UP))
+
+
+def _isolate_network() -> bool:
+    """
+    Move the child into empty user and network namespaces where the kernel
+    allows it, with only loopback up so tests can still use localhost; the
+    audit hook covers the rest.
+    """
+    if not hasattr(os, "unshare"):
+        return False
+    try:
+        os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+    except OSError:
+        return False
+    try:
+        _bring_up_loopback()
+    except OSError as e:
+        print(f"Sandbox: could not bring up loopback, localhost is unreachable: {e}", file=sys.stderr)
+    return True
+
+
+def _run_child(request: dict, options: dict, protocol_fds):
+    """
+    Body of a forked child: sandbox, run pytest, exit. Never returns.
+    """
+    code = 1
+    try:
+        os.setsid()
+        for fd in protocol_fds:
+            os.close(fd)
+        log_fd = os.open(request["log_path"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.dup2(log_fd, 1)
+        os.dup2(log_fd, 2)
+        os.close(log_fd)
+        sys.stdout = os.fdopen(1, "w", buffering=1)
+        sys.stderr = os.fdopen(2, "w", buffering=1)
+
+        memory_limit = options["memory_limit"]
+        if memory_limit > 0:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        max_file = options.get("max_file_bytes", 0)
+        if max_file > 0:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (max_file, max_file))
+
+        os.chdir(request["cwd"])
+        for name in [name for name in os.environ if any(m in name.upper() for m in _SECRET_MARKERS)]:
+            del os.environ[name]
+        os.environ["PYTHONPATH"] = os.pathsep.join(request["pythonpath"])
+        sys.path[:0] = request["pythonpath"]
+        sys.dont_write_bytecode = True
+
+        _isolate_network()
+        _install_guards([request["cwd"], tempfile.gettempdir(), os.path.dirname(request["log_path"]), os.devnull])
+
+        test_timeout = options["test_timeout"]
+        plugins = [_PerTestTimeout(test_timeout)] if test_timeout > 0 else []
+        code = pytest.main(request["args"], plugins=plugins)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(int(code))
+
+
+def serve(options: dict) -> int:
+    # Keep the protocol channel away from anything that prints to stdout
+    protocol_in = os.dup(0)
+    protocol_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    requests = os.fdopen(protocol_in, "r")
+    replies = os.fdopen(protocol_out, "w", buffering=1)
+
+    def reply(message: dict):
+        replies.write(json.dumps(message) + "\n")
+        replies.flush()
+
+    sys.path[:0] = options.get("paths", [])
+    reply({"ready": True, "preloaded": _preload(options.get("preload", []))})
+    for runs, line in enumerate(requests, start=1):
+        request = json.loads(line)
+        pid = os.fork()
+        if pid == 0:
+            _run_child(request, options, (protocol_in, protocol_out))
+        reply({"pid": pid})
+        _, status = os.waitpid(pid, 0)
+        reply({"returncode": os.waitstatus_to_exitcode(status)})
+        if runs >= options.get("max_runs", 100):
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        sys.exit(serve(json.loads(sys.argv[2])))
+    sys.exit(main(sys.argv[1:]))
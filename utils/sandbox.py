@@ -0,0 +1,248 @@
+# utils/sandbox.py
+"""
+Pool of pre-warmed sandbox workers for running generated tests.
+
+Each worker is a long-lived `pytest_worker.py --serve` process that has
+already imported pytest and the plan's heavy dependencies. A test run forks
+a child from it, so the run starts with those imports done. The child is
+sandboxed: rlimits, scrubbed secrets, no network beyond loopback, and no
+writes outside its working and temp directories. Workers are replaced after
+`max_runs` runs so leaked state never accumulates.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.environments import stack_packages
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = Path(__file__).with_name("pytest_worker.py")
+
+# Distribution names whose import name differs
+_IMPORT_NAMES = {
+    "pyyaml": "yaml",
+    "scikit-learn": "sklearn",
+    "beautifulsoup4": "bs4",
+    "pillow": "PIL",
+    "psycopg2-binary": "psycopg2",
+    "python-dotenv": "dotenv",
+    "opencv-python": "cv2",
+}
+# Imported by every worker anyway
+_ALWAYS_LOADED = {"pytest"}
+
+
+def preload_modules(tech_stack: Iterable) -> List[str]:
+    """
+    Guess importable top-level modules from tech stack entries such as
+    "FastAPI 0.110" or "language: python".
+    """
+    return [
+        _IMPORT_NAMES.get(name, name.replace("-", "_"))
+        for name, _ in stack_packages(tech_stack)
+        if name not in _ALWAYS_LOADED
+    ]
+
+
+class SandboxClosedError(RuntimeError):
+    """Raised when a closed SandboxPool is asked to run or spawn."""
+
+
+class _Worker:
+    def __init__(self, options: Dict):
+        self.process = subprocess.Popen(
+            [sys.executable, str(WORKER_SCRIPT), "--serve", json.dumps(options)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            start_new_session=True
+        )
+        self.runs = 0
+        self.max_runs = options["max_runs"]
+        self.replies: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        self.ready = False
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.replies.put(json.loads(line))
+        self.replies.put(None)  # Worker exited
+
+    def _reply(self, timeout: Optional[float] = None) -> Dict:
+        message = self.replies.get(timeout=timeout)
+        if message is None:
+            raise RuntimeError("Sandbox worker exited unexpectedly")
+        return message
+
+    @property
+    def usable(self) -> bool:
+        return self.process.poll() is None and self.runs < self.max_runs
+
+    def run(self, request: Dict, deadline: float, cancel: Optional[threading.Event]) -> Tuple[Optional[int], str]:
+        """
+        Run one request. Returns (returncode, "") or (None, reason) if the
+        run was killed for timing out or being cancelled.
+        """
+        if not self.ready:
+            self._reply()
+            self.ready = True
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+        self.runs += 1
+        pid = self._reply()["pid"]
+
+        interrupted = ""
+        while True:
+            try:
+                return (None, interrupted) if interrupted else (self._reply(timeout=0.1)["returncode"], "")
+            except queue.Empty:
+                if interrupted:
+                    continue
+                if cancel is not None and cancel.is_set():
+                    interrupted = "cancelled"
+                elif time.monotonic() >= deadline:
+                    interrupted = "timeout"
+                else:
+                    continue
+                try:
+                    # The child runs in its own session: kill everything it started
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                # Collect the return code message before reusing the worker
+                self._reply()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class SandboxPool:
+    """
+    Up to `size` pre-warmed workers preloading `preload`, with `paths`
+    (installed dependencies) added to their sys.path.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        preload: List[str],
+        memory_limit: int,
+        test_timeout: float,
+        paths: Optional[List[Path]] = None,
+        max_runs: int = 100,
+        max_file_bytes: int = 256 * 1024 * 1024
+    ):
+        self.preload = list(preload)
+        self.paths = list(paths or [])
+        self.options = {
+            "preload": self.preload,
+            "paths": [str(path) for path in self.paths],
+            "memory_limit": memory_limit,
+            "test_timeout": test_timeout,
+            "max_runs": max_runs,
+            "max_file_bytes": max_file_bytes
+        }
+        # Holds None once closed, so runs waiting for a worker wake up
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: List[_Worker] = []
+        self._closed = False
+        # Start warming up right away, while code is still being generated
+        for _ in range(size):
+            self._idle.put(self._spawn())
+        atexit.register(self.close)
+
+    def _spawn(self) -> _Worker:
+        # Under the lock, so close() sees every worker started before it
+        with self._lock:
+            if self._closed:
+                raise SandboxClosedError("Sandbox pool is closed")
+            worker = _Worker(self.options)
+            self._workers.append(worker)
+        return worker
+
+    def run(
+        self,
+        cwd: Path,
+        args: List[str],
+        pythonpath: List[Path],
+        log_path: Path,
+        timeout: float,
+        cancel: Optional[threading.Event] = None
+    ) -> Tuple[Optional[int], str]:
+        """
+        Run pytest with `args` in a sandboxed fork of an idle worker.
+        Returns (returncode, "") or (None, "timeout" | "cancelled").
+        """
+        request = {
+            "cwd": str(cwd),
+            "args": args,
+            "pythonpath": [str(p) for p in pythonpath],
+            "log_path": str(log_path)
+        }
+        deadline = time.monotonic() + timeout
+        if self._closed:
+            raise SandboxClosedError("Sandbox pool is closed")
+        worker = self._idle.get()
+        if worker is None or self._closed:
+            # Pass the wake-up on to the next waiting run
+            self._idle.put(None)
+            if worker is not None:
+                worker.close()
+            raise SandboxClosedError("Sandbox pool is closed")
+        try:
+            if not worker.usable:
+                worker = self._replace(worker)
+            return worker.run(request, deadline, cancel)
+        except SandboxClosedError:
+            raise
+        except RuntimeError:
+            # The worker died mid-run; report it like a crashed test process
+            logger.warning("Sandbox worker died during a test run, replacing it")
+            return -signal.SIGKILL, ""
+        finally:
+            self._release(worker)
+
+    def _release(self, worker: _Worker):
+        # Return a worker to the idle queue, or retire it
+        if self._closed:
+            worker.close()
+            return
+        try:
+            self._idle.put(worker if worker.usable else self._replace(worker))
+        except SandboxClosedError:
+            pass
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        """Close a worker and spawn its successor; refused once the pool is closed"""
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        return self._spawn()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        self._idle.put(None)
+        for worker in workers:
+            worker.close()
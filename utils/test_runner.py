@@ -1,39 +1,578 @@
 # utils/test_runner.py
+import copy
+import json
 import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+
+from utils.artifacts import latest_iteration
+from utils.imports import ImportGraph
+from utils.sandbox import SandboxClosedError, SandboxPool, preload_modules
 
 logger = logging.getLogger(__name__)
 
+WORKER_SCRIPT = Path(__file__).with_name("pytest_worker.py")
+ITERATION_DIR = re.compile(r"^iteration_(\d+)$")
+
+# pytest exit codes
+EXIT_OK = 0
+EXIT_TESTS_FAILED = 1
+EXIT_NO_TESTS = 5
+
+RESULTS_FILE = Path(".composer") / "test_results.json"
+MAX_MEMO_LOG_CHARS = 20000
+
+
 class TestRunner:
-    def execute(self, project_path: Path, component: str) -> Dict:
+    """
+    Runs pytest in isolated subprocesses.
+
+    Every run gets its own interpreter with an address-space limit and a
+    per-test timeout, and reports results through a JUnit XML file. At most
+    `max_workers` test processes run at once across all callers.
+
+    Results are memoized per test file, keyed by a content hash of the file
+    and every local module it imports. A retry only runs the test files
+    whose import closure changed, and final validation reuses what the
+    per-component runs already established. Installed dependencies are not
+    hashed; results are keyed by the environment's lock hash instead.
+    Memoized results are kept in `<project>/.composer/test_results.json`.
+
+    The environment of the project being built (see `prepare`) is per
+    build: concurrent builds each use their own `new_session()`.
+    """
+    __test__ = False  # Not a pytest test class
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        timeout: float = 300,
+        test_timeout: float = 60,
+        memory_limit_mb: int = 2048,
+        sandbox: bool = True,
+        sandbox_max_runs: int = 100
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.test_timeout = test_timeout
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.sandbox = sandbox and hasattr(os, "fork")
+        self.sandbox_max_runs = sandbox_max_runs
+        # Sandbox pools by (preload, paths), shared by the builds using them
+        # and closed when the last one releases its pool
+        self._pools: Dict[Tuple, SandboxPool] = {}
+        self._pool_refs: Dict[Tuple, int] = {}
+        self._pool_key: Optional[Tuple] = None
+        self._site_packages: List[Path] = []
+        self._environment: Optional[str] = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._memo_lock = threading.Lock()
+        self._memo: Dict[Path, Dict[str, Dict]] = {}
+
+    def new_session(self) -> "TestRunner":
+        """
+        Return a runner for another build that shares this one's worker
+        slots, sandbox pools and result memo but has its own project
+        environment. Call `release` when the build is done.
+        """
+        session = copy.copy(self)
+        session._pool_key = None
+        session._site_packages = []
+        session._environment = None
+        return session
+
+    def prepare(
+        self,
+        tech_stack: List[str],
+        site_packages: Optional[Path] = None,
+        environment: Optional[str] = None
+    ):
+        """
+        Make the project's installed dependencies in `site_packages` importable
+        by its tests, and start warming up sandbox workers that preload the
+        modules named by the plan's tech stack. Builds with the same stack
+        and environment share their workers. `environment` identifies the
+        installed packages (the lock hash) for memoized results. Safe to call
+        again for another plan.
+        """
+        self._site_packages = [site_packages] if site_packages else []
+        self._environment = environment
+        if self.sandbox:
+            self._use_pool((tuple(preload_modules(tech_stack)), tuple(self._site_packages)))
+
+    @property
+    def site_packages(self) -> List[Path]:
+        """
+        Installed dependencies of the project being built, if any.
+        """
+        return list(self._site_packages)
+
+    def release(self):
+        """
+        Stop using this build's sandbox pool; it is closed once no other
+        build uses it.
+        """
+        with self._pool_lock:
+            retired = self._unref(self._pool_key)
+            self._pool_key = None
+        if retired is not None:
+            retired.close()
+
+    def close(self):
+        """Close every sandbox pool, including those of other sessions"""
+        with self._pool_lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+            self._pool_refs.clear()
+            self._pool_key = None
+        for pool in pools:
+            pool.close()
+
+    def _use_pool(self, key: Tuple):
+        with self._pool_lock:
+            if key == self._pool_key and key in self._pools:
+                return
+            created = key not in self._pools
+            if created:
+                self._pools[key] = self._new_pool(*key)
+            self._pool_refs[key] = self._pool_refs.get(key, 0) + 1
+            retired = self._unref(self._pool_key)
+            self._pool_key = key
+        if retired is not None:
+            retired.close()
+        if created:
+            logger.info(
+                f"Warming up {self.max_workers} sandbox workers preloading: {', '.join(key[0]) or 'pytest only'}"
+            )
+
+    def _unref(self, key: Optional[Tuple]) -> Optional[SandboxPool]:
+        # Called with the pool lock held; returns the pool to close, if any
+        if key is None or key not in self._pool_refs:
+            return None
+        self._pool_refs[key] -= 1
+        if self._pool_refs[key] > 0:
+            return None
+        del self._pool_refs[key]
+        return self._pools.pop(key)
+
+    def _new_pool(self, preload: Tuple[str, ...], paths: Tuple[Path, ...]) -> SandboxPool:
+        return SandboxPool(
+            size=self.max_workers,
+            preload=list(preload),
+            paths=list(paths),
+            memory_limit=self.memory_limit,
+            test_timeout=self.test_timeout,
+            max_runs=self.sandbox_max_runs
+        )
+
+    def _sandbox_pool(self) -> Optional[SandboxPool]:
+        if not self.sandbox:
+            return None
+        if self._pool_key is None:
+            self._use_pool(((), tuple(self._site_packages)))
+        with self._pool_lock:
+            return self._pools.get(self._pool_key)
+
+    def execute(
+        self,
+        project_path: Path,
+        component: str,
+        iteration: Optional[int] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> Dict:
         """
         Run tests for a specific component.
-        Suppose each component has a subfolder in 'tests' or something similar.
-        We'll do a naive example.
-        """
-        # Stub: let's pretend we run 'pytest' and everything fails except for demonstration.
-        # In real usage, you can call Docker or do something like:
-        # result = subprocess.run(["pytest", ...], capture_output=True)
-        
-        test_passed = False  # Force a fail for demonstration, or make it random
-        logs = "Simulated test logs..."
-        
-        if test_passed:
-            return {"passed": True, "error": "", "logs": logs}
+        Every Python file under the component's iteration directory (the
+        latest one unless `iteration` is given) is collected, so import errors in
+        the generated code fail the run even without test functions.
+        Setting `cancel` kills a running test process.
+        """
+        # pytest runs inside the iteration folder; relative paths would break
+        project_path = project_path.resolve()
+        component_path = project_path / component
+        if iteration is None:
+            iteration_dir = self._latest_iteration(component_path)
         else:
-            return {"passed": False, "error": "Test failure: example reason", "logs": logs}
+            iteration_dir = component_path / f"iteration_{iteration}"
+
+        if iteration_dir is None or not iteration_dir.is_dir():
+            return {
+                "passed": False,
+                "error": f"No generated code found for component '{component}'",
+                "logs": "",
+                "tests": []
+            }
+
+        result = self._run_targets(
+            project_path=project_path,
+            cwd=iteration_dir,
+            targets=sorted(iteration_dir.rglob("*.py")),
+            pythonpath=[iteration_dir, project_path, *self._site_packages],
+            cancel=cancel
+        )
+        return {
+            "passed": result["passed"],
+            "error": result["error"],
+            "logs": result["logs"],
+            "tests": result["tests"]
+        }
 
     def run_all(self, project_path: Path) -> Dict:
         """
         Run a full test suite on the entire project.
+        The latest iteration of every component and the project's own test
+        files are sharded across the worker pool.
         """
-        # Stub: pretend we pass or fail
-        # You might discover all test directories or files, run them, parse results, etc.
-        all_passed = True
-        details = "All tests passed (stub)."
-        
+        project_path = project_path.resolve()
+        shards = self._collect_shards(project_path)
+        if not shards:
+            return {
+                "all_passed": True,
+                "details": "No tests found.",
+                "summary": self._summarize([]),
+                "failures": []
+            }
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(
+                lambda shard: self._run_targets(project_path=project_path, **shard),
+                shards
+            ))
+
+        tests = [test for result in results for test in result["tests"]]
+        failures = [result["error"] for result in results if not result["passed"]]
+        summary = self._summarize(tests)
+        all_passed = not failures
+
+        if all_passed:
+            details = f"{summary['passed']} passed, {summary['skipped']} skipped in {len(shards)} shards."
+        else:
+            details = "\n".join(failures)
+
         return {
             "all_passed": all_passed,
-            "details": details
-        }
\ No newline at end of file
+            "details": details,
+            "summary": summary,
+            "failures": failures
+        }
+
+    def _collect_shards(self, project_path: Path) -> List[Dict]:
+        """
+        Split the project's tests into independently runnable shards.
+        """
+        shards = []
+        for component_path in sorted(
+            p for p in project_path.iterdir() if p.is_dir() and not p.name.startswith(".")
+        ):
+            iteration_dir = self._latest_iteration(component_path)
+            if iteration_dir is not None:
+                shards.append({
+                    "cwd": iteration_dir,
+                    "targets": sorted(iteration_dir.rglob("*.py")),
+                    "pythonpath": [iteration_dir, project_path, *self._site_packages]
+                })
+
+        tests_path = project_path / "tests"
+        if tests_path.is_dir():
+            test_files = sorted(
+                path for path in tests_path.rglob("*.py")
+                if path.name.startswith("test_") or path.name.endswith("_test.py")
+            )
+            shard_count = min(self.max_workers, len(test_files))
+            for index in range(shard_count):
+                shards.append({
+                    "cwd": project_path,
+                    "targets": test_files[index::shard_count],
+                    "pythonpath": [project_path, project_path / "src", *self._site_packages]
+                })
+
+        return [shard for shard in shards if shard["targets"]]
+
+    def _latest_iteration(self, component_path: Path) -> Optional[Path]:
+        # The promoted iteration; losing candidates may have higher numbers
+        latest = latest_iteration(component_path.parent, component_path.name)
+        if latest is not None:
+            return component_path / f"iteration_{latest}"
+
+        latest_number = -1
+        if not component_path.is_dir():
+            return None
+        for path in component_path.iterdir():
+            match = ITERATION_DIR.match(path.name)
+            if match and path.is_dir() and int(match.group(1)) > latest_number:
+                latest, latest_number = path, int(match.group(1))
+        return latest
+
+    def _run_targets(
+        self,
+        project_path: Path,
+        cwd: Path,
+        targets: List[Path],
+        pythonpath: List[Path],
+        cancel: Optional[threading.Event] = None
+    ) -> Dict:
+        """
+        Run only the targets without a memoized result, then merge fresh and
+        memoized results.
+        """
+        # Installed packages are covered by the environment, not hashed
+        graph = ImportGraph([path for path in pythonpath if path not in self._site_packages])
+        conftests = [path for path in [cwd / "conftest.py"] if path.exists()]
+        keys = {
+            target: f"{self._environment or 'system'}:{graph.fingerprint(graph.closure(target) | set(conftests))}"
+            for target in targets
+        }
+
+        memo = self._load_memo(project_path)
+        with self._memo_lock:
+            cached = {target: memo[keys[target]] for target in targets if keys[target] in memo}
+        pending = [target for target in targets if target not in cached]
+        logger.info(
+            f"Running {len(pending)} of {len(targets)} test files in {cwd} "
+            f"({len(cached)} unchanged)"
+        )
+
+        results = list(cached.values())
+        logs = ""
+        if pending:
+            run = self._run_pytest(cwd, pending, pythonpath, cancel)
+            logs = run["logs"]
+            per_target = self._split_by_target(cwd, pending, run)
+            if per_target is None:
+                # Crash or timeout: nothing can be attributed to single files
+                results.append(run)
+            else:
+                with self._memo_lock:
+                    for target, result in per_target.items():
+                        memo[keys[target]] = result
+                self._save_memo(project_path, memo)
+                results.extend(per_target.values())
+
+        tests = [test for result in results for test in result["tests"]]
+        failed = [result for result in results if not result["passed"]]
+        if not failed:
+            return {"passed": True, "error": "", "logs": logs, "tests": tests}
+
+        if not logs:
+            logs = "\n".join(result["logs"] for result in failed)
+        return {
+            "passed": False,
+            "error": "; ".join(result["error"] for result in failed),
+            "logs": logs,
+            "tests": tests
+        }
+
+    def _split_by_target(self, cwd: Path, targets: List[Path], run: Dict) -> Optional[Dict[Path, Dict]]:
+        """
+        Attribute a pytest run's results to the individual target files.
+        Returns None if the run did not complete normally.
+        """
+        if run["returncode"] not in (EXIT_OK, EXIT_TESTS_FAILED, EXIT_NO_TESTS):
+            return None
+
+        by_file = {target: [] for target in targets}
+        for test in run["tests"]:
+            if test["file"]:
+                path = cwd / test["file"]
+                if path in by_file:
+                    by_file[path].append(test)
+
+        per_target = {}
+        for target, tests in by_file.items():
+            failed = [test for test in tests if test["outcome"] in ("failed", "error")]
+            per_target[target] = {
+                "passed": not failed,
+                "error": f"Test failure: {self._describe_failures(failed)}" if failed else "",
+                "logs": run["logs"][-MAX_MEMO_LOG_CHARS:] if failed else "",
+                "tests": tests
+            }
+        return per_target
+
+    def _load_memo(self, project_path: Path) -> Dict[str, Dict]:
+        with self._memo_lock:
+            memo = self._memo.get(project_path)
+            if memo is None:
+                memo = {}
+                try:
+                    with open(project_path / RESULTS_FILE, encoding="utf-8") as f:
+                        memo = json.load(f)
+                except FileNotFoundError:
+                    pass
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable test result cache: {str(e)}")
+                self._memo[project_path] = memo
+            return memo
+
+    def _save_memo(self, project_path: Path, memo: Dict[str, Dict]):
+        path = project_path / RESULTS_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with self._memo_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(memo, f)
+        os.replace(tmp_path, path)
+
+    def forget(self, project_path: Path):
+        """
+        Drop a finished project's memoized results from memory; they stay
+        on disk for a later build of the same project.
+        """
+        with self._memo_lock:
+            self._memo.pop(Path(project_path).resolve(), None)
+
+    def _describe_failures(self, failed: List[Dict]) -> str:
+        return "; ".join(f"{test['name']}: {test['message']}" for test in failed[:5])
+
+    def _run_pytest(
+        self,
+        cwd: Path,
+        targets: List[Path],
+        pythonpath: List[Path],
+        cancel: Optional[threading.Event] = None
+    ) -> Dict:
+        """
+        Run pytest on `targets` in a sandboxed fork of a pre-warmed worker,
+        or in a fresh, resource-limited interpreter.
+        """
+        with tempfile.TemporaryDirectory(prefix="composer-pytest-") as tmp:
+            report_path = Path(tmp) / "report.xml"
+            args = [
+                "-q", "-p", "no:cacheprovider",
+                "--continue-on-collection-errors",
+                # xunit1 reports carry the file of every test case
+                "-o", "junit_family=xunit1",
+                f"--junitxml={report_path}",
+                "--rootdir", str(cwd),
+                *[str(target) for target in targets]
+            ]
+
+            with self._slots:
+                if cancel is not None and cancel.is_set():
+                    return {"passed": False, "error": "Test run cancelled", "logs": "", "tests": [], "returncode": None}
+                pool = self._sandbox_pool()
+                if pool is not None:
+                    log_path = Path(tmp) / "pytest.log"
+                    try:
+                        returncode, interrupted = pool.run(cwd, args, pythonpath, log_path, self.timeout, cancel)
+                        logs = log_path.read_text(errors="replace") if log_path.exists() else ""
+                    except SandboxClosedError:
+                        # Shut down underneath us; run in a fresh interpreter instead
+                        returncode, interrupted, logs = self._run_subprocess(cwd, args, pythonpath, cancel)
+                else:
+                    returncode, interrupted, logs = self._run_subprocess(cwd, args, pythonpath, cancel)
+
+            if interrupted:
+                if interrupted == "cancelled":
+                    error = "Test run cancelled"
+                else:
+                    error = f"Test run timed out after {self.timeout}s"
+                    logger.warning(f"Test run in {cwd} timed out after {self.timeout}s")
+                return {
+                    "passed": False,
+                    "error": error,
+                    "logs": logs,
+                    "tests": self._parse_junit(report_path),
+                    "returncode": None
+                }
+            tests = self._parse_junit(report_path)
+
+        result = {"logs": logs, "tests": tests, "returncode": returncode}
+        failed = [test for test in tests if test["outcome"] in ("failed", "error")]
+        if returncode in (EXIT_OK, EXIT_NO_TESTS) and not failed:
+            return {"passed": True, "error": "", **result}
+
+        if failed:
+            error = self._describe_failures(failed)
+        else:
+            error = f"pytest exited with code {returncode}"
+        return {"passed": False, "error": f"Test failure: {error}", **result}
+
+    def _run_subprocess(
+        self,
+        cwd: Path,
+        args: List[str],
+        pythonpath: List[Path],
+        cancel: Optional[threading.Event]
+    ) -> Tuple[Optional[int], str, str]:
+        """
+        Run pytest in a fresh interpreter. Returns (returncode, interrupted,
+        logs); `interrupted` is "timeout" or "cancelled" if the run was killed.
+        """
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(str(p) for p in pythonpath)
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        process = subprocess.Popen(
+            [sys.executable, str(WORKER_SCRIPT), str(self.memory_limit), str(self.test_timeout), *args],
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            start_new_session=True
+        )
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                # Poll in short steps only when the run can be cancelled
+                logs, _ = process.communicate(
+                    timeout=max(0, deadline - time.monotonic()) if cancel is None else 0.1
+                )
+                return process.returncode, "", logs
+            except subprocess.TimeoutExpired:
+                if cancel is not None and cancel.is_set():
+                    interrupted = "cancelled"
+                elif time.monotonic() >= deadline:
+                    interrupted = "timeout"
+                else:
+                    continue
+                os.killpg(process.pid, signal.SIGKILL)
+                logs, _ = process.communicate()
+                return None, interrupted, logs
+
+    def _parse_junit(self, report_path: Path) -> List[Dict]:
+        """
+        Turn a JUnit XML report into a list of per-test results.
+        """
+        try:
+            root = ET.parse(report_path).getroot()
+        except (OSError, ET.ParseError):
+            return []
+
+        tests = []
+        for case in root.iter("testcase"):
+            outcome, message = "passed", ""
+            for tag in ("failure", "error", "skipped"):
+                element = case.find(tag)
+                if element is not None:
+                    outcome = "failed" if tag == "failure" else tag
+                    message = element.get("message") or (element.text or "").strip()
+                    break
+            name = case.get("name", "")
+            if case.get("classname"):
+                name = f"{case.get('classname')}::{name}"
+            tests.append({
+                "name": name,
+                "file": case.get("file"),
+                "line": case.get("line"),
+                "outcome": outcome,
+                "time": float(case.get("time") or 0),
+                "message": message
+            })
+        return tests
+
+    def _summarize(self, tests: List[Dict]) -> Dict:
+        summary = {"total": len(tests), "passed": 0, "failed": 0, "error": 0, "skipped": 0}
+        for test in tests:
+            summary[test["outcome"]] += 1
+        return summary
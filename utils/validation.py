@@ -1,36 +1,338 @@
 # utils/validation.py
+import ast
+import hashlib
 import logging
-from typing import Dict
+import math
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.artifacts import latest_iteration
+from utils.bundle import split_bundle
+from utils.lru import LRUCache
 
 logger = logging.getLogger(__name__)
 
+ITERATION_DIR = re.compile(r"^iteration_(\d+)$")
+SKIPPED_DIRS = {"__pycache__", "node_modules", "venv", ".venv"}
+# Below this many unscanned files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 32
+MAX_CACHED_RESULTS = 20000
+
+SECRET_NAME = re.compile(
+    r"(passw(or)?d|secret|token|api_?key|access_?key|private_?key|credentials?)",
+    re.IGNORECASE
+)
+# Names that mention a secret but hold something about it: tokenUrl, TOKEN_TYPE
+NOT_SECRET_NAME = re.compile(r"(url|_?type|_?field|_?name|_?header)$", re.IGNORECASE)
+# Words joined by separators, like "bearer_token" or "password_hash"
+IDENTIFIER_VALUE = re.compile(r"^[A-Za-z]+(?:[_\-.:][A-Za-z]+)*$")
+MIN_SECRET_LENGTH = 8
+# Shannon entropy in bits per character; placeholders like "xxxxxxxx" score low
+MIN_SECRET_ENTROPY = 3.0
+# Findings of this severity fail validation; lower ones are reported as warnings
+FAILING_SEVERITY = "high"
+SQL_KEYWORD = re.compile(r"\b(select|insert|update|delete|create|drop|alter)\b", re.IGNORECASE)
+SHELL_CALLS = {"os.system", "os.popen", "commands.getoutput", "commands.getstatusoutput"}
+DESERIALIZERS = {
+    "pickle.load", "pickle.loads", "cPickle.load", "cPickle.loads",
+    "dill.load", "dill.loads", "marshal.load", "marshal.loads",
+    "shelve.open", "jsonpickle.decode"
+}
+SQL_METHODS = {"execute", "executemany", "executescript", "raw", "text"}
+
+
+class _RuleVisitor(ast.NodeVisitor):
+    """
+    Evaluates every security rule in a single walk over a module's AST.
+    """
+
+    def __init__(self):
+        self.findings: List[Dict] = []
+        # Local name -> fully qualified name, from import statements
+        self.aliases: Dict[str, str] = {}
+
+    def _report(self, node: ast.AST, rule: str, severity: str, message: str):
+        self.findings.append({
+            "rule": rule,
+            "severity": severity,
+            "line": getattr(node, "lineno", 0),
+            "col": getattr(node, "col_offset", 0),
+            "message": message
+        })
+
+    def _qualified_name(self, node: ast.AST) -> Optional[str]:
+        if isinstance(node, ast.Name):
+            return self.aliases.get(node.id, node.id)
+        if isinstance(node, ast.Attribute):
+            base = self._qualified_name(node.value)
+            return f"{base}.{node.attr}" if base else None
+        return None
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self.aliases[alias.asname or alias.name.split(".")[0]] = (
+                alias.name if alias.asname else alias.name.split(".")[0]
+            )
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module and not node.level:
+            for alias in node.names:
+                self.aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        name = self._qualified_name(node.func) or ""
+        keywords = {kw.arg: kw.value for kw in node.keywords if kw.arg}
+
+        if name in ("eval", "exec", "builtins.eval", "builtins.exec"):
+            self._report(node, "eval-exec", "high", f"Use of {name.split('.')[-1]}() can execute arbitrary code")
+
+        shell = keywords.get("shell")
+        if name.startswith("subprocess.") and isinstance(shell, ast.Constant) and shell.value is True:
+            self._report(node, "subprocess-shell", "high", f"{name}() with shell=True allows shell injection")
+        elif name in SHELL_CALLS:
+            self._report(node, "subprocess-shell", "high", f"{name}() runs its argument through the shell")
+
+        if name in DESERIALIZERS:
+            self._report(node, "insecure-deserialization", "high", f"{name}() can execute code from untrusted data")
+        elif name in ("yaml.load", "yaml.load_all") and not self._uses_safe_loader(node, keywords):
+            self._report(node, "insecure-deserialization", "medium", f"{name}() without SafeLoader can construct arbitrary objects")
+
+        method = name.rsplit(".", 1)[-1] if name else getattr(node.func, "attr", "")
+        if method in SQL_METHODS and node.args and self._is_formatted_sql(node.args[0]):
+            self._report(node, "sql-formatting", "high", "SQL built with string formatting; use query parameters")
+
+        for kw in node.keywords:
+            if kw.arg and _is_secret_name(kw.arg) and self._is_secret_literal(kw.value):
+                self._report(kw.value, "hardcoded-secret", "medium", f"Hardcoded secret passed as '{kw.arg}'")
+
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        for target in node.targets:
+            self._check_secret_assignment(target, node.value)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if node.value is not None:
+            self._check_secret_assignment(node.target, node.value)
+        self.generic_visit(node)
+
+    def visit_Dict(self, node: ast.Dict):
+        for key, value in zip(node.keys, node.values):
+            if (
+                isinstance(key, ast.Constant) and isinstance(key.value, str)
+                and _is_secret_name(key.value) and self._is_secret_literal(value)
+            ):
+                self._report(value, "hardcoded-secret", "medium", f"Hardcoded secret under key '{key.value}'")
+        self.generic_visit(node)
+
+    def _check_secret_assignment(self, target: ast.AST, value: ast.AST):
+        name = target.id if isinstance(target, ast.Name) else getattr(target, "attr", None)
+        if name and _is_secret_name(name) and self._is_secret_literal(value):
+            self._report(value, "hardcoded-secret", "medium", f"Hardcoded secret assigned to '{name}'")
+
+    def _is_secret_literal(self, node: ast.AST) -> bool:
+        """
+        A string that looks like a credential: long and random enough, and
+        not a URL, path or identifier such as "bearer_token".
+        """
+        if not isinstance(node, ast.Constant) or not isinstance(node.value, str):
+            return False
+        value = node.value
+        if len(value) < MIN_SECRET_LENGTH or any(c.isspace() for c in value):
+            return False
+        if "://" in value or value.startswith(("/", "./", "~")) or IDENTIFIER_VALUE.match(value):
+            return False
+        return _entropy(value) >= MIN_SECRET_ENTROPY
+
+    def _uses_safe_loader(self, node: ast.Call, keywords: Dict[str, ast.AST]) -> bool:
+        loader = keywords.get("Loader", node.args[1] if len(node.args) > 1 else None)
+        loader_name = self._qualified_name(loader) if loader is not None else ""
+        return bool(loader_name) and "Safe" in loader_name
+
+    def _is_formatted_sql(self, node: ast.AST) -> bool:
+        if isinstance(node, ast.JoinedStr):
+            text = "".join(v.value for v in node.values if isinstance(v, ast.Constant))
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Mod, ast.Add)):
+            text = ast.unparse(node)
+        elif (
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "format" and isinstance(node.func.value, ast.Constant)
+        ):
+            text = str(node.func.value.value)
+        else:
+            return False
+        return bool(SQL_KEYWORD.search(text))
+
+
+def _is_secret_name(name: str) -> bool:
+    return bool(SECRET_NAME.search(name)) and not NOT_SECRET_NAME.search(name)
+
+
+def _entropy(value: str) -> float:
+    counts = [value.count(c) for c in set(value)]
+    return -sum(n / len(value) * math.log2(n / len(value)) for n in counts)
+
+
+def _failing(findings: List[Dict]) -> List[Dict]:
+    return [finding for finding in findings if finding["severity"] == FAILING_SEVERITY]
+
+
+def scan_source(source: str, filename: str = "<generated>") -> Dict:
+    """
+    Parse `source` once and run every rule over it.
+    Returns {"findings": [...], "error": str | None}.
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+    except (SyntaxError, ValueError) as e:
+        return {"findings": [], "error": f"Could not parse {filename}: {str(e)}"}
+    visitor = _RuleVisitor()
+    visitor.visit(tree)
+    return {"findings": visitor.findings, "error": None}
+
+
+def _scan_file(path: str) -> Dict:
+    # Module-level so it can run in a process pool
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return scan_source(f.read(), filename=path)
+
+
+def collect_project_files(project_path: Path) -> List[Path]:
+    """
+    Python files of a project, with only the latest iteration of each
+    component; other iterations are superseded or losing candidates.
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(project_path):
+        iterations = [d for d in dirnames if ITERATION_DIR.match(d)]
+        latest = None
+        if iterations:
+            component = Path(dirpath).relative_to(project_path).as_posix()
+            number = latest_iteration(project_path, component)
+            if number is None:
+                # Not written through the artifact store
+                number = max(int(ITERATION_DIR.match(d).group(1)) for d in iterations)
+            latest = f"iteration_{number}"
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not d.startswith(".") and d not in SKIPPED_DIRS
+            and (not ITERATION_DIR.match(d) or d == latest)
+        )
+        files.extend(Path(dirpath) / name for name in sorted(filenames) if name.endswith(".py"))
+    return files
+
+
+def _format_issue(finding: Dict) -> str:
+    location = f"{finding['file']}:" if finding.get("file") else "line "
+    return f"{location}{finding['line']}: [{finding['rule']}] {finding['message']}"
+
+
 class SecurityValidator:
+    """
+    AST-based security scanner for generated code.
+    `full_audit` skips files whose content was already scanned, so repeated
+    audits of a growing project only pay for new or changed files.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scanned = LRUCache(MAX_CACHED_RESULTS)
+
     def validate(self, code: str) -> Dict:
         """
-        Validate the generated code for security issues.
-        Returns {passed: bool, issues: list[str], ...}
+        Validate the generated code for security issues. Each Python file
+        of a multi-file bundle is scanned on its own. Files that cannot be
+        parsed are skipped rather than failed: they cannot run either, and
+        the code gate reports their syntax errors to the fix loop. Only
+        high-severity findings fail; the others are returned as warnings.
+        Returns {passed: bool, issues: list[str], findings: list[dict],
+        warnings: list[str], skipped: list[str]}
         """
-        # In real usage, run Bandit or other scanners.
-        # For now, stub that everything is safe except
-        # if code has "eval(" or something suspicious.
-        suspicious = "eval(" in code
-        if suspicious:
-            return {
-                "passed": False,
-                "issues": ["Found eval(), which is potentially unsafe"]
-            }
-        else:
-            return {
-                "passed": True,
-                "issues": []
-            }
+        files = split_bundle(code) or {"<generated>": code}
+        findings, errors, skipped = [], [], []
+        for name, content in files.items():
+            if name != "<generated>" and not name.endswith(".py"):
+                errors.append(f"Refusing to check non-Python file {name}")
+                continue
+            result = self._scan_cached(content, name)
+            if result["error"]:
+                skipped.append(result["error"])
+            file = name if name != "<generated>" else None
+            findings.extend({**finding, "file": file} for finding in result["findings"])
+        failing = _failing(findings)
+        return {
+            "passed": not failing and not errors,
+            "issues": [_format_issue(finding) for finding in failing] + errors,
+            "findings": findings,
+            "warnings": [_format_issue(finding) for finding in findings if finding not in failing],
+            "skipped": skipped
+        }
+
+    def _scan_cached(self, code: str, filename: str = "<generated>") -> Dict:
+        digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._scanned.get(digest)
+        if cached is None:
+            cached = scan_source(code, filename)
+            with self._lock:
+                self._scanned[digest] = cached
+        return cached
 
     def full_audit(self, project_path) -> Dict:
         """
         Perform a deeper audit on the entire project directory.
+        Only the latest iteration of each component is audited; earlier
+        iterations are superseded code. Only high-severity findings fail the
+        audit; the others are reported as warnings.
         """
-        # Could recursively scan files with Bandit, etc.
+        files = collect_project_files(Path(project_path))
+        hashes = {}
+        for path in files:
+            hashes[path] = hashlib.sha256(path.read_bytes()).hexdigest()
+
+        with self._lock:
+            # Held locally: a large project can push its own results out of the cache
+            scanned = {digest: self._scanned.get(digest) for digest in set(hashes.values())}
+        pending = [path for path in files if scanned[hashes[path]] is None]
+        cache_hits = len(files) - len(pending)
+
+        if len(pending) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(_scan_file, [str(p) for p in pending], chunksize=8))
+        else:
+            results = [_scan_file(str(path)) for path in pending]
+        with self._lock:
+            for path, result in zip(pending, results):
+                scanned[hashes[path]] = self._scanned[hashes[path]] = result
+
+        findings, warnings = [], []
+        for path in files:
+            result = scanned[hashes[path]]
+            relative = str(path.relative_to(project_path))
+            for finding in result["findings"]:
+                finding = {**finding, "file": relative}
+                findings.append(finding)
+                if finding["severity"] != FAILING_SEVERITY:
+                    warnings.append(_format_issue(finding))
+            if result["error"]:
+                warnings.append(result["error"])
+
+        logger.info(
+            f"Security audit: {len(files)} files ({cache_hits} cached), {len(findings)} findings"
+        )
+        failing = _failing(findings)
         return {
-            "passed": True,
-            "details": "No major issues found."
-        }
\ No newline at end of file
+            "passed": not failing,
+            "details": "\n".join(_format_issue(f) for f in failing) or "No major issues found.",
+            "findings": findings,
+            "warnings": warnings,
+            "files": len(files),
+            "cache_hits": cache_hits
+        }